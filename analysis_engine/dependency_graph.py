@@ -6,6 +6,7 @@ import logging
 import networkx as nx # pip install networkx or /opt/epd/bin/easy_install networkx
 import six
 
+from array import array
 from collections import deque
 
 from flightdatautilities.dict_helpers import dict_filter
@@ -141,6 +142,15 @@ def dependencies3(di_graph, root, node_mgr):
     Heading -> Heading True + Magnetic Variation
     Heading True -> Heading - Magnetic Variation
     
+    The search uses an explicit stack rather than recursion so that long
+    dependency chains do not reach the recursion limit. Operational nodes are
+    remembered, as are inoperable nodes whose verdict cannot change when they
+    are reached again, i.e. none of their dependencies were unavailable due
+    to a circular dependency and all of their unavailable dependencies are
+    themselves remembered as inoperable. Other inoperable nodes are traversed
+    again each time they are reached as their dependencies may since have
+    become operational.
+    
     :param di_graph: Directed graph of all nodes and their dependencies.
     :type di_graph: nx.DiGraph
     :param root: Root node to start traversing from, usually named 'root'
@@ -149,43 +159,55 @@ def dependencies3(di_graph, root, node_mgr):
     :type node_mgr: analysis_engine.node.NodeManager
     '''
     log_stuff = logger.getEffectiveLevel() >= logging.INFO
-    def traverse_tree(node):
-        "Begin the recursion at this node's position in the dependency tree"
-        if node in path:
-            # add node for it to be removed (pop'd) in a moment
-            path.append(node)
-            # we've met this node before; start of circular dependency?
-            if log_stuff:
-                logger.info("Circular dependency avoided at node '%s'. "
-                            "Branch path: %s", node, path)
-            return False  # establishing if available; cannot yet be available
-        # we're recursing down
-        path.append(node)
-        if node in active_nodes:
-            # node already discovered operational
-            return True
-        
-        layer = set()  # layer of current node's available dependencies
-        for dependency in di_graph.successors(node):
-            # traverse again, 'like we did last summer'
-            if traverse_tree(dependency):
-                layer.add(dependency)
-            # each time traverse_tree returns, remove node from visited path
-            path.pop()
-            
-        if node_mgr.operational(node, layer):
-            # node will work at this level with the available dependencies
-            active_nodes.add(node)
-            ordering.append(node)
-            return True  # layer below works
-        else:
-            # node will not work with available dependencies
-            return False
-        
     ordering = []
-    path = deque()  # current branch path
+    path = []  # current branch path
+    visiting = set()  # nodes within path for fast lookup
     active_nodes = set()  # operational nodes visited for fast lookup
-    traverse_tree(root)  # start recursion
+    inactive_nodes = set()  # inoperable nodes which need not be revisited
+    # Each frame is [node, iterator of dependencies, layer of the node's
+    # available dependencies, whether an inoperable verdict is final].
+    stack = [[root, iter(di_graph.successors(root)), set(), True]]
+    path.append(root)
+    visiting.add(root)
+    while stack:
+        frame = stack[-1]
+        node, dependencies, layer = frame[:3]
+        for dependency in dependencies:
+            if dependency in visiting:
+                # we've met this node before; start of circular dependency?
+                if log_stuff:
+                    logger.info("Circular dependency avoided at node '%s'. "
+                                "Branch path: %s", dependency,
+                                deque(path + [dependency]))
+                # establishing if available; cannot yet be available
+                frame[3] = False
+            elif dependency in active_nodes:
+                # node already discovered operational
+                layer.add(dependency)
+            elif dependency not in inactive_nodes:
+                # traverse again, 'like we did last summer'
+                stack.append([dependency,
+                              iter(di_graph.successors(dependency)), set(),
+                              True])
+                path.append(dependency)
+                visiting.add(dependency)
+                break
+        else:
+            # all dependencies have been traversed, remove node from path
+            stack.pop()
+            visiting.discard(path.pop())
+            operational = node_mgr.operational(node, layer)
+            if operational:
+                # node will work at this level with the available dependencies
+                active_nodes.add(node)
+                ordering.append(node)
+            elif frame[3]:
+                inactive_nodes.add(node)
+            if stack:
+                if operational:
+                    stack[-1][2].add(node)
+                elif not frame[3]:
+                    stack[-1][3] = False
     return ordering
 
 
@@ -278,6 +300,35 @@ def graph_adjacencies(graph):
     return data
 
 
+# Group into node types to apply colour. TODO: Make colours less garish.
+NODE_COLORS = {
+    ApproachNode: '#663399', # purple
+    MultistateDerivedParameterNode: '#2aa52a', # dark green
+    DerivedParameterNode: '#72cdf4',  # fds-blue
+    FlightAttributeNode: '#b88a00',  # brown
+    FlightPhaseNode: '#d93737',  # red
+    KeyPointValueNode: '#bed630',  # fds-green
+    KeyTimeInstanceNode: '#fdbb30',  # fds-orange
+}
+HDF_NODE_COLOR = '#72f4eb'  # turquoise
+MISSING_NODE_COLOR = '#6a6e70'  # fds-grey
+ROOT_COLOR = '#ffffff'
+
+
+def _node_style(node):
+    '''
+    :returns: Colour and node type name used when drawing a derived node.
+    :rtype: (str, str)
+    '''
+    # the default is gray, if you see it, something is wrong
+    color = '#888888'
+    for base in node.__bases__:
+        if base in NODE_COLORS:
+            color = NODE_COLORS[base]
+            break
+    return color, node.__base__.__name__
+
+
 def graph_nodes(node_mgr):
     """
     :param node_mgr:
@@ -287,31 +338,14 @@ def graph_nodes(node_mgr):
     gr_all = nx.DiGraph()
     # create nodes without attributes now as you can only add attributes once
     # (limitation of add_node_attribute())
-    gr_all.add_nodes_from(node_mgr.hdf_keys, color='#72f4eb', # turquoise
+    gr_all.add_nodes_from(node_mgr.hdf_keys, color=HDF_NODE_COLOR,
                           node_type='HDFNode')
     derived_minus_lfl = dict_filter(node_mgr.derived_nodes,
                                     remove=node_mgr.hdf_keys)
-    # Group into node types to apply colour. TODO: Make colours less garish.
-    colors = {
-        ApproachNode: '#663399', # purple
-        MultistateDerivedParameterNode: '#2aa52a', # dark green
-        DerivedParameterNode: '#72cdf4',  # fds-blue
-        FlightAttributeNode: '#b88a00',  # brown
-        FlightPhaseNode: '#d93737',  # red
-        KeyPointValueNode: '#bed630',  # fds-green
-        KeyTimeInstanceNode: '#fdbb30',  # fds-orange
-    }
     derived_nodes = []
     for name, node in derived_minus_lfl.items():
-        # the default is gray, if you see it, something is wrong
-        color = '#888888'
-        for base in node.__bases__:
-            if base in colors:
-                color = colors[base]
-                break
-
-        node_info = (name, {'color': color,
-                            'node_type': node.__base__.__name__})
+        color, node_type = _node_style(node)
+        node_info = (name, {'color': color, 'node_type': node_type})
         derived_nodes.append(node_info)
     gr_all.add_nodes_from(derived_nodes)
 
@@ -326,7 +360,7 @@ def graph_nodes(node_mgr):
     # add root - the top level application dependency structure based on required nodes
     # filter only nodes which are at the top of the tree (no predecessors)
     # TODO: Ask Chris about this causing problems with the trimmer.
-    gr_all.add_node('root', color='#ffffff')
+    gr_all.add_node('root', color=ROOT_COLOR)
     root_edges = []
     for node_req in node_mgr.requested:
         if any_predecessors_in_requested(node_req, node_mgr.requested, gr_all):
@@ -367,22 +401,331 @@ def graph_nodes(node_mgr):
     # Add missing nodes to graph so it shows everything. These should all be
     # RAW parameters missing from the LFL unless something has gone wrong with
     # the derived_nodes dict!
-    gr_all.add_nodes_from(missing_derived_dep, color='#6a6e70')  # fds-grey
+    gr_all.add_nodes_from(missing_derived_dep, color=MISSING_NODE_COLOR)
     return gr_all
 
 
-def process_order(gr_all, node_mgr, raise_inoperable_requested=False):
+class DependencyIndex(object):
     """
-    :param gr_all:
+    Dependencies of derived nodes as integer indexed arrays in compressed
+    sparse row (CSR) form. The index only depends upon the derived nodes, so
+    it is built once (see get) and shared by every flight processed with
+    them, while the parameters available to each flight are applied by
+    flight_graph.
+
+    Nodes are numbered by their position within names: derived nodes first
+    (in the order of derived_nodes) followed by dependencies which are not
+    derived nodes. The dependencies of node i are
+    indices[indptr[i]:indptr[i + 1]] and the derived nodes which depend upon
+    node i are pred_indices[pred_indptr[i]:pred_indptr[i + 1]], both in the
+    order of derived_nodes.
+    """
+    # (identities of derived_nodes items, derived_nodes items, index)
+    _cache = None
+
+    def __init__(self, derived_nodes):
+        """
+        :param derived_nodes: Derived node classes keyed by name.
+        :type derived_nodes: dict
+        """
+        items = list(six.iteritems(derived_nodes))
+        self.names = [name for name, node in items]
+        self.positions = dict((name, i) for i, name in enumerate(self.names))
+        self.derived_count = len(items)
+        self.indptr = array('l', [0])
+        self.indices = array('l')
+        for name, node in items:
+            dependencies = set()
+            for dependency in node.get_dependency_names():
+                if dependency in dependencies:
+                    continue
+                dependencies.add(dependency)
+                i = self.positions.get(dependency)
+                if i is None:
+                    i = self.positions[dependency] = len(self.names)
+                    self.names.append(dependency)
+                self.indices.append(i)
+            self.indptr.append(len(self.indices))
+        # Dependencies which are not derived nodes have no dependencies.
+        self.indptr.extend(
+            [len(self.indices)] * (len(self.names) - self.derived_count))
+
+        counts = [0] * len(self.names)
+        for i in self.indices:
+            counts[i] += 1
+        self.pred_indptr = array('l', [0])
+        for count in counts:
+            self.pred_indptr.append(self.pred_indptr[-1] + count)
+        self.pred_indices = array('l', [0] * len(self.indices))
+        fill = list(self.pred_indptr[:-1])
+        for node_index in range(self.derived_count):
+            for i in self.indices[self.indptr[node_index]:
+                                  self.indptr[node_index + 1]]:
+                self.pred_indices[fill[i]] = node_index
+                fill[i] += 1
+        # (color, node_type) of derived nodes for drawing.
+        self.styles = [_node_style(node) for name, node in items]
+
+    @classmethod
+    def get(cls, derived_nodes):
+        """
+        :returns: The index of derived_nodes, reusing the index built for the previous call when the same nodes are provided.
+        :rtype: DependencyIndex
+        """
+        items = list(six.iteritems(derived_nodes))
+        key = [(name, id(node)) for name, node in items]
+        cached = cls._cache
+        if cached is None or cached[0] != key:
+            # Keeping a reference to the nodes ensures their identities are
+            # not reused.
+            cached = cls._cache = (key, items, cls(derived_nodes))
+        return cached[2]
+
+    def flight_graph(self, node_mgr):
+        """
+        :returns: Dependency graph of node_mgr's nodes.
+        :rtype: FlightGraph
+        """
+        return FlightGraph(self, node_mgr)
+
+
+class FlightGraph(object):
+    """
+    Dependency graph of a single flight's nodes backed by a DependencyIndex,
+    which is equivalent to the graph built by graph_nodes without creating a
+    networkx graph. Provides the successors method used by dependencies3.
+    Derived nodes which are available as HDF parameters have no dependencies
+    and 'root' depends upon the requested nodes which do not depend upon
+    another requested node (see any_predecessors_in_requested).
+    """
+
+    def __init__(self, index, node_mgr):
+        """
+        :type index: DependencyIndex
+        :type node_mgr: NodeManager
+        :raises nx.NetworkXError: If a requested node is not within the graph (as graph_nodes).
+        :raises ValueError: If a requested node is not available.
+        """
+        self.index = index
+        self.hdf_keys = set(node_mgr.hdf_keys)
+        # Flags of nodes which are HDF parameters by position.
+        self.hdf_flags = bytearray(len(index.names))
+        for name in self.hdf_keys:
+            i = index.positions.get(name)
+            if i is not None:
+                self.hdf_flags[i] = 1
+
+        requested = set(node_mgr.requested)
+        self.root_successors = []
+        for name in node_mgr.requested:
+            if not self._in_graph(name):
+                raise nx.NetworkXError(
+                    "The node %s is not in the digraph." % name)
+            if name not in self.root_successors and \
+               not self._requested_predecessor(name, requested):
+                self.root_successors.append(name)
+
+        available_nodes = set(['HDF Duration'])
+        available_nodes.update(self.hdf_keys, index.names[:index.derived_count],
+                               node_mgr.aircraft_info,
+                               node_mgr.achieved_flight_record,
+                               node_mgr.segment_info)
+        # Missing dependencies.
+        self.missing = set(
+            name for i, name in enumerate(index.names)
+            if i >= index.derived_count and name not in available_nodes
+            and self._first_predecessor(i) is not None)
+        # Missing dependencies which are requested.
+        missing_requested = list(requested - available_nodes)
+        if self.missing:
+            logger.warning("Found %s dependencies which don't exist in LFL "
+                           "or Node modules.", len(self.missing))
+            logger.debug("The missing dependencies: %s", list(self.missing))
+        if missing_requested:
+            raise ValueError("Missing requested parameters: %s" %
+                             missing_requested)
+
+    def _first_predecessor(self, i):
+        """
+        :returns: Position of the first derived node which depends upon node i and is not an HDF parameter.
+        :rtype: int or None
+        """
+        index = self.index
+        for node_index in index.pred_indices[index.pred_indptr[i]:
+                                             index.pred_indptr[i + 1]]:
+            if not self.hdf_flags[node_index]:
+                return node_index
+        return None
+
+    def _in_graph(self, name):
+        i = self.index.positions.get(name)
+        return name == 'root' or name in self.hdf_keys or \
+            (i is not None and (i < self.index.derived_count or
+                                self._first_predecessor(i) is not None))
+
+    def _requested_predecessor(self, name, requested):
+        """
+        Equivalent to any_predecessors_in_requested, which follows the first
+        predecessor of each node towards the start of the tree.
+        """
+        i = self.index.positions.get(name)
+        visited = set()
+        while i is not None:
+            i = self._first_predecessor(i)
+            if i is None or i in visited:
+                return False
+            if self.index.names[i] in requested:
+                return True
+            visited.add(i)
+        return False
+
+    def successors(self, name):
+        """
+        :returns: Dependencies of the named node.
+        :rtype: list of str
+        """
+        if name == 'root':
+            return self.root_successors
+        index = self.index
+        i = index.positions.get(name)
+        if i is None or i >= index.derived_count or self.hdf_flags[i]:
+            return []
+        names = index.names
+        return [names[j] for j in
+                index.indices[index.indptr[i]:index.indptr[i + 1]]]
+
+    def spanning_tree(self, process_order):
+        """
+        :param process_order: Process order including 'root'.
+        :type process_order: list of str
+        :returns: Spanning tree of the active nodes.
+        :rtype: SpanningTree
+        """
+        active = set(process_order)
+        index = self.index
+        edges = []
+        styles = {}
+        for name in process_order:
+            for dependency in self.successors(name):
+                if dependency in active:
+                    edges.append((name, dependency))
+            i = index.positions.get(name)
+            if name == 'root':
+                styles[name] = (ROOT_COLOR, None)
+            elif name in self.hdf_keys:
+                styles[name] = (HDF_NODE_COLOR, 'HDFNode')
+            elif i is not None and i < index.derived_count:
+                styles[name] = index.styles[i]
+            elif name in self.missing:
+                styles[name] = (MISSING_NODE_COLOR, None)
+        return SpanningTree(process_order, edges, styles)
+
+
+class SpanningTree(object):
+    """
+    Active nodes (in process order, including 'root') and the dependencies
+    between them as calculated by dependency_order. Provides the parts of the
+    networkx DiGraph interface used when processing flights, while
+    to_networkx creates the equivalent graph for drawing or serialising.
+    """
+
+    def __init__(self, nodes, edges, styles=None):
+        """
+        :param nodes: Active nodes in process order.
+        :type nodes: list of str
+        :param edges: (node, dependency) pairs.
+        :type edges: list of tuple
+        :param styles: (color, node_type) of nodes for drawing, either may be None.
+        :type styles: dict
+        """
+        self._nodes = list(nodes)
+        self._edges = [tuple(edge) for edge in edges]
+        self.styles = styles or {}
+        self._succ = None
+        self._pred = None
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    def __contains__(self, name):
+        return name in self._adjacency()[0]
+
+    def nodes(self):
+        return list(self._nodes)
+
+    def edges(self):
+        return list(self._edges)
+
+    def _adjacency(self):
+        if self._succ is None:
+            self._succ = dict((name, []) for name in self._nodes)
+            self._pred = dict((name, []) for name in self._nodes)
+            for name, dependency in self._edges:
+                self._succ[name].append(dependency)
+                self._pred[dependency].append(name)
+        return self._succ, self._pred
+
+    def successors(self, name):
+        return list(self._adjacency()[0][name])
+
+    def predecessors(self, name):
+        return list(self._adjacency()[1][name])
+
+    @property
+    def node(self):
+        """
+        :returns: Attributes of each node as within the networkx graph.
+        :rtype: dict
+        """
+        node = {}
+        for n, name in enumerate(self._nodes):
+            attributes = {'label': '%d: %s' % (n, name), 'active': True}
+            color, node_type = self.styles.get(name, (None, None))
+            if color:
+                attributes['color'] = color
+            if node_type:
+                attributes['node_type'] = node_type
+            node[name] = attributes
+        return node
+
+    def to_networkx(self):
+        """
+        :rtype: nx.DiGraph
+        """
+        graph = nx.DiGraph()
+        graph.add_nodes_from(six.iteritems(self.node))
+        graph.add_edges_from(self._edges)
+        return graph
+
+    def todict(self):
+        """
+        :returns: JSON serialisable representation (see fromdict).
+        :rtype: dict
+        """
+        return {'nodes': self._nodes, 'edges': self._edges,
+                'styles': self.styles}
+
+    @classmethod
+    def fromdict(cls, d):
+        return cls(d['nodes'], d['edges'],
+                   dict((name, tuple(style)) for name, style
+                        in six.iteritems(d['styles'])))
+
+
+def _mark_active(gr_all, process_order):
+    """
+    Label the nodes within process_order with their position and colour the
+    remaining nodes of gr_all as inactive.
+
     :type gr_all: nx.DiGraph
-    :param node_mgr: 
-    :type node_mgr: NodeManager
-    :returns:
-    :rtype: 
+    :param process_order: Process order including 'root'.
+    :type process_order: list of str
+    :returns: Spanning tree graph of the active nodes.
+    :rtype: nx.DiGraph
     """
-    process_order = dependencies3(gr_all, 'root', node_mgr)
-    logger.debug("Processing order of %d nodes is: %s", len(process_order), process_order)
-    
     for n, node in enumerate(process_order):
         gr_all.node[node]['label'] = '%d: %s' % (n, node)
         gr_all.node[node]['active'] = True
@@ -398,13 +741,25 @@ def process_order(gr_all, node_mgr, raise_inoperable_requested=False):
         gr_all.node[node]['active'] = False
         inactive_edges = gr_all.in_edges(node)
         gr_all.add_edges_from(inactive_edges, color='#c0c0c0')  # silver
-        
+    return gr_st
+
+
+def _check_order(node_mgr, process_order, get_gr_all,
+                 raise_inoperable_requested=False):
+    """
+    Report requested nodes which are inoperable and raise if required nodes
+    are missing from process_order.
+
+    :param get_gr_all: Returns the graph of all nodes marked with _mark_active. Only called to log the trees of inoperable requested nodes in debug.
+    :type get_gr_all: callable
+    """
     inoperable_requested = list(set(node_mgr.requested) - set(process_order))
     if inoperable_requested:
         logger.warning("Found %s inoperable requested parameters.",
                         len(inoperable_requested))
         if logging.NOTSET < logger.getEffectiveLevel() <= logging.DEBUG:
             # only build this massive tree if in debug!
+            gr_all = get_gr_all()
             items = []
             for n in sorted(inoperable_requested):
                 tree = indent_tree(gr_all, n, recurse_active=False)
@@ -419,7 +774,22 @@ def process_order(gr_all, node_mgr, raise_inoperable_requested=False):
     if required_missing:
         raise RequiredNodesMissing(
             "Required nodes missing: %s" % ', '.join(required_missing))
-    
+
+
+def process_order(gr_all, node_mgr, raise_inoperable_requested=False):
+    """
+    :param gr_all:
+    :type gr_all: nx.DiGraph
+    :param node_mgr: 
+    :type node_mgr: NodeManager
+    :returns:
+    :rtype: 
+    """
+    process_order = dependencies3(gr_all, 'root', node_mgr)
+    logger.debug("Processing order of %d nodes is: %s", len(process_order), process_order)
+    gr_st = _mark_active(gr_all, process_order)
+    _check_order(node_mgr, process_order, lambda: gr_all,
+                 raise_inoperable_requested)
     return gr_all, gr_st, process_order[:-1] # exclude 'root'
 
 
@@ -434,32 +804,58 @@ def remove_floating_nodes(graph):
     return graph
      
      
+def _dependency_order(node_mgr, draw=not_windows,
+                      raise_inoperable_requested=False):
+    """
+    Implementation of dependency_order returning the spanning tree as a
+    SpanningTree, which is far cheaper to build than a networkx graph. Used
+    when processing flights (see plan_cache.cached_dependency_order).
+
+    :rtype: (list of strings, SpanningTree)
+    """
+    index = DependencyIndex.get(node_mgr.derived_nodes)
+    flight_graph = index.flight_graph(node_mgr)
+    order = dependencies3(flight_graph, 'root', node_mgr)
+    logger.debug("Processing order of %d nodes is: %s", len(order), order)
+    gr_st = flight_graph.spanning_tree(order)
+
+    def get_gr_all():
+        gr_all = graph_nodes(node_mgr)
+        _mark_active(gr_all, order)
+        return gr_all
+
+    _check_order(node_mgr, order, get_gr_all, raise_inoperable_requested)
+    
+    if draw:
+        from json import dumps
+        gr_st_graph = gr_st.to_networkx()
+        logger.info("JSON Graph Representation:\n%s", dumps(
+            graph_adjacencies(gr_st_graph), indent=2))
+        draw_graph(gr_st_graph, 'Active Nodes in Spanning Tree')
+        # reduce number of nodes by removing floating ones
+        gr_all = remove_floating_nodes(get_gr_all())
+        draw_graph(gr_all, 'Dependency Tree')
+    return order[:-1], gr_st  # exclude 'root'
+
+
 def dependency_order(node_mgr, draw=not_windows,
                      raise_inoperable_requested=False):
     """
     Main method for retrieving processing order of nodes.
+
+    The dependencies are resolved with the DependencyIndex of
+    node_mgr.derived_nodes rather than a networkx graph of every node, the
+    networkx graph of all nodes is only built when drawing or when debugging
+    inoperable requested nodes.
     
     :param node_mgr: 
     :type node_mgr: NodeManager
     :param draw: Will draw the graph. Green nodes are available LFL params, Blue are operational derived, Black are not requested derived, Red are active top level requested params, Grey are inactive params. Edges are labelled with processing order.
     :type draw: boolean
     :returns: List of Nodes determining the order for processing and the spanning tree graph.
-    :rtype: (list of strings, dict)
+    :rtype: (list of strings, nx.DiGraph)
     """
-    _graph = graph_nodes(node_mgr)
-    gr_all, gr_st, order = process_order(_graph, node_mgr,
-                                         raise_inoperable_requested)
-    
-    if draw:
-        from json import dumps
-        logger.info("JSON Graph Representation:\n%s", dumps(
-            graph_adjacencies(gr_st), indent=2))
-    
-    if draw:
-        draw_graph(gr_st, 'Active Nodes in Spanning Tree')
-        # reduce number of nodes by removing floating ones
-        gr_all = remove_floating_nodes(gr_all)
-        draw_graph(gr_all, 'Dependency Tree')
-    return order, gr_st
-
-
+    order, gr_st = _dependency_order(node_mgr, draw=draw,
+                                     raise_inoperable_requested=
+                                     raise_inoperable_requested)
+    return order, gr_st.to_networkx()
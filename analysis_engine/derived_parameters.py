@@ -1303,6 +1303,7 @@ class AltitudeVisualizationWithGroundOffset(DerivedParameterNode):
     '''
 
     units = ut.FT
+    priority = 1
 
     @classmethod
     def can_operate(cls, available):
@@ -1401,6 +1402,7 @@ class AltitudeVisualizationWithoutGroundOffset(DerivedParameterNode):
     '''
 
     units = ut.FT
+    priority = 1
 
     def derive(self,
                alt_aal=P('Altitude AAL'),
@@ -4252,6 +4254,8 @@ class SlatAngle(DerivedParameterNode):
     align = False
     units = ut.DEGREE
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -7710,6 +7714,8 @@ class VrefLookup(DerivedParameterNode):
 
     units = ut.KT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family'),
@@ -7890,6 +7896,8 @@ class VappLookup(DerivedParameterNode):
 
     units = ut.KT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family'),
@@ -8005,6 +8013,8 @@ class VMOLookup(DerivedParameterNode):
     name = 'VMO Lookup'
     units = ut.KT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family'),
@@ -8054,6 +8064,8 @@ class MMOLookup(DerivedParameterNode):
     name = 'MMO Lookup'
     units = ut.MACH
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family'),
@@ -8169,6 +8181,8 @@ class FlapManoeuvreSpeed(DerivedParameterNode):
 
     units = ut.KT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, manufacturer=A('Manufacturer'),
                     model=A('Model'), series=A('Series'), family=A('Family'),
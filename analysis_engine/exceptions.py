@@ -67,5 +67,37 @@ class DataFrameError(Exception):
             % (self.param_name, self.frame_name)
 
 
+class NodeBudgetExceeded(Exception):
+    '''
+    Raised when deriving a node exceeds its wall-clock or memory budget.
+    '''
+
+    def __init__(self, node_name, budget, limit, value):
+        '''
+        :param node_name: Node which exceeded its budget.
+        :type node_name: string
+        :param budget: Budget which was exceeded, either 'time' or 'memory'.
+        :type budget: string
+        :param limit: Budget in seconds or bytes.
+        :type limit: float
+        :param value: Seconds elapsed or bytes allocated when the node was aborted.
+        :type value: float
+        '''
+        self.node_name = node_name
+        self.budget = budget
+        self.limit = limit
+        self.value = value
+        super(NodeBudgetExceeded, self).__init__(node_name, budget, limit,
+                                                 value)
+
+    def __str__(self):
+        '''
+        '''
+        units = 'seconds' if self.budget == 'time' else 'bytes'
+        return "Node '%s' exceeded its %s budget of %s %s (%s %s)." \
+            % (self.node_name, self.budget, self.limit, units, self.value,
+               units)
+
+
 ################################################################################
 # vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
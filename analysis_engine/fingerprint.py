@@ -0,0 +1,137 @@
+'''
+Fingerprints identifying the inputs used to derive each node.
+
+A node's fingerprint combines the source code of its class and the classes it
+inherits from, the analysis engine version and the source code of
+analysis_engine.library, with the fingerprints of the dependencies it was
+derived from. Dependencies are LFL
+parameters, attributes (aircraft_info, achieved_flight_record and
+segment_info values) or other derived nodes, so a change to any node's code or
+to an attribute value changes the fingerprint of every node which depends upon
+it, directly or indirectly. Comparing the fingerprints of a previous run with
+those of the current run identifies which nodes need to be derived again.
+'''
+import hashlib
+import inspect
+import six
+
+from datetime import datetime
+
+from analysis_engine import __version__, library
+
+
+# Fingerprints of node class source code, calculated once per class.
+_CLASS_FINGERPRINTS = {}
+# Fingerprint of the analysis engine version and library source code.
+_LIBRARY_FINGERPRINT = []
+
+
+def _sha1(text):
+    if isinstance(text, six.text_type):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+
+def _canonical(value):
+    '''
+    Text representation of a value which does not depend upon dictionary
+    ordering.
+    '''
+    if isinstance(value, dict):
+        items = sorted((_canonical(k), _canonical(v))
+                       for k, v in six.iteritems(value))
+        return '{%s}' % ', '.join('%s: %s' % item for item in items)
+    elif isinstance(value, (list, tuple)):
+        return '[%s]' % ', '.join(_canonical(v) for v in value)
+    elif isinstance(value, datetime):
+        return value.isoformat()
+    elif isinstance(value, six.binary_type):
+        return value.decode('utf-8', 'replace')
+    return six.text_type(value)
+
+
+def library_fingerprint():
+    '''
+    Fingerprint of the analysis engine version and the source code of
+    analysis_engine.library, whose functions nodes are derived with.
+
+    :rtype: str
+    '''
+    if not _LIBRARY_FINGERPRINT:
+        try:
+            source = inspect.getsource(library)
+        except (IOError, OSError, TypeError):
+            source = ''
+        _LIBRARY_FINGERPRINT.append(_sha1('%s\n%s' % (__version__, source)))
+    return _LIBRARY_FINGERPRINT[0]
+
+
+def _source(cls):
+    try:
+        return inspect.getsource(cls)
+    except (IOError, OSError, TypeError):
+        # Builtins and dynamically created classes.
+        return '%s.%s' % (cls.__module__, cls.__name__)
+
+
+def class_fingerprint(node_class):
+    '''
+    Fingerprint of the source code of a node class and the classes it
+    inherits from, combined with library_fingerprint. If the source code of a
+    class is not available, its import path is used instead.
+
+    :param node_class: Derived node class.
+    :type node_class: class
+    :rtype: str
+    '''
+    try:
+        return _CLASS_FINGERPRINTS[node_class]
+    except KeyError:
+        pass
+    parts = [library_fingerprint()]
+    parts.extend(_source(cls) for cls in inspect.getmro(node_class)
+                 if cls is not object)
+    fingerprint = _CLASS_FINGERPRINTS[node_class] = _sha1('\n'.join(parts))
+    return fingerprint
+
+
+def value_fingerprint(value):
+    '''
+    Fingerprint of an attribute value.
+
+    :rtype: str
+    '''
+    return _sha1(_canonical(value))
+
+
+def node_fingerprints(node_mgr, process_order):
+    '''
+    Calculate fingerprints for every node within process_order.
+
+    LFL parameters are identified by name and attributes by value. Derived
+    nodes combine their class fingerprint with the fingerprints of their
+    dependencies, where dependencies which are not within process_order are
+    unavailable.
+
+    :param node_mgr: Node manager used to create process_order.
+    :type node_mgr: NodeManager
+    :param process_order: Node names in the order they are processed.
+    :type process_order: [str]
+    :returns: Fingerprint for each node name within process_order.
+    :rtype: dict
+    '''
+    fingerprints = {}
+    for name in process_order:
+        if name in node_mgr.derived_nodes and name not in node_mgr.hdf_keys:
+            node_class = node_mgr.derived_nodes[name]
+            parts = [class_fingerprint(node_class)]
+            for dep_name in node_class.get_dependency_names():
+                parts.append('%s=%s' % (dep_name, fingerprints.get(dep_name)))
+            fingerprints[name] = _sha1('\n'.join(parts))
+            continue
+        attribute = node_mgr.get_attribute(name)
+        if attribute is not None:
+            fingerprints[name] = value_fingerprint(attribute.value)
+        else:
+            fingerprints[name] = value_fingerprint(('HDF', name))
+    return fingerprints
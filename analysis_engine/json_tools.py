@@ -150,6 +150,12 @@ def process_flight_to_json(pf_results, indent=2):
         # Q: Should we sort?
         #d[key] = sorted(d[key])
     
+    if 'fingerprints' in pf_results:
+        d['fingerprints'] = pf_results['fingerprints']
+    if 'skipped' in pf_results:
+        d['skipped'] = pf_results['skipped']
+    if 'approximate' in pf_results:
+        d['approximate'] = pf_results['approximate']
     d['version'] = VERSION
     
     return json.dumps(sort_dict(d), indent=indent)
@@ -172,20 +178,33 @@ def json_to_process_flight(txt):
         for name, items in d[key].items():
             res[key][name] = [jsondict_to_node(i) for i in items]
 
+    if 'fingerprints' in d:
+        res['fingerprints'] = d['fingerprints']
+    if 'skipped' in d:
+        res['skipped'] = d['skipped']
+    if 'approximate' in d:
+        res['approximate'] = d['approximate']
     return res
 
 
-def process_flight_to_nodes(pf_results):
+def process_flight_to_nodes(pf_results, derived_nodes=None):
     '''
     Load process flight results into Node objects.
+
+    :param derived_nodes: Derived nodes to load results into, defaults to the nodes within settings.NODE_MODULES.
+    :type derived_nodes: dict or None
     '''
     from analysis_engine import node
     
-    derived_nodes = get_derived_nodes(settings.NODE_MODULES)
+    if derived_nodes is None:
+        derived_nodes = get_derived_nodes(settings.NODE_MODULES)
     
     params = {}
     
     for node_type, nodes in six.iteritems(pf_results):
+        if node_type not in PROCESS_FLIGHT_RESULT_KEYS:
+            # e.g. fingerprints
+            continue
         
         for node_name, items in six.iteritems(nodes):
             try:
@@ -2156,6 +2156,8 @@ class V2LookupAtLiftoff(KeyPointValueNode):
 
     units = ut.KT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family'),
@@ -5838,6 +5840,8 @@ class ElevatorPreflightCheck(KeyPointValueNode):
 
     units = ut.PERCENT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, model=A('Model'), series=A('Series'), family=A('Family')):
 
@@ -5870,6 +5874,8 @@ class AileronPreflightCheck(KeyPointValueNode):
     """
     units = ut.PERCENT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, model=A('Model'), series=A('Series'), family=A('Family')):
 
@@ -5902,6 +5908,8 @@ class RudderPreflightCheck(KeyPointValueNode):
     """
     units = ut.PERCENT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, model=A('Model'), series=A('Series'), family=A('Family')):
 
@@ -7990,6 +7998,8 @@ class EngGasTempOverThresholdDuration(KeyPointValueNode):
     NAME_VALUES = {'period': ['Takeoff Power', 'MCP', 'Go Around Power']}
     units = ut.SECOND
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, eng_series=A('Engine Series'), eng_type=A('Engine Type'), mods=A('Modifications')):
         try:
@@ -8062,6 +8072,8 @@ class EngN1OverThresholdDuration(KeyPointValueNode):
     NAME_VALUES = {'period': ['Takeoff Power', 'MCP', 'Go Around Power']}
     units = ut.SECOND
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, eng_series=A('Engine Series'), eng_type=A('Engine Type'), mods=A('Modifications')):
         try:
@@ -8134,6 +8146,8 @@ class EngN2OverThresholdDuration(KeyPointValueNode):
     NAME_VALUES = {'period': ['Takeoff Power', 'MCP', 'Go Around Power']}
     units = ut.SECOND
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, eng_series=A('Engine Series'), eng_type=A('Engine Type'), mods=A('Modifications')):
         try:
@@ -8206,6 +8220,8 @@ class EngNpOverThresholdDuration(KeyPointValueNode):
     NAME_VALUES = {'period': ['Takeoff Power', 'MCP', 'Go Around Power']}
     units = ut.SECOND
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, eng_series=A('Engine Series'), eng_type=A('Engine Type'), mods=A('Modifications')):
         try:
@@ -8278,6 +8294,8 @@ class EngTorqueOverThresholdDuration(KeyPointValueNode):
     NAME_VALUES = {'period': ['Takeoff Power', 'MCP', 'Go Around Power']}
     units = ut.SECOND
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, eng_series=A('Engine Series'), eng_type=A('Engine Type'),
                     mods=A('Modifications'), ac_type=A('Aircraft Type')):
@@ -8363,6 +8381,8 @@ class EngTorqueLimitExceedanceWithOneEngineInoperativeDuration(KeyPointValueNode
 
     units = ut.SECOND
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, eng_series=A('Engine Series'), eng_type=A('Engine Type'),
                     mods=A('Modifications'), ac_type=A('Aircraft Type')):
@@ -11874,6 +11894,8 @@ class GearDownToLandingFlapConfigurationDuration(KeyPointValueNode):
 
     units = ut.SECOND
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family'),
@@ -12477,6 +12499,8 @@ class GroundspeedStabilizerOutOfTrimDuringTakeoffMax(KeyPointValueNode):
 
     units = ut.KT
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, model=A('Model'), series=A('Series'), family=A('Family')):
 
@@ -33,6 +33,7 @@ from flightdatautilities import aircrafttables as at
 from flightdatautilities.geometry import cross_track_distance
 
 from analysis_engine.settings import (
+    ALIGNMENT_PLAN_CACHE_SIZE,
     BUMP_HALF_WIDTH,
     HEADING_RATE_FOR_MOBILE,
     ILS_CAPTURE,
@@ -60,6 +61,18 @@ logger = logging.getLogger(name=__name__)
 
 Value = namedtuple('Value', 'index value')
 
+# Number of aligned (period) and slave (slave_period) samples in each period
+# of the slower parameter, the offset of the slave sample preceding each
+# aligned sample within a period from the start of the period and their
+# interpolation weights (see _alignment_plan). offsets is None where
+# align_args does not interpolate between samples.
+AlignmentPlan = namedtuple(
+    'AlignmentPlan',
+    'ratio length period slave_period offsets weights next_weights')
+
+# Alignment plans keyed by array length, frequencies, offsets and interpolate.
+_ALIGNMENT_PLANS = {}
+
 
 class InvalidDatetime(ValueError):
     pass
@@ -382,6 +395,112 @@ def align_args(slave_array, slave_frequency, slave_offset, master_frequency, mas
         # No alignment is required, return the slave's array unchanged.
         return slave_array
 
+    plan = _alignment_plan(len(slave_array), slave_frequency, slave_offset,
+                           master_frequency, master_offset, interpolate)
+    r = plan.ratio
+
+    # Where offsets are equal, the slave_array recorded values remain
+    # unchanged and interpolation is performed between these values.
+    # - and we do not interpolate mapped arrays!
+    if plan.offsets is None:
+        # Here we create a masked array to hold the returned values that will
+        # have the same sample rate and timing offset as the master
+        slave_aligned = np.ma.zeros(plan.length, dtype=_dtype)
+        slave_aligned.mask = True
+        if master_frequency > slave_frequency:
+            # populate values and interpolate
+            slave_aligned[0::int(r)] = slave_array[0::1]
+            # Interpolate and do not extrapolate masked ends or gaps
+            # bigger than the duration between slave samples (i.e. where
+            # original slave data is masked).
+            # If array is fully masked, return array of masked zeros
+            dur_between_slave_samples = 1.0 / slave_frequency
+            return repair_mask(
+                slave_aligned,
+                frequency=master_frequency,
+                repair_duration=dur_between_slave_samples,
+                raise_entirely_masked=False,
+            )
+
+        else:
+            # step through slave taking the required samples
+            return slave_array[0::int(1 / r)]
+
+    # Interpolate the nth sample of every period of the master parameter from
+    # samples h and h + 1 of each period of the slave parameter, where h is
+    # the nth offset of the plan. Each row of the result is a single period
+    # and rows beyond a partial last period are dropped. A sample is masked
+    # if either slave sample is masked.
+    ws = plan.slave_period
+    length = len(slave_array)
+    periods = -(-plan.length // plan.period)
+    data = np.ma.getdata(slave_array)
+    slave_mask = np.ma.getmask(slave_array)
+    # We can't interpolate values outside the range of the slave parameter.
+    # Treat ends as "padding"; Value of 0 and Masked.
+    values = np.zeros((periods, plan.period))
+    mask = np.ones((periods, plan.period), dtype=bool)
+    for n, (h, a, b) in enumerate(zip(plan.offsets, plan.weights,
+                                      plan.next_weights)):
+        h = int(h)
+        first = 1 if h < 0 else 0
+        last = min(periods, (length - 2 - h) // ws + 1)
+        if last <= first:
+            continue
+        start = h + first * ws
+        stop = h + (last - 1) * ws + 1
+        values[first:last, n] = a * data[start:stop:ws] + \
+            b * data[start + 1:stop + 1:ws]
+        if slave_mask is np.ma.nomask:
+            mask[first:last, n] = False
+        else:
+            mask[first:last, n] = slave_mask[start:stop:ws] | \
+                slave_mask[start + 1:stop + 1:ws]
+    values = values.ravel()[:plan.length]
+    mask = mask.ravel()[:plan.length]
+    if slave_mask is np.ma.nomask and not mask.any():
+        mask = np.ma.nomask
+    slave_aligned = np.ma.array(values.astype(_dtype, copy=False), mask=mask)
+
+    if isinstance(original_array, MappedArray) or original_array.dtype.type is np.string_:
+        # return back to mapped array
+        mapped_array = MappedArray(np.ma.zeros(len(slave_aligned)).astype(_dtype), values_mapping=mappings)
+        mapped_array[:] = slave_aligned[:]
+        slave_aligned = mapped_array
+
+    if original_array.dtype.type is np.string_:
+        # return back to string array
+        slave_aligned = mapped_array_to_string_array(slave_aligned)
+
+    return slave_aligned
+
+
+def _alignment_plan(length, slave_frequency, slave_offset, master_frequency,
+                    master_offset, interpolate):
+    '''
+    Calculate how align_args aligns an array of length samples. Plans are
+    cached for each combination of arguments as a flight's parameters only
+    have a handful of distinct lengths, frequencies and offsets. A plan only
+    holds the offsets and interpolation weights of a single period, which
+    align_args repeats for every period of the array.
+
+    :param length: Length of the slave array.
+    :type length: int
+    :type slave_frequency: int or float
+    :type slave_offset: int or float
+    :type master_frequency: int or float
+    :type master_offset: int or float
+    :type interpolate: bool
+    :raises ValueError: If the arrays cannot be aligned.
+    :rtype: AlignmentPlan
+    '''
+    key = (length, slave_frequency, slave_offset, master_frequency,
+           master_offset, interpolate)
+    try:
+        return _ALIGNMENT_PLANS[key]
+    except KeyError:
+        pass
+
     # Get the sample rates for the two parameters
     wm = master_frequency
     ws = slave_frequency
@@ -412,96 +531,44 @@ def align_args(slave_array, slave_frequency, slave_offset, master_frequency, mas
     # Compute the sample rate ratio:
     r = wm / float(ws)
 
-    # Here we create a masked array to hold the returned values that will have
-    # the same sample rate and timing offset as the master
-    len_aligned = int(len(slave_array) * r)
-    if len_aligned != (len(slave_array) * r):
+    len_aligned = int(length * r)
+    if len_aligned != (length * r):
         raise ValueError("Array length problem in align. Probable cause is flight cutting not at superframe boundary")
 
-    slave_aligned = np.ma.zeros(len(slave_array) * r, dtype=_dtype)
-
-    # Where offsets are equal, the slave_array recorded values remain
-    # unchanged and interpolation is performed between these values.
-    # - and we do not interpolate mapped arrays!
     if not delta and interpolate and (is_power2(slave_frequency) and
                                       is_power2(master_frequency)):
-        slave_aligned.mask = True
-        if master_frequency > slave_frequency:
-            # populate values and interpolate
-            slave_aligned[0::r] = slave_array[0::1]
-            # Interpolate and do not extrapolate masked ends or gaps
-            # bigger than the duration between slave samples (i.e. where
-            # original slave data is masked).
-            # If array is fully masked, return array of masked zeros
-            dur_between_slave_samples = 1.0 / slave_frequency
-            return repair_mask(
-                slave_aligned,
-                frequency=master_frequency,
-                repair_duration=dur_between_slave_samples,
-                raise_entirely_masked=False,
-            )
-
-        else:
-            # step through slave taking the required samples
-            return slave_array[0::1/r]
-
-    # Each sample in the master parameter may need different combination parameters
-    for i in range(int(wm)):
-        bracket = (i / r) + delta
+        plan = AlignmentPlan(r, len_aligned, None, None, None, None, None)
+    else:
+        # Each sample in the master parameter may need different
+        # combination parameters
+        wm = int(wm)
+        brackets = np.arange(wm) / r + delta
         # Interpolate between the hth and (h+1)th samples of the slave array
-        h = int(floor(bracket))
-        h1 = h + 1
-
+        h = np.floor(brackets).astype(int)
+        if h.min() < -ws:
+            raise ValueError('Align called with excessive timing mismatch')
         # Compute the linear interpolation coefficients, b & a
-        b = bracket - h
+        b = brackets - h
 
         # Cunningly, if we are interpolating (working with mapped arrays e.g.
         # discrete or multi-state parameters), by reverting to 1,0 or 0,1
         # coefficients we gather the closest value in time to the master
         # parameter.
         if not interpolate:
-            b = round(b)
+            b = np.array([round(x) for x in b], dtype=float)
 
         # Either way, a is the residual part.
         a = 1 - b
 
-        if h < 0:
-            if h<-ws:
-                raise ValueError('Align called with excessive timing mismatch')
-            # slave_array values do not exist in aligned array
-            if ws==1:
-                slave_aligned[i+wm::wm] = a*slave_array[h+ws:-ws:ws] + b*slave_array[h1+ws::ws]
-            else:
-                slave_aligned[i+wm::wm] = a*slave_array[h+ws:-ws:ws] + b*slave_array[h1+ws:1-ws:ws]
-            # We can't interpolate the inital values as we are outside the
-            # range of the slave parameters.
-            # Treat ends as "padding"; Value of 0 and Masked.
-            slave_aligned[i] = 0
-            slave_aligned[i] = np.ma.masked
-        elif h1 >= ws:
-            slave_aligned[i:-wm:wm] = a*slave_array[h:-ws:ws] + b*slave_array[h1::ws]
-            # At the other end, we run out of slave parameter values so need to
-            # pad to the end of the array.
-            # Treat ends as "padding"; Value of 0 and Masked.
-            slave_aligned[i-wm] = 0
-            slave_aligned[i-wm] = np.ma.masked
-        else:
-            # Sheer bliss. We can compute slave_aligned across the whole
-            # range of the data without having to take special care at the
-            # ends of the array.
-            slave_aligned[i::wm] = a*slave_array[h::ws] + b*slave_array[h1::ws]
-
-    if isinstance(original_array, MappedArray) or original_array.dtype.type is np.string_:
-        # return back to mapped array
-        mapped_array = MappedArray(np.ma.zeros(len(slave_aligned)).astype(_dtype), values_mapping=mappings)
-        mapped_array[:] = slave_aligned[:]
-        slave_aligned = mapped_array
+        # The nth sample of each period of the master parameter is
+        # interpolated from samples h and h + 1 of the same period of the
+        # slave parameter.
+        plan = AlignmentPlan(r, len_aligned, wm, int(ws), h, a, b)
 
-    if original_array.dtype.type is np.string_:
-        # return back to string array
-        slave_aligned = mapped_array_to_string_array(slave_aligned)
-
-    return slave_aligned
+    if len(_ALIGNMENT_PLANS) >= ALIGNMENT_PLAN_CACHE_SIZE:
+        _ALIGNMENT_PLANS.clear()
+    _ALIGNMENT_PLANS[key] = plan
+    return plan
 
 
 def align_slices(slave, master, slices):
@@ -412,6 +412,8 @@ class Configuration(MultistateDerivedParameterNode):
     values_mapping = at.constants.AVAILABLE_CONF_STATES
     align_frequency = 2
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, manufacturer=A('Manufacturer'),
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -1079,6 +1081,8 @@ class Flap(MultistateDerivedParameterNode):
     # function
     ##align_frequency = 2
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, frame=A('Frame'),
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -1148,6 +1152,8 @@ class FlapLever(MultistateDerivedParameterNode):
 
     units = ut.DEGREE
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -1191,6 +1197,8 @@ class FlapIncludingTransition(MultistateDerivedParameterNode):
 
     units = ut.DEGREE
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -1233,6 +1241,8 @@ class FlapExcludingTransition(MultistateDerivedParameterNode):
 
     units = ut.DEGREE
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -1269,6 +1279,8 @@ class FlapLeverSynthetic(MultistateDerivedParameterNode):
     units = ut.DEGREE
     align_frequency = 2  # force higher than most Flap frequencies
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -1353,6 +1365,8 @@ class Flaperon(MultistateDerivedParameterNode):
     much to other aircraft types.
     '''
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -1468,6 +1482,8 @@ class GearDownInTransit(MultistateDerivedParameterNode):
         1: 'Extending',
     }
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, model=A('Model'), series=A('Series'), family=A('Family')):
         # Can operate with a any combination of parameters available
@@ -1610,6 +1626,8 @@ class GearUpInTransit(MultistateDerivedParameterNode):
         1: 'Retracting',
     }
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available, model=A('Model'), series=A('Series'), family=A('Family')):
         # Can operate with a any combination of parameters available
@@ -2308,6 +2326,8 @@ class Slat(MultistateDerivedParameterNode):
 
     units = ut.DEGREE
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -2344,6 +2364,8 @@ class SlatExcludingTransition(MultistateDerivedParameterNode):
 
     units = ut.DEGREE
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -2383,6 +2405,8 @@ class SlatIncludingTransition(MultistateDerivedParameterNode):
 
     units = ut.DEGREE
 
+    can_operate_cacheable = False
+
     @classmethod
     def can_operate(cls, available,
                     model=A('Model'), series=A('Series'), family=A('Family')):
@@ -1,4 +1,3 @@
-import copy
 try:
     import cPickle
 except ImportError:
@@ -11,9 +10,11 @@ import numpy as np
 import pprint
 import re
 import six
+import threading
+import time
 
 from abc import ABCMeta
-from collections import namedtuple, Iterable, OrderedDict
+from collections import defaultdict, namedtuple, Iterable, OrderedDict
 from functools import total_ordering
 from itertools import product
 from operator import attrgetter
@@ -39,8 +40,12 @@ from analysis_engine.library import (
     value_at_index,
     value_at_time,
 )
+from analysis_engine.fingerprint import value_fingerprint
 from analysis_engine.recordtype import recordtype
-from analysis_engine.settings import NODE_CACHE_OFFSET_DP
+from analysis_engine.settings import (CAN_OPERATE_CACHE,
+                                     CAN_OPERATE_CACHE_SIZE,
+                                     NODE_CACHE_OFFSET_DP,
+                                     NODE_COLUMNS_MIN_ITEMS)
 
 # FIXME: a better place for this class
 from hdfaccess.parameter import MappedArray
@@ -60,6 +65,26 @@ KeyTimeInstance = recordtype('KeyTimeInstance',
                              default=None)
 Section = namedtuple('Section', 'name slice start_edge stop_edge')  # Q: rename mask -> slice/section
 
+# Number of times the index, value or name of an existing KeyPointValue or
+# KeyTimeInstance has been modified in place. Columns built by ColumnarList
+# before the latest modification are rebuilt (see ColumnarList.get_columns).
+_ITEM_MODIFICATIONS = [0]
+_UNSET = object()
+
+
+def _item_setattr(self, name, value):
+    '''
+    Count modifications of the fields stored within columns. Fields set while
+    the item is initialised (or unpickled) are not yet set.
+    '''
+    if name in ('index', 'value', 'name') and \
+            getattr(self, name, _UNSET) is not _UNSET:
+        _ITEM_MODIFICATIONS[0] += 1
+    object.__setattr__(self, name, value)
+
+KeyPointValue.__setattr__ = _item_setattr
+KeyTimeInstance.__setattr__ = _item_setattr
+
 
 # Ref: django/db/models/options.py:20
 # Calculate the verbose_name by converting from InitialCaps to "lowercase with spaces".
@@ -174,6 +199,25 @@ def get_param_kwarg_names(method):
     return defaults
 
 
+def get_attribute_kwarg_names(method):
+    """
+    Inspects a can_operate method's arguments and returns the names of the
+    Attributes defined as default values of keyword arguments.
+
+    :param method: Method to be inspected
+    :type method: method
+    :returns: Ordered names of Attributes to pass into the method.
+    :rtype: tuple of str
+    :raises TypeError: If a keyword argument's default is not an Attribute.
+    """
+    defaults = inspect.getargspec(method).defaults or ()
+    for default in defaults:
+        if not isinstance(default, Attribute):
+            raise TypeError('Only Attributes may be keyword '
+                            'arguments in can_operate methods.')
+    return tuple(default.name for default in defaults)
+
+
 #------------------------------------------------------------------------------
 # Abstract Node Classes
 # =====================
@@ -186,6 +230,49 @@ def _calculate_offset(frequency, offset):
     return offset % (1.0 / frequency)
 
 
+class NodeCache(dict):
+    '''
+    Cache of aligned nodes keyed by (name, frequency, offset) (see
+    Node.cache_key) which is shared by nodes derived concurrently. Keys are
+    indexed by node name under a lock so that the aligned copies of a node
+    can be evicted without iterating over the cache while other threads add
+    to it.
+    '''
+
+    def __init__(self):
+        super(NodeCache, self).__init__()
+        self._lock = threading.Lock()
+        self._keys = defaultdict(set)
+
+    def __setitem__(self, key, node):
+        with self._lock:
+            dict.__setitem__(self, key, node)
+            self._keys[key[0]].add(key)
+
+    def evict(self, name):
+        '''
+        Remove the aligned copies of a node.
+
+        :param name: Name of node.
+        :type name: str
+        :returns: Number of removed entries.
+        :rtype: int
+        '''
+        with self._lock:
+            keys = self._keys.pop(name, ())
+            for key in keys:
+                dict.pop(self, key, None)
+        return len(keys)
+
+    def nodes(self):
+        '''
+        :returns: Snapshot of the cached nodes.
+        :rtype: [Node]
+        '''
+        with self._lock:
+            return list(self.values())
+
+
 class Node(six.with_metaclass(ABCMeta, object)):
     '''
     Note about aligning options
@@ -207,6 +294,8 @@ class Node(six.with_metaclass(ABCMeta, object)):
     align_frequency = None  # Force frequency of Node by overriding
     align_offset = None  # Force offset of Node by overriding
     data_type = None  # Q: What should the default be? Q: Should this dictate the numpy dtype saved to the HDF file or should it be inferred from the array?
+    priority = None  # Tier when processing with a deadline, see settings.NODE_PRIORITIES.
+    can_operate_cacheable = True  # can_operate is a pure function of its arguments, see settings.CAN_OPERATE_CACHE.
 
     def __init__(self, name='', frequency=1.0, offset=0.0, **kwargs):
         """
@@ -275,6 +364,37 @@ class Node(six.with_metaclass(ABCMeta, object)):
         """
         return cls.name or get_verbose_name(cls.__name__).title()
 
+    @classmethod
+    def _get_metadata(cls, attr, method, compute):
+        """
+        Metadata is computed from a method once per class rather than
+        inspecting the method on every call. The function it was computed
+        from is stored alongside so that it is recomputed if the method is
+        overridden by a subclass or replaced.
+
+        :param attr: Name of class attribute to store metadata within.
+        :type attr: str
+        :param method: Method to compute metadata from.
+        :param compute: Function computing metadata from method.
+        :type compute: callable
+        """
+        function = getattr(method, '__func__', method)
+        cached = getattr(cls, attr, None)
+        if cached is None or cached[0] is not function:
+            cached = (function, compute(method))
+            setattr(cls, attr, cached)
+        return cached[1]
+
+    @classmethod
+    def get_dependencies(cls):
+        """
+        :returns: Default values of the derive method's keyword arguments.
+        :rtype: tuple
+        """
+        return cls._get_metadata(
+            '_dependencies', cls.derive,
+            lambda method: tuple(get_param_kwarg_names(method)))
+
     @classmethod
     def get_dependency_names(cls):
         """
@@ -283,10 +403,22 @@ class Node(six.with_metaclass(ABCMeta, object)):
         """
         # TypeError:'ABCMeta' object is not iterable?
         # this probably means dependencies for this class isn't a list!
-        params = get_param_kwarg_names(cls.derive)
         # Here due to an AttributeError? Derive kwarg is a string not a Node:
         # e.g. derive(a='String') instead of derive(a=P('String'))
-        return [d.name or d.get_name() for d in params]
+        return list(cls._get_metadata(
+            '_dependency_names', cls.derive,
+            lambda method: tuple(d.name or d.get_name()
+                                 for d in cls.get_dependencies())))
+
+    @classmethod
+    def get_can_operate_attribute_names(cls):
+        """
+        :returns: Names of Attributes passed into the can_operate method.
+        :rtype: tuple of str
+        :raises TypeError: If a keyword argument of can_operate is not an Attribute.
+        """
+        return cls._get_metadata('_can_operate_attribute_names',
+                                 cls.can_operate, get_attribute_kwarg_names)
 
     @classmethod
     def can_operate(cls, available):
@@ -400,6 +532,11 @@ def can_operate(cls, available, actype=A('Aircraft Type')):
         """
         assert len(args) == len(self.get_dependency_names()), \
             '%s: incorrect number of arguments for derive() method' % self.__class__.__name__
+        # shhh, secret accessor for recording the time spent aligning
+        # dependencies and deriving when profiling.
+        timings = getattr(self, '_timings', None)
+        if timings is not None:
+            start = time.time()
         dependencies_to_align = \
             [d for d in args if d is not None and d.frequency]
 
@@ -443,6 +580,9 @@ def can_operate(cls, available, actype=A('Aircraft Type')):
             self.frequency = dependencies_to_align[0].frequency
             self.offset = dependencies_to_align[0].offset
 
+        if timings is not None:
+            timings['align'] = time.time() - start
+            start = time.time()
         try:
             res = self.derive(*args)
         except Exception:
@@ -450,6 +590,8 @@ def can_operate(cls, available, actype=A('Aircraft Type')):
                            'Nodes used to derive:\n  %s',
                            self.name, '\n  '.join(repr(n) for n in args))
             raise
+        if timings is not None:
+            timings['derive'] = time.time() - start
 
         if res is NotImplemented:
             raise NotImplementedError("Class '%s' derive method is not implemented." %
@@ -500,12 +642,15 @@ def can_operate(cls, available, actype=A('Aircraft Type')):
     
     def __getstate__(self):
         '''
-        Do not pickle _cache attr when saving nodes.
+        Do not pickle _cache or _columns (see ColumnarList) attrs when saving
+        nodes.
         '''
-        if '_cache' not in self.__dict__:
+        if '_cache' not in self.__dict__ and '_columns' not in self.__dict__:
             return self.__dict__
         state = self.__dict__.copy()
-        del state['_cache']
+        state.pop('_cache', None)
+        state.pop('_columns', None)
+        state.pop('_columns_modifications', None)
         return state
     
     def __setstate__(self, state):
@@ -990,7 +1135,352 @@ def derived_param_from_hdf(hdf_parameter, cache=None):
         )
 
 
-class SectionNode(Node, list):
+class SortedColumn(object):
+    '''
+    Array of values with the order which sorts them, so that the positions of
+    values within ranges are found by binary search.
+    '''
+
+    def __init__(self, values):
+        '''
+        :type values: np.ndarray
+        '''
+        self.values = values
+        # A stable sort keeps equal values in their list order.
+        self.order = np.argsort(values, kind='mergesort')
+        self.sorted = values[self.order]
+
+    def searchsorted(self, value, side='left'):
+        return np.searchsorted(self.sorted, value, side=side)
+
+    def slice_positions(self, _slice):
+        '''
+        Equivalent to is_index_within_slice for every value.
+
+        :type _slice: slice
+        :returns: Positions of the values within the slice, ordered by value.
+        :rtype: np.ndarray
+        '''
+        start, stop = _slice.start, _slice.stop
+        if _slice.step is not None and _slice.step < 0:
+            # start >= value > stop
+            lo = 0 if stop is None else self.searchsorted(stop, 'right')
+            hi = len(self.values) if start is None else \
+                self.searchsorted(start, 'right')
+        else:
+            # start <= value < stop
+            lo = 0 if start is None else self.searchsorted(start)
+            hi = len(self.values) if stop is None else self.searchsorted(stop)
+        return self.order[lo:max(lo, hi)]
+
+
+def _float_column(values, count):
+    '''
+    :raises ValueError: If any value is not a number or is NaN.
+    :rtype: np.ndarray
+    '''
+    try:
+        column = np.fromiter(values, dtype=np.float64, count=count)
+    except (AttributeError, TypeError):
+        raise ValueError('Columns may only contain numbers.')
+    if np.isnan(column).any():
+        raise ValueError('Columns may not contain NaN.')
+    return column
+
+
+def _name_codes(items):
+    '''
+    :returns: Interned names of items and the code of each item's name.
+    :rtype: dict, np.ndarray
+    '''
+    names = {}
+    codes = np.fromiter((names.setdefault(item.name, len(names))
+                         for item in items), dtype=np.int32, count=len(items))
+    return names, codes
+
+
+class ColumnarList(list):
+    '''
+    List which caches a columnar index of its items (built by _build_columns)
+    for answering queries with array operations. The columns are discarded
+    whenever the list is modified, and rebuilt if the index, value or name of
+    any KeyPointValue or KeyTimeInstance has been modified in place since
+    they were built.
+    '''
+    _columns = None
+    _columns_modifications = None
+
+    def _build_columns(self):
+        '''
+        :raises ValueError: If the items cannot be stored within columns.
+        '''
+        raise NotImplementedError("Abstract Method")
+
+    def invalidate_columns(self):
+        '''
+        Discard the columnar index of the items, see get_columns.
+        '''
+        self._columns = None
+
+    def get_columns(self):
+        '''
+        Get a columnar index of the items. Lists with fewer than
+        settings.NODE_COLUMNS_MIN_ITEMS items are quicker to iterate over.
+
+        :returns: Columns of the items or None if they should be iterated over.
+        :rtype: object or None
+        '''
+        if len(self) < NODE_COLUMNS_MIN_ITEMS:
+            return None
+        columns = self._columns
+        modifications = _ITEM_MODIFICATIONS[0]
+        if columns is None or self._columns_modifications != modifications:
+            try:
+                columns = self._build_columns()
+            except ValueError:
+                # Fall back to iterating over unusual items.
+                columns = False
+            self._columns = columns
+            self._columns_modifications = modifications
+        return columns or None
+
+    def _get_items(self, positions):
+        '''
+        :returns: A new node of the same type as self containing the items at positions.
+        :rtype: self.__class__
+        '''
+        return self.__class__(name=self.name, frequency=self.frequency,
+                              offset=self.offset,
+                              items=[self[p] for p in positions.tolist()])
+
+    def _get_extreme(self, positions, column, arg_func, indexed=False):
+        '''
+        :param positions: Positions of candidate items.
+        :type positions: np.ndarray
+        :param column: Column of values to compare.
+        :type column: np.ndarray
+        :param arg_func: np.argmin or np.argmax.
+        :param indexed: Whether column has already been indexed by positions.
+        :type indexed: bool
+        :returns: The first item with the extreme value within column or None if there are no positions.
+        :rtype: item within self or None
+        '''
+        if not len(positions):
+            return None
+        if not indexed:
+            column = column[positions]
+        return self[int(positions[arg_func(column)])]
+
+    def append(self, item):
+        self._columns = None
+        super(ColumnarList, self).append(item)
+
+    def extend(self, items):
+        self._columns = None
+        super(ColumnarList, self).extend(items)
+
+    def insert(self, position, item):
+        self._columns = None
+        super(ColumnarList, self).insert(position, item)
+
+    def remove(self, item):
+        self._columns = None
+        super(ColumnarList, self).remove(item)
+
+    def pop(self, *args):
+        self._columns = None
+        return super(ColumnarList, self).pop(*args)
+
+    def sort(self, *args, **kwargs):
+        self._columns = None
+        super(ColumnarList, self).sort(*args, **kwargs)
+
+    def reverse(self):
+        self._columns = None
+        super(ColumnarList, self).reverse()
+
+    def __setitem__(self, key, value):
+        self._columns = None
+        super(ColumnarList, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._columns = None
+        super(ColumnarList, self).__delitem__(key)
+
+    def __iadd__(self, items):
+        self._columns = None
+        return super(ColumnarList, self).__iadd__(items)
+
+    def __imul__(self, count):
+        self._columns = None
+        return super(ColumnarList, self).__imul__(count)
+
+    if six.PY2:
+        def __setslice__(self, i, j, items):
+            self._columns = None
+            super(ColumnarList, self).__setslice__(i, j, items)
+
+        def __delslice__(self, i, j):
+            self._columns = None
+            super(ColumnarList, self).__delslice__(i, j)
+
+
+class ItemColumns(object):
+    '''
+    Columnar representation of the items within a FormattedNameNode: an array
+    of indices (and values if the items have them) with name codes interned
+    in a dictionary. Positions refer to the items within the node, which
+    remains the storage of the items.
+    '''
+
+    def __init__(self, items, values=False):
+        '''
+        :param items: KeyPointValues or KeyTimeInstances.
+        :type items: list
+        :param values: Whether to store the value of each item.
+        :type values: bool
+        :raises ValueError: If an index or value is not a number.
+        '''
+        count = len(items)
+        self.index = SortedColumn(
+            _float_column((item.index for item in items), count))
+        self.value = _float_column((item.value for item in items), count) \
+            if values else None
+        self.names, self.name_codes = _name_codes(items)
+
+    def positions(self, within_slices=None, name=None, names=None):
+        '''
+        :param within_slices: Only return positions of items within these slices.
+        :type within_slices: [slice] or None
+        :param name: Only return positions of items with this name.
+        :type name: str or None
+        :param names: Only return positions of items with one of these names.
+        :type names: set of str or None
+        :returns: Positions of the matching items in list order.
+        :rtype: np.ndarray
+        '''
+        if within_slices:
+            selected = np.zeros(len(self.name_codes), dtype=np.bool_)
+            for _slice in within_slices:
+                selected[self.index.slice_positions(_slice)] = True
+        else:
+            selected = np.ones(len(self.name_codes), dtype=np.bool_)
+        if name:
+            code = self.names.get(name)
+            if code is None:
+                return np.array([], dtype=np.intp)
+            selected &= self.name_codes == code
+        if names is not None:
+            codes = [self.names[n] for n in names if n in self.names]
+            selected &= np.in1d(self.name_codes, codes)
+        return np.flatnonzero(selected)
+
+
+class SectionColumns(object):
+    '''
+    Columnar representation of the sections within a SectionNode: sorted
+    arrays of slice starts and stops and arrays of edges with name codes
+    interned in a dictionary. Sections with a slice start or stop of None or
+    with a slice step cannot be stored within columns.
+    '''
+
+    def __init__(self, sections):
+        '''
+        :type sections: [Section]
+        :raises ValueError: If a slice start or stop is not a number or a slice has a step.
+        '''
+        count = len(sections)
+        if any(section.slice.step is not None for section in sections):
+            raise ValueError('Columns do not support slice steps.')
+        self.start = SortedColumn(_float_column(
+            (section.slice.start for section in sections), count))
+        self.stop = SortedColumn(_float_column(
+            (section.slice.stop for section in sections), count))
+        self.slice_columns = {'start': self.start, 'stop': self.stop}
+        self.names, self.name_codes = _name_codes(sections)
+
+    def _select(self, positions):
+        selected = np.zeros(len(self.name_codes), dtype=np.bool_)
+        selected[positions] = True
+        return selected
+
+    def _within(self, within_slice, within_use):
+        '''
+        Equivalent to is_slice_within_slice for every section.
+
+        :returns: Whether each section is within within_slice or None if the comparison is not supported.
+        :rtype: np.ndarray or None
+        '''
+        start, stop = within_slice.start, within_slice.stop
+        if within_use == 'start':
+            return self._select(self.start.slice_positions(within_slice))
+        elif within_use == 'stop':
+            return self._select(self.stop.slice_positions(within_slice))
+        elif within_use == 'any':
+            if within_slice.step is not None and within_slice.step < 1:
+                return None
+            # section start < stop and start < section stop
+            hi = len(self.name_codes) if stop is None else \
+                self.start.searchsorted(stop)
+            selected = self._select(self.start.order[:hi])
+            selected &= self.stop.values > (start or 0)
+            return selected
+        elif within_use == 'slice':
+            if start is None and stop is None:
+                return np.ones(len(self.name_codes), dtype=np.bool_)
+            elif start is None:
+                return None
+            # start <= section start <= stop and start <= section stop <= stop
+            hi = len(self.name_codes) if stop is None else \
+                self.start.searchsorted(stop, 'right')
+            selected = self._select(
+                self.start.order[self.start.searchsorted(start):hi])
+            if stop is not None:
+                selected &= (self.stop.values >= start) & \
+                    (self.stop.values <= stop)
+            return selected
+        return None
+
+    def positions(self, name=None, containing_index=None, within_slice=None,
+                  within_use='slice'):
+        '''
+        Arguments are those of SectionNode._get_condition after conversion
+        by the param argument.
+
+        :returns: Positions of the matching sections in list order or None if the query is not supported.
+        :rtype: np.ndarray or None
+        '''
+        if within_slice:
+            selected = self._within(within_slice, within_use)
+            if selected is None:
+                return None
+        else:
+            selected = np.ones(len(self.name_codes), dtype=np.bool_)
+        if name:
+            code = self.names.get(name)
+            if code is None:
+                return np.array([], dtype=np.intp)
+            selected &= self.name_codes == code
+        if containing_index is not None:
+            # section start <= containing_index < section stop
+            containing = self._select(self.start.order[
+                :self.start.searchsorted(containing_index, 'right')])
+            containing &= self.stop.values > containing_index
+            selected &= containing
+        return np.flatnonzero(selected)
+
+    def surrounding(self, index):
+        '''
+        :returns: Positions of sections where section start <= index <= section stop in list order.
+        :rtype: np.ndarray
+        '''
+        surrounded = self._select(
+            self.start.order[:self.start.searchsorted(index, 'right')])
+        surrounded &= self.stop.values >= index
+        return np.flatnonzero(surrounded)
+
+
+class SectionNode(Node, ColumnarList):
     '''
     Derives from list to implement iteration and list methods.
 
@@ -1043,6 +1533,9 @@ class SectionNode(Node, list):
             self.create_section(sect, name=name)
         return self
 
+    def _build_columns(self):
+        return SectionColumns(self)
+
     #TODO: Accessor for 1Hz slice, 8Hz slice etc.
     def get_aligned(self, param):
         '''
@@ -1059,6 +1552,20 @@ class SectionNode(Node, list):
 
         multiplier = param.frequency / self.frequency
         offset = (self.offset - param.offset) * param.frequency
+        if len(self) >= NODE_COLUMNS_MIN_ITEMS:
+            try:
+                start_edges = _float_column(
+                    (section.start_edge for section in self), len(self))
+                stop_edges = _float_column(
+                    (section.stop_edge for section in self), len(self))
+            except ValueError:
+                pass
+            else:
+                aligned_node.extend(self._get_aligned_sections(
+                    aligned_node.get_name(), start_edges * multiplier + offset,
+                    stop_edges * multiplier + offset))
+                return aligned_node
+
         for section in self:
 
             if section.start_edge is None:
@@ -1083,6 +1590,36 @@ class SectionNode(Node, list):
                                         end=converted_stop)
         return aligned_node
 
+    def _get_aligned_sections(self, default_name, converted_starts,
+                              converted_stops):
+        '''
+        Vectorised equivalent of aligning each section within get_aligned
+        where no edges are None.
+
+        :param default_name: Name of sections without a name.
+        :type default_name: str
+        :param converted_starts: Start edges converted to the new frequency and offset.
+        :type converted_starts: np.ndarray
+        :param converted_stops: Stop edges converted to the new frequency and offset.
+        :type converted_stops: np.ndarray
+        :returns: Aligned sections.
+        :rtype: [Section]
+        '''
+        inner_slice_starts = np.ceil(converted_starts).astype(np.int64)
+        inner_slice_stops = np.ceil(converted_stops).astype(np.int64)
+        # dont allow minus start edges.
+        converted_starts = np.where(converted_starts < 0.0, 0.0,
+                                    converted_starts)
+        sections = []
+        for section, begin, end, start, stop in zip(
+                self, converted_starts.tolist(), converted_stops.tolist(),
+                inner_slice_starts.tolist(), inner_slice_stops.tolist()):
+            # As create_section, falsy edges default to the slice.
+            sections.append(Section(section.name or default_name,
+                                    slice(start, stop), begin or start,
+                                    end or stop))
+        return sections
+
     slice_attrgetters = {'start': attrgetter('slice.start'),
                          'stop': attrgetter('slice.stop')}
 
@@ -1105,15 +1642,10 @@ class SectionNode(Node, list):
         :returns: Either a condition function or None.
         :rtype: func or None
         '''
+        containing_index, within_slice = self._convert_query(
+            containing_index, within_slice, param)
         # Function for testing if Section is within a slice depending on
         # within_use.
-        if param is not None:
-            if within_slice:
-                # FIXME: This does not account for different offsets.
-                within_slice = slice_multiply(within_slice, param.hz)
-            if containing_index is not None:
-                containing_index = \
-                    containing_index * (self.hz / param.hz) + (self.hz * param.offset)
         if within_slice:
             within_func = lambda s, within: is_slice_within_slice(
                 s.slice, within, within_use=within_use)
@@ -1129,6 +1661,38 @@ class SectionNode(Node, list):
         return lambda e: (within_func(e, within_slice) and name_func(e) and
                           index_func(e))
 
+    def _convert_query(self, containing_index, within_slice, param):
+        '''
+        :param param: Param which containing_index and within_slice are sourced from, see _get_condition.
+        :type param: Node or None
+        :returns: containing_index and within_slice converted to the frequency of self.
+        :rtype: (int or float or None, slice or None)
+        '''
+        if param is not None:
+            if within_slice:
+                # FIXME: This does not account for different offsets.
+                within_slice = slice_multiply(within_slice, param.hz)
+            if containing_index is not None:
+                containing_index = \
+                    containing_index * (self.hz / param.hz) + (self.hz * param.offset)
+        return containing_index, within_slice
+
+    def _get_positions(self, name=None, containing_index=None,
+                       within_slice=None, within_use='slice', param=None):
+        '''
+        Columnar equivalent of _get_condition. Accepts the same arguments.
+
+        :returns: Positions of matching sections in list order, or None if the columns are not used (see get_columns).
+        :rtype: np.ndarray or None
+        '''
+        columns = self.get_columns()
+        if columns is None:
+            return None
+        containing_index, within_slice = self._convert_query(
+            containing_index, within_slice, param)
+        return columns.positions(name, containing_index, within_slice,
+                                 within_use)
+
     def get(self, **kwargs):
         '''
         Gets elements either within_slice or with name. Duplicated from
@@ -1139,6 +1703,9 @@ class SectionNode(Node, list):
         :returns: An object of the same type as self containing matching elements.
         :rtype: Section
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_items(positions)
         condition = self._get_condition(**kwargs)
         matching = [s for s in self if condition(s)]
         return self.__class__(name=self.name, frequency=self.frequency,
@@ -1152,6 +1719,11 @@ class SectionNode(Node, list):
         :returns: First Section matching conditions.
         :rtype: Section
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_extreme(
+                positions, self._columns.slice_columns[first_by].values,
+                np.argmin)
         matching = self.get(**kwargs)
         if matching:
             return min(matching, key=self.slice_attrgetters[first_by])
@@ -1166,6 +1738,11 @@ class SectionNode(Node, list):
         :returns: Last Section matching conditions.
         :rtype: Section
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_extreme(
+                positions, self._columns.slice_columns[last_by].values,
+                np.argmax)
         matching = self.get(**kwargs)
         if matching:
             return max(matching, key=self.slice_attrgetters[last_by])
@@ -1180,6 +1757,9 @@ class SectionNode(Node, list):
         :returns: An object of the same type as self containing elements ordered by index.
         :rtype: Section
         '''
+        positions = self._get_ordered_positions(order_by, **kwargs)
+        if positions is not None:
+            return self._get_items(positions)
         matching = self.get(**kwargs)
         ordered_by_start = sorted(matching,
                                   key=self.slice_attrgetters[order_by])
@@ -1203,6 +1783,12 @@ class SectionNode(Node, list):
         '''
         if frequency:
             index = index * (self.frequency / frequency)
+        if use in ('start', 'stop'):
+            positions = self._get_ordered_positions(**kwargs)
+            if positions is not None:
+                column = self._columns.slice_columns[use].values
+                after = np.flatnonzero(column[positions] > index)
+                return self[int(positions[after[0]])] if len(after) else None
         ordered = self.get_ordered_by_index(**kwargs)
         for elem in ordered:
             if getattr(elem.slice, use) > index:
@@ -1226,12 +1812,40 @@ class SectionNode(Node, list):
         '''
         if frequency:
             index = index * (self.frequency / frequency)
+        if use in ('start', 'stop'):
+            positions = self._get_ordered_positions(**kwargs)
+            if positions is not None:
+                column = self._columns.slice_columns[use].values
+                before = np.flatnonzero(column[positions] < index)
+                return self[int(positions[before[-1]])] if len(before) \
+                    else None
         ordered = self.get_ordered_by_index(**kwargs)
         for elem in reversed(ordered):
             if getattr(elem.slice, use) < index:
                 return elem
         return None
 
+    def _get_ordered_positions(self, order_by='start', **kwargs):
+        '''
+        Columnar equivalent of get_ordered_by_index.
+
+        :returns: Positions of matching sections ordered by index, or None if the columns are not used.
+        :rtype: np.ndarray or None
+        '''
+        positions = self._get_positions(**kwargs)
+        if positions is None:
+            return None
+        column = self._columns.slice_columns[order_by].values
+        return positions[np.argsort(column[positions], kind='mergesort')]
+
+    def _get_durations(self):
+        '''
+        :returns: Duration of each section in seconds, see slice_duration.
+        :rtype: np.ndarray
+        '''
+        return (self._columns.stop.values - self._columns.start.values) / \
+            float(self.hz)
+
     def get_longest(self, **kwargs):
         '''
         Gets the longest section matching the lookup criteria.
@@ -1240,6 +1854,10 @@ class SectionNode(Node, list):
         :returns: Longest section matching conditions.
         :rtype: item within self or None
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_extreme(positions, self._get_durations(),
+                                     np.argmax)
         matching = self.get(**kwargs)
         if not matching:
             return None
@@ -1253,6 +1871,10 @@ class SectionNode(Node, list):
         :returns: Shortest section matching conditions.
         :rtype: item within self or None
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_extreme(positions, self._get_durations(),
+                                     np.argmin)
         matching = self.get(**kwargs)
         if not matching:
             return None
@@ -1268,6 +1890,9 @@ class SectionNode(Node, list):
         :returns: List of surrounding sections
         :rtype: List of sections
         '''
+        columns = self.get_columns()
+        if columns is not None:
+            return self._get_items(columns.surrounding(index))
         surrounded = []
         for section in self:
             if section.slice.start <= index <= section.slice.stop or\
@@ -1325,7 +1950,87 @@ class ListNode(Node, list):
         return '%s' % pprint.pformat(list(self))
 
 
-class FormattedNameNode(ListNode):
+class NameRegistry(object):
+    '''
+    Names of a FormattedNameNode class compiled from its NAME_FORMAT and
+    NAME_VALUES. Each name is hashed to an integer code which maps back to
+    the combination of NAME_VALUES it was formatted from.
+    '''
+
+    def __init__(self, name_format, name_values, default_name):
+        '''
+        :param name_format: NAME_FORMAT of the class.
+        :type name_format: str
+        :param name_values: NAME_VALUES of the class.
+        :type name_values: dict
+        :param default_name: Name used when neither is defined.
+        :type default_name: str
+        '''
+        if not name_format and not name_values:
+            self.keys = ()
+            self.values = [()]
+            self.names = [default_name]
+        else:
+            self.keys = tuple(name_values.keys())
+            self.values = list(product(*(name_values[k] for k in self.keys)))
+            self.names = [name_format % dict(zip(self.keys, v))
+                          for v in self.values]
+        self.codes = {}
+        for code, name in enumerate(self.names):
+            self.codes.setdefault(name, code)
+        self._value_codes = None
+
+    def __contains__(self, name):
+        return name in self.codes
+
+    def get_name_values(self, name):
+        '''
+        :returns: The NAME_VALUES combination name was formatted from or None if name is not registered.
+        :rtype: dict or None
+        '''
+        code = self.codes.get(name)
+        if code is None:
+            return None
+        return dict(zip(self.keys, self.values[code]))
+
+    def _get_value_codes(self):
+        '''
+        :returns: Codes of the names formatted from each value of each key.
+        :rtype: {str: {object: set of int}}
+        '''
+        if self._value_codes is None:
+            value_codes = dict((key, {}) for key in self.keys)
+            for code, values in enumerate(self.values):
+                for key, value in zip(self.keys, values):
+                    value_codes[key].setdefault(value, set()).add(code)
+            self._value_codes = value_codes
+        return self._value_codes
+
+    def is_valid_name_values(self, name_values):
+        '''
+        :type name_values: dict
+        :returns: Whether every key and value is within NAME_VALUES.
+        :rtype: bool
+        '''
+        value_codes = self._get_value_codes()
+        return all(key in value_codes and value in value_codes[key]
+                   for key, value in six.iteritems(name_values))
+
+    def match(self, name_values):
+        '''
+        :param name_values: Values of NAME_VALUES keys, e.g. {'altitude': 20}.
+        :type name_values: dict
+        :returns: Names formatted from the values.
+        :rtype: set of str
+        '''
+        value_codes = self._get_value_codes()
+        codes = set(range(len(self.names)))
+        for key, value in six.iteritems(name_values):
+            codes &= value_codes.get(key, {}).get(value, set())
+        return set(self.names[code] for code in codes)
+
+
+class FormattedNameNode(ColumnarList, ListNode):
     '''
     NAME_FORMAT example:
     'Speed in %(phase)s at %(altitude)d ft'
@@ -1344,24 +2049,78 @@ class FormattedNameNode(ListNode):
         super(FormattedNameNode, self).__init__(*args, **kwargs)
         self.restrict_names = kwargs.get('restrict_names', True)
 
+    # Whether the items' values are stored within their columns.
+    _column_values = False
+
+    def _build_columns(self):
+        return ItemColumns(self, values=self._column_values)
+
+    @classmethod
+    def get_name_registry(cls):
+        """
+        The registry is compiled once per class and recompiled if NAME_FORMAT,
+        NAME_VALUES or name are replaced.
+
+        :rtype: NameRegistry
+        """
+        source = (cls.NAME_FORMAT, cls.NAME_VALUES, cls.name)
+        cached = cls.__dict__.get('_name_registry')
+        if cached is None or \
+           any(a is not b for a, b in zip(cached[0], source)):
+            cached = (source, NameRegistry(cls.NAME_FORMAT, cls.NAME_VALUES,
+                                           cls.get_name()))
+            cls._name_registry = cached
+        return cached[1]
+
     @classmethod
     def names(cls):
         """
         :returns: The product of all NAME_VALUES name combinations
         :rtype: list
         """
-        # XXX: cache option below disabled until required. Should we create this
-        # on init and remove the property instead?
-        ##if hasattr(cls, 'names'):
-        ##    return cls.names
-        if not cls.NAME_FORMAT and not cls.NAME_VALUES:
-            return [cls.get_name()]
-        names = []
-        for a in product(*cls.NAME_VALUES.values()):
-            name = cls.NAME_FORMAT % dict(zip(cls.NAME_VALUES.keys(), a))
-            names.append(name)
-        ##cls.names = names  #cache
-        return names
+        return list(cls.get_name_registry().names)
+
+    def get_aligned_indices(self, param):
+        '''
+        :param param: Node to align the indices of this node's items to.
+        :type param: Node subclass
+        :returns: Indices of this node's items aligned to the frequency and offset of param.
+        :rtype: np.ndarray
+        '''
+        multiplier = param.frequency / self.frequency
+        offset = (self.offset - param.offset) * param.frequency
+        indices = np.fromiter((item.index for item in self), dtype=np.float64,
+                              count=len(self))
+        # TODO: check for negative index following downsampling if use
+        # case arrises
+        return (indices * multiplier) + offset
+
+    def get_aligned_items(self, indices):
+        '''
+        :param indices: Aligned index of each item, see get_aligned_indices.
+        :type indices: np.ndarray
+        :returns: Copies of this node's items with their indices replaced.
+        :rtype: list
+        '''
+        aligned_items = []
+        for item, index in zip(self, indices.tolist()):
+            # Creating records is faster than copy.copy.
+            aligned_item = item.__class__(*item)
+            aligned_item.index = index
+            aligned_items.append(aligned_item)
+        return aligned_items
+
+    def get_aligned(self, param):
+        '''
+        :param param: Node to align this node to.
+        :type param: Node subclass
+        :returns: An copy of the node with its contents aligned to the frequency and offset of param.
+        :rtype: self.__class__
+        '''
+        aligned_node = self.__class__(self.name, param.frequency, param.offset)
+        aligned_node.extend(
+            self.get_aligned_items(self.get_aligned_indices(param)))
+        return aligned_node
 
     def _validate_name(self, name):
         """
@@ -1370,7 +2129,7 @@ class FormattedNameNode(ListNode):
         :type name: str
         :rtype: bool
         """
-        return name in self.names()
+        return name in self.get_name_registry()
 
     def format_name(self, replace_values={}, **kwargs):
         """
@@ -1396,7 +2155,8 @@ class FormattedNameNode(ListNode):
             raise ValueError("invalid name '%s'" % name)
         return name  # return as a confirmation it was successful
 
-    def _get_condition(self, within_slice=None, within_slices=None, name=None):
+    def _get_condition(self, within_slice=None, within_slices=None, name=None,
+                       name_values=None):
         '''
         Returns a condition function which checks if the element is within
         a slice or has a specified name if they are provided.
@@ -1407,6 +2167,8 @@ class FormattedNameNode(ListNode):
         :type within_slices: [slice]
         :param name: Only return elements with this name.
         :type name: str
+        :param name_values: Only return elements with a name formatted from these NAME_VALUES, e.g. {'altitude': 20}.
+        :type name_values: dict
         :returns: Either a condition function or None.
         :rtype: func or None
         '''
@@ -1420,25 +2182,71 @@ class FormattedNameNode(ListNode):
         name_func = lambda e: e.name == name
 
         if within_slices and name:
-            return lambda e: within_slices_func(e) and name_func(e)
+            condition = lambda e: within_slices_func(e) and name_func(e)
         elif within_slices:
-            return within_slices_func
+            condition = within_slices_func
         elif name:
-            #Q: If restrict names BUT the named item is in the list of objects
-            # contained, should we not return it anyway rather than raise?
-            if self.restrict_names and name not in self.names():
-                raise ValueError("Attempted to filter by invalid name '%s' "
-                                 "within '%s'." % (name,
-                                                   self.__class__.__name__))
-            return name_func
+            self._validate_filter_name(name)
+            condition = name_func
         else:
+            condition = None
+
+        if name_values is None:
+            return condition
+        names = self._get_filter_names(name_values)
+        if condition:
+            return lambda e: e.name in names and condition(e)
+        return lambda e: e.name in names
+
+    def _validate_filter_name(self, name):
+        '''
+        :raises ValueError: If names are restricted and name is invalid.
+        '''
+        #Q: If restrict names BUT the named item is in the list of objects
+        # contained, should we not return it anyway rather than raise?
+        if self.restrict_names and not self._validate_name(name):
+            raise ValueError("Attempted to filter by invalid name '%s' "
+                             "within '%s'." % (name, self.__class__.__name__))
+
+    def _get_filter_names(self, name_values):
+        '''
+        :type name_values: dict
+        :returns: Names formatted from name_values.
+        :rtype: set of str
+        :raises ValueError: If names are restricted and a key or value is not within NAME_VALUES.
+        '''
+        registry = self.get_name_registry()
+        if self.restrict_names and \
+           not registry.is_valid_name_values(name_values):
+            raise ValueError("Attempted to filter by invalid name values %s "
+                             "within '%s'." % (name_values,
+                                               self.__class__.__name__))
+        return registry.match(name_values)
+
+    def _get_positions(self, within_slice=None, within_slices=None,
+                       name=None, name_values=None):
+        '''
+        Columnar equivalent of _get_condition. Accepts the same arguments.
+
+        :returns: Positions of matching elements in list order, or None if the columns are not used (see get_columns).
+        :rtype: np.ndarray or None
+        '''
+        if self.get_columns() is None:
             return None
+        if within_slice and within_slices:
+            within_slices.append(within_slice)
+        elif within_slice:
+            within_slices = [within_slice]
+        if name and not within_slices:
+            self._validate_filter_name(name)
+        names = None if name_values is None else \
+            self._get_filter_names(name_values)
+        return self._columns.positions(within_slices, name, names)
 
     def get(self, **kwargs):
         '''
-        Gets elements either within_slice or with name.
-
-        Q: Could we get by name values rather than formatted name? For example
+        Gets elements either within_slice or with name. Elements may also be
+        selected by name values rather than formatted name, for example
         .get(name_values={'altitude': 20}) rather than
         .get(name='20 Ft Descending').
 
@@ -1446,6 +2254,9 @@ class FormattedNameNode(ListNode):
         :returns: An object of the same type as self containing elements ordered by index.
         :rtype: self.__class__
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_items(positions)
         condition = self._get_condition(**kwargs)
         matching = filter(condition, self) if condition else self
         return self.__class__(name=self.name, frequency=self.frequency,
@@ -1460,6 +2271,11 @@ class FormattedNameNode(ListNode):
         :returns: An object of the same type as self containing elements ordered by index.
         :rtype: self.__class__
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            indices = self._columns.index.values[positions]
+            return self._get_items(
+                positions[np.argsort(indices, kind='mergesort')])
         matching = self.get(**kwargs)
         ordered_by_index = sorted(matching, key=attrgetter('index'))
         return self.__class__(name=self.name, frequency=self.frequency,
@@ -1474,6 +2290,10 @@ class FormattedNameNode(ListNode):
         :returns: First element matching conditions.
         :rtype: item within self or None
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_extreme(positions, self._columns.index.values,
+                                     np.argmin)
         matching = self.get(**kwargs)
         if matching:
             return min(matching, key=attrgetter('index')) if matching else None
@@ -1489,6 +2309,10 @@ class FormattedNameNode(ListNode):
         :returns: Element with the lowest index matching criteria.
         :rtype: item within self or None
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_extreme(positions, self._columns.index.values,
+                                     np.argmax)
         matching = self.get(**kwargs)
         if matching:
             return max(matching, key=attrgetter('index')) if matching else None
@@ -1510,6 +2334,13 @@ class FormattedNameNode(ListNode):
         '''
         if frequency:
             index = index * (self.frequency / frequency)
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            indices = self._columns.index.values[positions]
+            after = indices > index
+            # the first of the lowest indices after index in list order
+            return self._get_extreme(positions[after], indices[after],
+                                     np.argmin, indexed=True)
         ordered = self.get_ordered_by_index(**kwargs)
         for elem in ordered:
             if elem.index > index:
@@ -1531,6 +2362,14 @@ class FormattedNameNode(ListNode):
         '''
         if frequency:
             index = index * (self.frequency / frequency)
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            indices = self._columns.index.values[positions]
+            before = indices < index
+            # the last of the highest indices before index in list order
+            positions, indices = positions[before][::-1], indices[before][::-1]
+            return self._get_extreme(positions, indices, np.argmax,
+                                     indexed=True)
         ordered = self.get_ordered_by_index(**kwargs)
         for elem in reversed(ordered):
             if elem.index < index:
@@ -1733,30 +2572,10 @@ class KeyTimeInstanceNode(FormattedNameNode):
                 state_changes(state, repaired_array, change, getattr(p, 'slice', p))
         return
 
-    def get_aligned(self, param):
-        '''
-        :param param: Node to align this KeyTimeInstanceNode to.
-        :type param: Node subclass
-        :returns: An copy of the KeyTimeInstanceNode with its contents aligned to the frequency and offset of param.
-        :rtype: KeyTimeInstanceNode
-        '''
-        multiplier = param.frequency / self.frequency
-        offset = (self.offset - param.offset) * param.frequency
-        aligned_node = self.__class__(self.name, param.frequency,
-                                      param.offset)
-        for kti in self:
-            aligned_kti = copy.copy(kti)
-            index_aligned = (kti.index * multiplier) + offset
-            # TODO: check for negative index following downsampling if use
-            # case arrises
-            aligned_kti.index = index_aligned
-            aligned_node.append(aligned_kti)
-
-        return aligned_node
-
 
 class KeyPointValueNode(FormattedNameNode):
     node_type_abbr = 'KPV'
+    _column_values = True
 
     def __init__(self, *args, **kwargs):
         super(KeyPointValueNode, self).__init__(*args, **kwargs)
@@ -1834,26 +2653,6 @@ class KeyPointValueNode(FormattedNameNode):
         self.debug('KPV %s' % kpv)
         return kpv
 
-    def get_aligned(self, param):
-        '''
-        :param param: Node to align this KeyPointValueNode to.
-        :type param: Node subclass
-        :returns: An copy of the KeyPointValueNode with its contents aligned to the frequency and offset of param.
-        :rtype: KeyPointValueNode
-        '''
-        multiplier = param.frequency / self.frequency
-        offset = (self.offset - param.offset) * param.frequency
-        aligned_node = self.__class__(self.name, param.frequency, param.offset)
-        for kpv in self:
-            aligned_kpv = copy.copy(kpv)
-            aligned_kpv.index = (aligned_kpv.index * multiplier) + offset
-            # TODO: check for negative index following downsampling if use
-            # case arrises
-            ##if aligned_kpv.slice:
-            ##    aligned_kpv.slice = align_slice(param, self, aligned_kpv.slice)
-            aligned_node.append(aligned_kpv)
-        return aligned_node
-
     def get_max(self, **kwargs):
         '''
         Gets the KeyPointValue with the maximum value optionally filter
@@ -1862,6 +2661,9 @@ class KeyPointValueNode(FormattedNameNode):
         :param kwargs: Passed into _get_condition (see docstring).
         :rtype: KeyPointValue
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_extreme(positions, self._columns.value, np.argmax)
         matching = self.get(**kwargs)
         if matching:
             return max(matching, key=attrgetter('value')) if matching else None
@@ -1876,6 +2678,9 @@ class KeyPointValueNode(FormattedNameNode):
         :param kwargs: Passed into _get_condition (see docstring).
         :rtype: KeyPointValue
         '''
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            return self._get_extreme(positions, self._columns.value, np.argmin)
         matching = self.get(**kwargs)
         if matching:
             return min(matching, key=attrgetter('value')) if matching else None
@@ -1890,8 +2695,14 @@ class KeyPointValueNode(FormattedNameNode):
         :param kwargs: Passed into _get_condition (see docstring).
         :rtype: KeyPointValueNode
         '''
-        matching = self.get(**kwargs)
-        ordered_by_value = sorted(matching, key=attrgetter('value'))
+        positions = self._get_positions(**kwargs)
+        if positions is not None:
+            values = self._columns.value[positions]
+            positions = positions[np.argsort(values, kind='mergesort')]
+            ordered_by_value = [self[p] for p in positions.tolist()]
+        else:
+            matching = self.get(**kwargs)
+            ordered_by_value = sorted(matching, key=attrgetter('value'))
         return KeyPointValueNode(name=self.name, frequency=self.frequency,
                                  offset=self.offset, items=ordered_by_value)
 
@@ -2425,6 +3236,90 @@ class ApproachNode(ListNode):
 App = ApproachNode
 
 
+class CanOperateCache(object):
+    '''
+    Results of derived nodes' can_operate keyed by the node, the available
+    dependencies and the values of the attributes passed into can_operate.
+    A single instance (can_operate_cache) is shared by every NodeManager
+    within the process when settings.CAN_OPERATE_CACHE is enabled.
+    '''
+
+    def __init__(self, max_size=CAN_OPERATE_CACHE_SIZE):
+        '''
+        :param max_size: The cache is cleared once it holds this many results.
+        :type max_size: int
+        '''
+        self.max_size = max_size
+        self._results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    @staticmethod
+    def key(node, available, attributes):
+        '''
+        :param node: Derived node class.
+        :type node: class
+        :param available: Available dependencies.
+        :type available: set or list of str
+        :param attributes: Attributes passed into can_operate.
+        :type attributes: [Attribute or None]
+        :rtype: tuple
+        '''
+        return (node, frozenset(available),
+                tuple(None if a is None else value_fingerprint(a.value)
+                      for a in attributes))
+
+    def get(self, key, func):
+        '''
+        Get the cached result for key or store the result of calling func.
+
+        :type key: tuple
+        :param func: Called without arguments if the result is not cached.
+        :type func: callable
+        :returns: Result of can_operate.
+        :rtype: bool
+        '''
+        try:
+            res = self._results[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return res
+        self.misses += 1
+        res = func()
+        if len(self._results) >= self.max_size:
+            self._results.clear()
+        self._results[key] = res
+        return res
+
+    def clear(self):
+        '''
+        Remove all results and reset the statistics.
+        '''
+        self._results.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        '''
+        :returns: Number of hits, misses and cached results and the hit rate.
+        :rtype: dict
+        '''
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._results),
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+        }
+
+
+can_operate_cache = CanOperateCache()
+
+
 class NodeManager(object):
     def __repr__(self):
         return 'NodeManager: x%d nodes in total' % (
@@ -2521,16 +3416,24 @@ class NodeManager(object):
             derived_node = self.derived_nodes[name]
             # NOTE: Raises "Unbound method" here due to can_operate being
             # overridden without wrapping with @classmethod decorator
-            attributes = []
-            argspec = inspect.getargspec(derived_node.can_operate)
-            if argspec.defaults:
-                for default in argspec.defaults:
-                    if not isinstance(default, Attribute):
-                        raise TypeError('Only Attributes may be keyword '
-                                        'arguments in can_operate methods.')
-                    attributes.append(self.get_attribute(default.name))
+            if isinstance(derived_node, type):
+                attribute_names = \
+                    derived_node.get_can_operate_attribute_names()
+            else:
+                attribute_names = \
+                    get_attribute_kwarg_names(derived_node.can_operate)
+            attributes = [self.get_attribute(attribute_name)
+                          for attribute_name in attribute_names]
             # can_operate expects attributes.
-            res = derived_node.can_operate(available, *attributes)
+            if CAN_OPERATE_CACHE and \
+                    getattr(derived_node, 'can_operate_cacheable', False):
+                key = CanOperateCache.key(derived_node, available,
+                                          attributes)
+                res = can_operate_cache.get(
+                    key, lambda: derived_node.can_operate(available,
+                                                          *attributes))
+            else:
+                res = derived_node.can_operate(available, *attributes)
             ##if not res:
             ##    logger.debug("Derived Node %s cannot operate with available nodes: %s",
             ##                 name, available)
@@ -0,0 +1,257 @@
+'''
+Lazy registry of derived nodes.
+
+get_derived_nodes imports every node module to create a name to class
+dictionary. A registry manifest records for each node name the module and
+class defining it, its dependency names and the names of attributes passed
+into its can_operate method, so that only the modules defining nodes within
+the dependency closure of the requested nodes need to be imported.
+
+The manifest is generated by build_registry, usually via:
+
+    python -m analysis_engine.node_registry path/to/registry.json
+
+and is regenerated automatically when the source of any registered module
+has changed. Set settings.NODE_REGISTRY_PATH to use the registry within
+process_flight.
+'''
+from __future__ import print_function
+
+import argparse
+import errno
+import hashlib
+import importlib
+import logging
+import os
+import pkgutil
+import simplejson as json
+import six
+import tempfile
+
+from analysis_engine import __version__, settings
+from analysis_engine.utils import get_derived_nodes
+
+
+logger = logging.getLogger(name=__name__)
+
+REGISTRY_VERSION = 1
+
+
+def _module_source_fingerprint(module_name):
+    '''
+    Fingerprint of a module's source file, found without importing the
+    module itself.
+
+    :type module_name: str
+    :returns: SHA1 hex digest of the source or None if not found.
+    :rtype: str or None
+    '''
+    try:
+        loader = pkgutil.find_loader(module_name)
+    except ImportError:
+        return None
+    if loader is None or not hasattr(loader, 'get_filename'):
+        return None
+    path = loader.get_filename(module_name)
+    if path.endswith(('.pyc', '.pyo')) and os.path.exists(path[:-1]):
+        path = path[:-1]
+    try:
+        with open(path, 'rb') as source_file:
+            return hashlib.sha1(source_file.read()).hexdigest()
+    except IOError:
+        return None
+
+
+def build_registry(modules):
+    '''
+    Import modules and create a registry manifest of the nodes within them.
+    Nodes within later modules take precedence as with get_derived_nodes.
+
+    :param modules: Module names to import.
+    :type modules: [str]
+    :returns: Registry manifest.
+    :rtype: dict
+    '''
+    nodes = {}
+    for module_name in modules:
+        for name, node in six.iteritems(get_derived_nodes([module_name])):
+            nodes[name] = {
+                'module': node.__module__,
+                'class': node.__name__,
+                'dependencies': node.get_dependency_names(),
+                'can_operate_attributes':
+                    list(node.get_can_operate_attribute_names()),
+                'source': module_name,
+            }
+    source_modules = set(modules)
+    source_modules.update(entry['module'] for entry in nodes.values())
+    return {
+        'version': REGISTRY_VERSION,
+        'analysis_engine': __version__,
+        'modules': list(modules),
+        'fingerprints': dict((m, _module_source_fingerprint(m))
+                             for m in source_modules),
+        'nodes': nodes,
+    }
+
+
+def registry_is_current(registry, modules):
+    '''
+    :returns: Whether the registry was built from the current source of modules.
+    :rtype: bool
+    '''
+    if registry.get('version') != REGISTRY_VERSION \
+            or registry.get('analysis_engine') != __version__ \
+            or registry.get('modules') != list(modules):
+        return False
+    for module_name, fingerprint in six.iteritems(registry['fingerprints']):
+        if fingerprint is None \
+                or _module_source_fingerprint(module_name) != fingerprint:
+            return False
+    return True
+
+
+def save_registry(registry, path):
+    '''
+    Write the registry to a temporary file before renaming so that concurrent
+    readers never see a partially written registry.
+    '''
+    dirname = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(dirname)
+    except OSError as err:
+        if err.errno != errno.EEXIST:
+            raise
+    fd, temp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+    with os.fdopen(fd, 'w') as registry_file:
+        json.dump(registry, registry_file, indent=1, sort_keys=True)
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        # Windows does not replace existing files.
+        os.remove(path)
+        os.rename(temp_path, path)
+
+
+def get_registry(modules, path):
+    '''
+    Load the registry from path, building and saving it if it does not exist
+    or is out of date.
+
+    :param modules: Module names to register nodes from.
+    :type modules: [str]
+    :param path: Path of registry manifest.
+    :type path: str
+    :rtype: dict
+    '''
+    try:
+        with open(path) as registry_file:
+            registry = json.load(registry_file)
+    except (IOError, ValueError):
+        registry = None
+    if registry is not None and registry_is_current(registry, modules):
+        return registry
+    logger.info("Building node registry '%s'.", path)
+    registry = build_registry(modules)
+    try:
+        save_registry(registry, path)
+    except (IOError, OSError):
+        logger.exception("Unable to save node registry '%s'.", path)
+    return registry
+
+
+def dependency_closure(registry, names):
+    '''
+    Names of registered nodes which names depend upon, including names
+    themselves.
+
+    :type registry: dict
+    :param names: Names of nodes to find the dependencies of.
+    :type names: iterable of str
+    :rtype: set of str
+    '''
+    nodes = registry['nodes']
+    closure = set()
+    stack = [name for name in names if name in nodes]
+    while stack:
+        name = stack.pop()
+        if name in closure:
+            continue
+        closure.add(name)
+        stack.extend(d for d in nodes[name]['dependencies']
+                     if d in nodes and d not in closure)
+    return closure
+
+
+def module_node_names(registry, module_name):
+    '''
+    :returns: Names of registered nodes found within module_name.
+    :rtype: [str]
+    '''
+    return [name for name, entry in six.iteritems(registry['nodes'])
+            if entry['source'] == module_name]
+
+
+def load_nodes(registry, names):
+    '''
+    Import registered nodes, only importing the modules which define them.
+
+    :type registry: dict
+    :param names: Names of nodes to import.
+    :type names: iterable of str
+    :returns: Node name to Node class.
+    :rtype: dict
+    '''
+    nodes = {}
+    for name in names:
+        entry = registry['nodes'][name]
+        module = importlib.import_module(entry['module'])
+        nodes[name] = getattr(module, entry['class'])
+    return nodes
+
+
+def get_lazy_derived_nodes(modules, names, path=None):
+    '''
+    Equivalent to get_derived_nodes(modules) restricted to names and the
+    nodes they depend upon. Uses the registry manifest at path (defaults to
+    settings.NODE_REGISTRY_PATH) to avoid importing modules which are not
+    required. All nodes are returned if names is empty.
+
+    :param modules: Module names to register nodes from.
+    :type modules: [str]
+    :param names: Names of nodes which are required.
+    :type names: iterable of str
+    :param path: Path of registry manifest.
+    :type path: str or None
+    :returns: Node name to Node class.
+    :rtype: dict
+    '''
+    if path is None:
+        path = settings.NODE_REGISTRY_PATH
+    registry = get_registry(modules, path)
+    names = list(names)
+    if not names:
+        return load_nodes(registry, registry['nodes'])
+    return load_nodes(registry, dependency_closure(registry, names))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a registry manifest of derived nodes.')
+    parser.add_argument('path', nargs='?',
+                        help='Path of registry manifest, defaults to '
+                        'settings.NODE_REGISTRY_PATH.')
+    parser.add_argument('-m', '--module', dest='modules', action='append',
+                        help='Additional node module to register.')
+    args = parser.parse_args()
+    path = args.path or settings.NODE_REGISTRY_PATH
+    if not path:
+        parser.error('A registry path is required when '
+                     'settings.NODE_REGISTRY_PATH is not set.')
+    registry = build_registry(settings.NODE_MODULES + (args.modules or []))
+    save_registry(registry, path)
+    print("Registered %d nodes within '%s'." % (len(registry['nodes']), path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+'''
+Persistent cache of execution plans (process order and spanning tree graph)
+calculated by dependency_order.
+
+For a given frame the valid HDF parameters, requested nodes and aircraft
+attributes rarely change, so the plan calculated for one segment can be
+reused for the following segments. Plans are keyed by a fingerprint of:
+
+ - the source files of the node modules and of the dependency graph code,
+ - hdf_keys, requested and required node names,
+ - which attributes are available and the values of those attributes
+   consulted by can_operate methods.
+
+Plans are stored as JSON within settings.PLAN_CACHE_DIR.
+'''
+import errno
+import logging
+import os
+import simplejson as json
+import sys
+import tempfile
+
+from analysis_engine import __version__, settings
+from analysis_engine.dependency_graph import _dependency_order, SpanningTree
+from analysis_engine.fingerprint import value_fingerprint
+
+
+logger = logging.getLogger(name=__name__)
+
+# Fingerprints of module source files keyed by (path, modification time).
+_FILE_FINGERPRINTS = {}
+
+
+def _module_fingerprint(module_name):
+    '''
+    Fingerprint of a module's source file, or of the module name if the
+    source file is not available.
+    '''
+    module = sys.modules.get(module_name)
+    path = getattr(module, '__file__', None)
+    if not path:
+        return value_fingerprint(module_name)
+    if path.endswith(('.pyc', '.pyo')) and os.path.exists(path[:-1]):
+        path = path[:-1]
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return value_fingerprint(module_name)
+    if key not in _FILE_FINGERPRINTS:
+        with open(path, 'rb') as source_file:
+            _FILE_FINGERPRINTS[key] = value_fingerprint(source_file.read())
+    return _FILE_FINGERPRINTS[key]
+
+
+def _can_operate_attribute_names(derived_nodes):
+    '''
+    :returns: Names of attributes which are passed into can_operate methods.
+    :rtype: set
+    '''
+    names = set()
+    for node in derived_nodes.values():
+        names.update(node.get_can_operate_attribute_names())
+    return names
+
+
+def plan_key(node_mgr):
+    '''
+    Fingerprint of everything which determines the execution plan calculated
+    by dependency_order for node_mgr.
+
+    :type node_mgr: NodeManager
+    :rtype: str
+    '''
+    modules = set(node.__module__ for node in node_mgr.derived_nodes.values())
+    modules.update(('analysis_engine.dependency_graph',
+                    'analysis_engine.node'))
+    attributes = {}
+    for source in (node_mgr.aircraft_info, node_mgr.achieved_flight_record,
+                   node_mgr.segment_info):
+        attributes.update(source)
+    consulted = _can_operate_attribute_names(node_mgr.derived_nodes)
+    return value_fingerprint({
+        'version': __version__,
+        'modules': dict((m, _module_fingerprint(m)) for m in modules),
+        'derived_nodes': sorted(node_mgr.derived_nodes),
+        'hdf_keys': sorted(node_mgr.hdf_keys),
+        'requested': sorted(node_mgr.requested),
+        'required': sorted(node_mgr.required),
+        'attributes': sorted(attributes),
+        'attribute_values': dict((name, attributes[name]) for name in consulted
+                                 if name in attributes),
+    })
+
+
+def _load_plan(path):
+    with open(path) as plan_file:
+        plan = json.load(plan_file)
+    gr_st = SpanningTree.fromdict(plan['graph'])
+    return plan['process_order'], gr_st
+
+
+def _save_plan(path, process_order, gr_st):
+    '''
+    Write the plan to a temporary file before renaming so that concurrent
+    readers never see a partially written plan.
+    '''
+    dirname = os.path.dirname(path)
+    try:
+        os.makedirs(dirname)
+    except OSError as err:
+        if err.errno != errno.EEXIST:
+            raise
+    fd, temp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+    with os.fdopen(fd, 'w') as plan_file:
+        json.dump({'process_order': process_order,
+                   'graph': gr_st.todict()}, plan_file)
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        # Another process saved the same plan first (Windows).
+        os.remove(temp_path)
+
+
+def cached_dependency_order(node_mgr, cache_dir=None):
+    '''
+    Get the process order and spanning tree graph for node_mgr from the plan
+    cache if available, otherwise calculate them with dependency_order and
+    add them to the cache.
+
+    :param node_mgr: Node manager to calculate the execution plan for.
+    :type node_mgr: NodeManager
+    :param cache_dir: Directory of cached plans, defaults to settings.PLAN_CACHE_DIR. Plans are not cached if None.
+    :type cache_dir: str or None
+    :returns: List of Nodes determining the order for processing and the spanning tree graph.
+    :rtype: (list of strings, SpanningTree)
+    '''
+    if cache_dir is None:
+        cache_dir = settings.PLAN_CACHE_DIR
+    if cache_dir is None:
+        return _dependency_order(node_mgr, draw=False)
+
+    path = os.path.join(cache_dir, plan_key(node_mgr) + '.json')
+    if os.path.exists(path):
+        try:
+            process_order, gr_st = _load_plan(path)
+        except (IOError, ValueError, KeyError):
+            logger.warning("Ignoring unreadable cached plan '%s'.", path)
+        else:
+            logger.info("Using cached execution plan '%s'.", path)
+            return process_order, gr_st
+
+    process_order, gr_st = _dependency_order(node_mgr, draw=False)
+    try:
+        _save_plan(path, process_order, gr_st)
+    except (IOError, OSError):
+        logger.exception("Unable to cache execution plan '%s'.", path)
+    return process_order, gr_st
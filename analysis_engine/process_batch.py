@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Batch processing of many flight segments over a pool of worker processes.
+
+Each worker process imports the node modules and collects the derived nodes
+once when it starts, rather than once per segment, and then processes
+segments until the batch is complete. Results are written as one JSON (and
+optionally CSV) file per segment, named after the segment's HDF file,
+alongside a summary of the whole batch. Segments whose HDF files share a name
+are prefixed with their position within the batch.
+
+Segments are provided either as a directory containing HDF files or as a JSON
+manifest listing each segment file with its metadata::
+
+    [
+        {
+            "file": "/data/G-ABCD_1.hdf5",
+            "tail_number": "G-ABCD",
+            "segment_info": {"Segment Type": "START_AND_STOP",
+                             "Start Datetime": "2015-01-01T13:00:00+00:00"},
+            "aircraft_info": {"Family": "A320"},
+            "achieved_flight_record": {"AFR Flight Number": "1234"}
+        },
+        ...
+    ]
+
+Only "file" is required. Relative paths are resolved from the directory of
+the manifest.
+'''
+
+from __future__ import print_function
+
+import argparse
+import glob
+import itertools
+import logging
+import multiprocessing
+import os
+import shutil
+import simplejson as json
+import six
+import sys
+import time
+import traceback
+
+from collections import Counter
+from dateutil import parser as date_parser
+
+from analysis_engine import settings
+from analysis_engine.json_tools import (process_flight_to_json,
+                                        PROCESS_FLIGHT_RESULT_KEYS)
+from analysis_engine.process_flight import process_flight
+from analysis_engine.utils import get_derived_nodes
+
+
+logger = logging.getLogger(name=__name__)
+
+HDF_EXTENSIONS = ('.hdf5', '.hdf')
+
+SUMMARY_FILENAME = 'summary.json'
+
+# Derived nodes collected once within each worker process.
+_worker_derived_nodes = None
+
+
+def load_manifest(path, tail_number=None):
+    '''
+    Load segment jobs from a JSON manifest file or from the HDF files within
+    a directory.
+
+    :param path: Path to a JSON manifest or a directory of HDF files.
+    :type path: str
+    :param tail_number: Tail number used for segments which do not specify one.
+    :type tail_number: str or None
+    :returns: Segment jobs with keys 'file', 'tail_number', 'segment_info', 'aircraft_info' and 'achieved_flight_record'.
+    :rtype: [dict]
+    '''
+    if os.path.isdir(path):
+        entries = [{'file': file_path} for file_path in sorted(
+            itertools.chain.from_iterable(
+                glob.glob(os.path.join(path, '*' + extension))
+                for extension in HDF_EXTENSIONS))]
+        base_dir = path
+    else:
+        with open(path) as manifest:
+            entries = json.load(manifest)
+        base_dir = os.path.dirname(os.path.abspath(path))
+
+    return [segment_job(entry, base_dir=base_dir, tail_number=tail_number)
+            for entry in entries]
+
+
+def segment_job(entry, base_dir='', tail_number=None):
+    '''
+    Create a segment job from a manifest entry.
+
+    :param entry: Manifest entry, see module docstring.
+    :type entry: dict
+    :param base_dir: Directory which relative paths are resolved from.
+    :type base_dir: str
+    :param tail_number: Tail number used if the entry does not specify one.
+    :type tail_number: str or None
+    :returns: Segment job with keys 'file', 'tail_number', 'segment_info', 'aircraft_info' and 'achieved_flight_record'.
+    :rtype: dict
+    :raises ValueError: If the entry is missing 'file'.
+    '''
+    if 'file' not in entry:
+        raise ValueError("Manifest entry is missing 'file': %s" % entry)
+    segment_info = dict(entry.get('segment_info') or {})
+    start_datetime = segment_info.get('Start Datetime')
+    if isinstance(start_datetime, six.string_types):
+        segment_info['Start Datetime'] = date_parser.parse(start_datetime)
+    return {
+        'file': os.path.join(base_dir, entry['file']),
+        'tail_number': entry.get('tail_number', tail_number),
+        'segment_info': segment_info,
+        'aircraft_info': entry.get('aircraft_info') or {},
+        'achieved_flight_record': entry.get('achieved_flight_record') or {},
+    }
+
+
+def output_names(jobs):
+    '''
+    Name the output files of each segment job after its HDF file. Names
+    shared by more than one job are prefixed with the job's position so that
+    their output files do not overwrite each other.
+
+    :param jobs: Segment jobs as returned by load_manifest.
+    :type jobs: [dict]
+    :returns: Output name of each job.
+    :rtype: [str]
+    '''
+    names = [os.path.splitext(os.path.basename(job['file']))[0]
+             for job in jobs]
+    counts = Counter(names)
+    return [name if counts[name] == 1 else '%d_%s' % (index, name)
+            for index, name in enumerate(names)]
+
+
+def _init_worker(node_modules):
+    '''
+    Import the node modules and collect derived nodes once per worker process.
+    '''
+    global _worker_derived_nodes
+    _worker_derived_nodes = get_derived_nodes(node_modules)
+
+
+def process_segment(job, output_dir, name=None, copy=True, csv=True,
+                    **kwargs):
+    '''
+    Process a single segment job and write its results to output_dir.
+
+    Exceptions are logged and recorded in the returned summary rather than
+    raised so that the remainder of the batch is processed.
+
+    :param job: Segment job as returned by load_manifest.
+    :type job: dict
+    :param output_dir: Directory to write results to.
+    :type output_dir: str
+    :param name: Name of the output files (see output_names), defaults to the name of the HDF file.
+    :type name: str or None
+    :param copy: Process a copy of the HDF file rather than the original.
+    :type copy: bool
+    :param csv: Write a CSV of the processing results.
+    :type csv: bool
+    :param kwargs: Keyword arguments passed into process_flight.
+    :returns: Summary of processing the segment.
+    :rtype: dict
+    '''
+    hdf_path = job['file']
+    if name is None:
+        name = os.path.splitext(os.path.basename(hdf_path))[0]
+    summary = {'file': hdf_path, 'status': 'failed'}
+    start = time.time()
+    try:
+        if copy:
+            hdf_path = os.path.join(
+                output_dir, name + '_process' + os.path.splitext(hdf_path)[1])
+            shutil.copy(job['file'], hdf_path)
+        segment_info = dict(job['segment_info'], File=hdf_path)
+        res = process_flight(
+            segment_info, job['tail_number'],
+            aircraft_info=dict(job['aircraft_info']),
+            achieved_flight_record=job['achieved_flight_record'],
+            derived_nodes=_worker_derived_nodes, **kwargs)
+
+        json_dest = os.path.join(output_dir, name + '.json')
+        with open(json_dest, 'w') as json_file:
+            json_file.write(process_flight_to_json(res))
+        summary['json'] = json_dest
+
+        if csv:
+            from analysis_engine.plot_flight import csv_flight_details
+            flat = {k: list(itertools.chain.from_iterable(six.itervalues(res[k])))
+                    for k in PROCESS_FLIGHT_RESULT_KEYS}
+            csv_dest = os.path.join(output_dir, name + '.csv')
+            csv_flight_details(hdf_path, flat['kti'], flat['kpv'],
+                               flat['phases'], dest_path=csv_dest)
+            summary['csv'] = csv_dest
+
+        summary['counts'] = {k: sum(len(items) for items in six.itervalues(res[k]))
+                             for k in PROCESS_FLIGHT_RESULT_KEYS}
+        summary['status'] = 'success'
+    except Exception as err:
+        logger.exception("Failed to process segment '%s'.", job['file'])
+        summary['error'] = '%s: %s' % (err.__class__.__name__, err)
+        summary['traceback'] = traceback.format_exc()
+    summary['duration'] = time.time() - start
+    return summary
+
+
+def _process_segment_star(args):
+    '''
+    Unpack arguments for Pool.imap_unordered.
+    '''
+    job, output_dir, name, kwargs = args
+    return process_segment(job, output_dir, name=name, **kwargs)
+
+
+def process_batch(jobs, output_dir, processes=None, additional_modules=[],
+                  **kwargs):
+    '''
+    Process segment jobs over a pool of worker processes and write a summary
+    of the batch to output_dir.
+
+    :param jobs: Segment jobs as returned by load_manifest.
+    :type jobs: [dict]
+    :param output_dir: Directory to write results to.
+    :type output_dir: str
+    :param processes: Number of worker processes, defaults to the number of CPUs. A value of 1 processes the segments within the calling process.
+    :type processes: int or None
+    :param additional_modules: List of module paths to import in addition to settings.NODE_MODULES.
+    :type additional_modules: [str]
+    :param kwargs: Keyword arguments passed into process_segment.
+    :returns: Summary of the batch.
+    :rtype: dict
+    '''
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    node_modules = settings.NODE_MODULES + additional_modules
+    args = [(job, output_dir, name, kwargs)
+            for job, name in zip(jobs, output_names(jobs))]
+
+    start = time.time()
+    if processes == 1:
+        _init_worker(node_modules)
+        segments = [_process_segment_star(a) for a in args]
+    else:
+        pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                    initargs=(node_modules,))
+        try:
+            segments = []
+            for summary in pool.imap_unordered(_process_segment_star, args):
+                logger.info("Processed '%s' (%s) in %.2f secs.",
+                            summary['file'], summary['status'],
+                            summary['duration'])
+                segments.append(summary)
+        finally:
+            pool.close()
+            pool.join()
+
+    summary = {
+        'duration': time.time() - start,
+        'success': sum(1 for s in segments if s['status'] == 'success'),
+        'failed': sum(1 for s in segments if s['status'] != 'success'),
+        'segments': sorted(segments, key=lambda s: s['file']),
+    }
+    with open(os.path.join(output_dir, SUMMARY_FILENAME), 'w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+    return summary
+
+
+def main():
+    print('FlightDataBatchAnalyzer (c) Copyright 2013 Flight Data Services, Ltd.')
+    print('  - Powered by POLARIS')
+    print('  - http://www.flightdatacommunity.com')
+    print()
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler(stream=sys.stdout))
+    parser = argparse.ArgumentParser(
+        description="Process many flight segments in parallel.")
+    parser.add_argument('source', type=str,
+                        help='Directory of HDF files or JSON manifest of segments.')
+    parser.add_argument('-o', '--output-dir', dest='output_dir', required=True,
+                        help='Directory to write results to.')
+    parser.add_argument('-p', '--processes', dest='processes', type=int,
+                        default=None, help='Number of worker processes.')
+    parser.add_argument('-tail', '--tail', dest='tail_number',
+                        default='G-FDSL',  # as per flightdatacommunity file
+                        help='Aircraft tail number for segments without one.')
+    parser.add_argument('-r', '--requested', type=str, nargs='+',
+                        dest='requested', default=[], help='Requested nodes.')
+    parser.add_argument('-R', '--required', type=str, nargs='+', dest='required',
+                        default=[], help='Required nodes.')
+    help = 'Disable writing a CSV of the processing results.'
+    parser.add_argument('-disable-csv', dest='disable_csv',
+                        action='store_true', help=help)
+    help = 'Process the HDF files in place rather than copies within the output directory.'
+    parser.add_argument('--in-place', dest='in_place', action='store_true',
+                        help=help)
+    parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
+                        help='Verbose logging')
+    args = parser.parse_args()
+
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+
+    if not os.path.exists(args.source):
+        parser.error('Source not found: %s' % args.source)
+
+    jobs = load_manifest(args.source, tail_number=args.tail_number)
+    logger.info("Processing %d segments.", len(jobs))
+    summary = process_batch(
+        jobs, args.output_dir, processes=args.processes,
+        copy=not args.in_place, csv=not args.disable_csv,
+        requested=args.requested, required=args.required)
+    logger.info("Processed %d segments (%d failed) in %.2f secs. Summary "
+                "written to %s", summary['success'] + summary['failed'],
+                summary['failed'], summary['duration'],
+                os.path.join(args.output_dir, SUMMARY_FILENAME))
+
+
+if __name__ == '__main__':
+    main()
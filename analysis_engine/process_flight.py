@@ -1,23 +1,39 @@
 from __future__ import print_function
 
 import argparse
+import heapq
 import itertools
 import json
 import logging
+import numpy as np
 import os
+import select
+import signal
 import six
 import sys
-
-from datetime import datetime, timedelta
+import tempfile
+import threading
+import time
+import traceback
+
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing.pool import ThreadPool
 from networkx.readwrite import json_graph
+from six.moves import cPickle
 
 from flightdatautilities.filesystem_tools import copy_file
 
 from hdfaccess.file import hdf_file
 
 from analysis_engine import hooks, settings, __version__
-from analysis_engine.dependency_graph import dependency_order
-from analysis_engine.json_tools import json_to_process_flight, process_flight_to_nodes
+from analysis_engine.exceptions import NodeBudgetExceeded
+from analysis_engine.fingerprint import node_fingerprints
+from analysis_engine.json_tools import (json_to_process_flight,
+                                        process_flight_to_json,
+                                        process_flight_to_nodes,
+                                        PROCESS_FLIGHT_RESULT_KEYS)
 from analysis_engine.library import np_ma_masked_zeros, repair_mask
 from analysis_engine.node import (ApproachNode, Attribute,
                                   derived_param_from_hdf,
@@ -25,33 +41,76 @@ from analysis_engine.node import (ApproachNode, Attribute,
                                   FlightAttributeNode,
                                   KeyPointValueNode,
                                   KeyTimeInstanceNode,
-                                  NodeManager, P, Section, SectionNode,
+                                  NodeCache, NodeManager, P, Section,
+                                  SectionNode,
                                   NODE_SUBCLASSES)
-from analysis_engine.settings import NODE_CACHE
+from analysis_engine.node_registry import (dependency_closure, get_registry,
+                                           load_nodes, module_node_names)
+from analysis_engine.plan_cache import cached_dependency_order
+from analysis_engine.quick_look import QuickLookHDF
+from analysis_engine.scheduling import (costs_path, needs_costs, save_costs,
+                                        schedule)
+from analysis_engine.settings import (NODE_BUDGETS, NODE_CACHE,
+                                      NODE_CACHE_EVICTION,
+                                      NODE_MEMORY_BUDGET, NODE_PRIORITIES,
+                                      NODE_PRIORITY_DEFAULT, NODE_TIME_BUDGET)
 from analysis_engine.utils import get_aircraft_info, get_derived_nodes
+from analysis_engine.write_behind import WriteBehindHDF
+
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None
 
 
 logger = logging.getLogger(__name__)
 
+# Seconds between checking whether a node has exceeded its budget (see
+# settings.NODE_BUDGETS).
+BUDGET_POLL_INTERVAL = 0.05
 
+# Seconds iter_process_flight waits for the processing thread to stop when the
+# generator is closed.
+STOP_TIMEOUT = 1.0
 
-def geo_locate(hdf, items):
+try:
+    # CPU time of the calling thread (Python 3.7+).
+    _thread_cpu_time = time.thread_time
+except AttributeError:
+    _thread_cpu_time = time.clock
+
+
+def _geo_positions(hdf, lat_hdf=None, lon_hdf=None):
     '''
-    Translate KeyTimeInstance into GeoKeyTimeInstance namedtuples
+    Prepare 'Latitude Smoothed' and 'Longitude Smoothed' for geo-locating
+    items.
+
+    :param lat_hdf: 'Latitude Smoothed' if already available, otherwise loaded from the hdf.
+    :type lat_hdf: Parameter or None
+    :param lon_hdf: 'Longitude Smoothed' if already available, otherwise loaded from the hdf.
+    :type lon_hdf: Parameter or None
+    :returns: Latitude and longitude parameters with repaired masks or None if unavailable.
+    :rtype: (DerivedParameterNode, DerivedParameterNode) or None
     '''
-    if 'Latitude Smoothed' not in hdf.valid_param_names() \
-       or 'Longitude Smoothed' not in hdf.valid_param_names():
-        logger.warning("Could not geo-locate as either 'Latitude Smoothed' or "
-                       "'Longitude Smoothed' were not found within the hdf.")
-        return items
-    
-    lat_hdf = hdf['Latitude Smoothed']
-    lon_hdf = hdf['Longitude Smoothed']
+    if lat_hdf is None or lon_hdf is None:
+        valid_names = hdf.valid_param_names()
+        if (lat_hdf is None and 'Latitude Smoothed' not in valid_names) \
+           or (lon_hdf is None and 'Longitude Smoothed' not in valid_names):
+            logger.warning("Could not geo-locate as either 'Latitude Smoothed' "
+                           "or 'Longitude Smoothed' were not found within the "
+                           "hdf.")
+            return None
+        if lat_hdf is None:
+            lat_hdf = hdf['Latitude Smoothed']
+        if lon_hdf is None:
+            lon_hdf = hdf['Longitude Smoothed']
     
     if (not lat_hdf.array.count()) or (not lon_hdf.array.count()):
         logger.warning("Could not geo-locate as either 'Latitude Smoothed' or "
                        "'Longitude Smoothed' have no unmasked values.")
-        return items
+        return None
     
     lat_pos = derived_param_from_hdf(lat_hdf)
     lon_pos = derived_param_from_hdf(lon_hdf)
@@ -62,10 +121,100 @@ def geo_locate(hdf, items):
     # extrapolate=True we achieve this goal.
     lat_pos.array = repair_mask(lat_pos.array, repair_duration=None, extrapolate=True)
     lon_pos.array = repair_mask(lon_pos.array, repair_duration=None, extrapolate=True)
-    
-    for item in itertools.chain.from_iterable(six.itervalues(items)):
-        item.latitude = lat_pos.at(item.index) or None
-        item.longitude = lon_pos.at(item.index) or None
+    return lat_pos, lon_pos
+
+
+def _result_items(*results):
+    '''
+    :param results: KPV or KTI results, i.e. dicts of node name to items.
+    :type results: dict
+    :returns: Items of all results.
+    :rtype: list
+    '''
+    return list(itertools.chain.from_iterable(
+        itertools.chain.from_iterable(six.itervalues(r) for r in results)))
+
+
+def _item_indices(items):
+    return np.fromiter((item.index for item in items), dtype=np.float64,
+                       count=len(items))
+
+
+def _values_at(param, indices):
+    '''
+    Equivalent of param.at(index) for each of indices, interpolating all
+    indices within a single call when the array is not masked.
+
+    :type param: Parameter
+    :type indices: np.ndarray
+    :returns: Value of param at each index, None where masked.
+    :rtype: list
+    '''
+    if np.ma.count_masked(param.array):
+        return [param.at(index) for index in indices.tolist()]
+    # Same rounding of the offset and clipping to the ends of the array as
+    # value_at_time.
+    locations = (indices - round(param.offset - 0.0000005, 6)) \
+        * param.frequency
+    data = np.ma.getdata(param.array)
+    return np.interp(locations, np.arange(len(data)), data).tolist()
+
+
+def _set_item_positions(positions, items):
+    '''
+    Set the latitude and longitude of items from positions (see
+    _geo_positions).
+
+    :type items: list
+    '''
+    if not items:
+        return
+    lat_pos, lon_pos = positions
+    indices = _item_indices(items)
+    latitudes = _values_at(lat_pos, indices)
+    longitudes = _values_at(lon_pos, indices)
+    for item, latitude, longitude in zip(items, latitudes, longitudes):
+        item.latitude = latitude or None
+        item.longitude = longitude or None
+
+
+def _set_item_datetimes(start_datetime, items):
+    '''
+    Set the datetime of items to start_datetime plus their index in seconds
+    (rounded to the microsecond as timedelta does).
+
+    :type start_datetime: datetime
+    :type items: list
+    '''
+    if not items:
+        return
+    microseconds = np.round(_item_indices(items) * 1e6).astype(np.int64)
+    # Aware datetime arithmetic ignores the timezone, so add the offsets to
+    # the naive datetime and restore tzinfo afterwards.
+    tzinfo = start_datetime.tzinfo
+    start = np.datetime64(start_datetime.replace(tzinfo=None), 'us')
+    datetimes = (start + microseconds.astype('timedelta64[us]')).tolist()
+    for item, item_datetime in zip(items, datetimes):
+        item.datetime = item_datetime.replace(tzinfo=tzinfo) \
+            if tzinfo else item_datetime
+
+
+def _set_positions(positions, items):
+    '''
+    Set the latitude and longitude of items from positions (see
+    _geo_positions).
+    '''
+    _set_item_positions(positions, _result_items(items))
+    return items
+
+
+def geo_locate(hdf, items):
+    '''
+    Translate KeyTimeInstance into GeoKeyTimeInstance namedtuples
+    '''
+    positions = _geo_positions(hdf)
+    if positions:
+        _set_positions(positions, items)
     return items
 
 
@@ -78,11 +227,188 @@ def _timestamp(start_datetime, items):
     :param item_list: list of objects with a .index attribute
     :type item_list: list
     '''
-    for item in itertools.chain.from_iterable(six.itervalues(items)):
-        item.datetime = start_datetime + timedelta(seconds=float(item.index))
+    _set_item_datetimes(start_datetime, _result_items(items))
     return items
 
 
+class _ResultStream(object):
+    '''
+    derive_parameters callback which passes each node's results to
+    callback(key, name, items) as soon as they are available.
+
+    KPVs and KTIs are timestamped and geo-located before being passed on, so
+    they are held back until 'Latitude Smoothed' and 'Longitude Smoothed' have
+    been derived when either is within the process order.
+    '''
+    position_names = ('Latitude Smoothed', 'Longitude Smoothed')
+
+    def __init__(self, hdf, node_mgr, process_order, start_datetime, callback):
+        self.hdf = hdf
+        self.start_datetime = start_datetime
+        self.callback = callback
+        hdf_keys = set(node_mgr.hdf_keys)
+        # Position parameters which will be derived.
+        self.waiting = set(name for name in self.position_names
+                           if name in process_order and name not in hdf_keys)
+        self.position_nodes = {}
+        self.held = []
+        self.positions = None if self.waiting else _geo_positions(hdf)
+
+    def __call__(self, name, node, key, items):
+        if name in self.waiting:
+            self.position_nodes[name] = node
+            self.waiting.discard(name)
+            if not self.waiting:
+                self._release_held()
+        if key is None:
+            return
+        elif key in ('kti', 'kpv') and self.waiting:
+            self.held.append((key, name, items))
+        else:
+            self._send(key, name, items)
+
+    def _release_held(self):
+        self.waiting.clear()
+        self.positions = _geo_positions(
+            self.hdf, *[self.position_nodes.get(n) for n in self.position_names])
+        for held in self.held:
+            self._send(*held)
+        self.held = []
+
+    def _send(self, key, name, items):
+        if key in ('kti', 'kpv'):
+            _timestamp(self.start_datetime, {name: items})
+            if self.positions:
+                _set_positions(self.positions, {name: items})
+        self.callback(key, name, items)
+
+    def close(self):
+        '''
+        Pass on any results which are still held back.
+        '''
+        if self.waiting:
+            self._release_held()
+
+
+class _Checkpoint(object):
+    '''
+    derive_parameters callback which records the nodes within process_order
+    as they are derived and periodically writes their results to a sidecar
+    file, so that process_flight can resume from the last completed node
+    after a crash (see process_flight's checkpoint argument). Derived
+    parameters have already been saved to the HDF file, so only their names
+    are recorded.
+    '''
+
+    def __init__(self, path, process_order, completed=(), results=None,
+                 callback=None, interval=None):
+        '''
+        :param path: Path of the checkpoint file.
+        :type path: str
+        :param process_order: Process order the checkpoint is valid for.
+        :type process_order: [str]
+        :param completed: Names of nodes completed by a previous run.
+        :type completed: iterable of str
+        :param results: Results of nodes completed by a previous run in the process_flight results format.
+        :type results: dict or None
+        :param callback: Called with each node before it is recorded (see derive_parameters).
+        :type callback: callable or None
+        :param interval: Minimum number of seconds between writes, defaults to settings.CHECKPOINT_INTERVAL.
+        :type interval: float or None
+        '''
+        self.path = path
+        self.process_order = list(process_order)
+        self.completed = list(completed)
+        self.completed_names = set(self.completed)
+        self.results = {key: {} for key in PROCESS_FLIGHT_RESULT_KEYS}
+        for key, nodes in six.iteritems(results or {}):
+            if key in self.results:
+                self.results[key].update(nodes)
+        self.callback = callback
+        self.interval = settings.CHECKPOINT_INTERVAL \
+            if interval is None else interval
+        self.written = time.time()
+        self.pending = False
+
+    def __call__(self, name, node, key, items):
+        if self.callback:
+            self.callback(name, node, key, items)
+        if name not in self.completed_names:
+            self.completed.append(name)
+            self.completed_names.add(name)
+        if key is not None:
+            self.results[key][name] = items
+        self.pending = True
+        if time.time() - self.written >= self.interval:
+            self.write()
+
+    def write(self):
+        '''
+        Write the checkpoint if nodes have completed since it was last
+        written. The file is replaced atomically so that a crash while
+        writing leaves the previous checkpoint intact.
+        '''
+        if not self.pending:
+            return
+        checkpoint = {
+            'version': __version__,
+            'process_order': self.process_order,
+            'completed': self.completed,
+            'results': json.loads(
+                process_flight_to_json(self.results, indent=None)),
+        }
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        with os.fdopen(fd, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.rename(temp_path, self.path)
+        self.written = time.time()
+        self.pending = False
+        logger.debug("Checkpoint of %d nodes written to '%s'.",
+                     len(self.completed), self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def load(path, process_order):
+        '''
+        Load a checkpoint written by a previous run with the same process
+        order and version.
+
+        :param path: Path of the checkpoint file.
+        :type path: str
+        :param process_order: Current process order.
+        :type process_order: [str]
+        :returns: Names of completed nodes and their results in the process_flight results format, or ([], {}) if there is no valid checkpoint.
+        :rtype: ([str], dict)
+        '''
+        if not os.path.exists(path):
+            return [], {}
+        try:
+            with open(path) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except ValueError:
+            logger.warning("Ignoring unreadable checkpoint '%s'.", path)
+            return [], {}
+        if checkpoint.get('version') != __version__ or \
+           checkpoint.get('process_order') != list(process_order):
+            logger.info("Ignoring checkpoint '%s' written for a different "
+                        "version or process order.", path)
+            return [], {}
+        results = json_to_process_flight(json.dumps(checkpoint['results']))
+        return checkpoint['completed'], results
+
+
+class _StopProcessing(Exception):
+    '''
+    Raised within iter_process_flight's callback to stop processing once the
+    generator has been closed.
+    '''
+    pass
+
+
 def get_node_type(node, node_subclasses):
     '''
     Return node type string, for logging.
@@ -94,7 +420,721 @@ def get_node_type(node, node_subclasses):
     return node.__class__.__name__
 
 
-def derive_parameters(hdf, node_mgr, process_order, params=None, force=False):
+@contextmanager
+def _timer(stats, key):
+    '''
+    Record the wall time of the enclosed block within stats[key] when
+    profiling, i.e. stats is not None.
+    '''
+    if stats is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        stats[key] = time.time() - start
+
+
+def _array_nbytes(array):
+    '''
+    Bytes allocated for a masked array's data and mask.
+    '''
+    nbytes = array.nbytes
+    mask = np.ma.getmask(array)
+    if mask is not np.ma.nomask:
+        nbytes += mask.nbytes
+    return nbytes
+
+
+def _profile_output(node, stats):
+    '''
+    Record the node type and the size of a derived node's output within
+    stats. Parameter nodes record the bytes allocated for the array and its
+    mask, other nodes record the number of items.
+    '''
+    stats['type'] = get_node_type(node, NODE_SUBCLASSES)
+    array = getattr(node, 'array', None)
+    if array is not None:
+        stats['bytes'] = _array_nbytes(array)
+    elif not isinstance(node, FlightAttributeNode):
+        stats['items'] = len(node)
+
+
+def _max_rss():
+    '''
+    :returns: Peak resident set size of the process in bytes if available.
+    :rtype: int or None
+    '''
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is measured in kilobytes except on OS X.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _record_memory(memory, cache, params):
+    '''
+    Update the peak size of the node cache and params within memory.
+    '''
+    cache_bytes = 0
+    for cached_node in cache.nodes() if cache else ():
+        array = getattr(cached_node, 'array', None)
+        if array is not None:
+            cache_bytes += _array_nbytes(array)
+    for key, value in (('peak_cache_bytes', cache_bytes),
+                       ('peak_cache_entries', len(cache or {})),
+                       ('peak_params', len(params))):
+        memory[key] = max(memory.get(key, 0), value)
+
+
+def _count_consumers(node_mgr, names):
+    '''
+    Count how many of the derived nodes within names depend upon each node.
+
+    :param names: Names of nodes which will be derived.
+    :type names: [str]
+    :returns: Number of consumers for each dependency name.
+    :rtype: defaultdict
+    '''
+    consumers = defaultdict(int)
+    for name in names:
+        for dep_name in node_mgr.derived_nodes[name].get_dependency_names():
+            consumers[dep_name] += 1
+    return consumers
+
+
+def _release_nodes(param_name, node_class, consumers, params, cache,
+                   memory=None):
+    '''
+    Release the dependencies of a derived node which have no remaining
+    consumers from params and the node cache, including the node itself if
+    nothing depends upon it. The results of released nodes are unaffected as
+    they are stored separately.
+
+    :param consumers: Remaining consumers of each node (see _count_consumers), decremented for each of node_class's dependencies.
+    :type consumers: defaultdict
+    :param memory: Number of released nodes is added to memory['evicted'] when provided.
+    :type memory: dict or None
+    '''
+    released = [] if consumers[param_name] else [param_name]
+    for dep_name in node_class.get_dependency_names():
+        consumers[dep_name] -= 1
+        if not consumers[dep_name]:
+            released.append(dep_name)
+    for name in released:
+        params.pop(name, None)
+        if cache is not None:
+            # Workers may be adding to the cache, see NodeCache.
+            cache.evict(name)
+    if memory is not None:
+        memory['evicted'] = memory.get('evicted', 0) + len(released)
+
+
+def _get_dependencies(node_class, hdf, node_mgr, params, cache):
+    '''
+    Build the ordered list of dependencies to pass into the derive method of
+    node_class. Unavailable dependencies are represented as None.
+
+    :param node_class: Node class whose dependencies are sourced.
+    :type node_class: Node subclass
+    :param hdf: Data file accessor used to load parameters.
+    :type hdf: hdf_file
+    :param node_mgr: Used to source attributes and check which parameters are available within the hdf.
+    :type node_mgr: NodeManager
+    :param params: Previously derived non-parameter nodes (KPV/KTI/Phase).
+    :type params: dict
+    :param cache: Cache of aligned nodes or None.
+    :type cache: NodeCache or None
+    :raises RuntimeError: If none of the dependencies are available.
+    :returns: Dependencies in the order of the derive method's arguments.
+    :rtype: list
+    '''
+    deps = []
+    for dep_name in node_class.get_dependency_names():
+        if dep_name in params:  # already calculated KPV/KTI/Phase
+            deps.append(params[dep_name])
+        elif node_mgr.get_attribute(dep_name) is not None:
+            deps.append(node_mgr.get_attribute(dep_name))
+        elif dep_name in node_mgr.hdf_keys:
+            # LFL/Derived parameter
+            # all parameters (LFL or other) need get_aligned which is
+            # available on DerivedParameterNode
+            try:
+                dp = derived_param_from_hdf(hdf.get_param(
+                    dep_name, valid_only=True), cache=cache)
+            except KeyError:
+                # Parameter is invalid.
+                dp = None
+            deps.append(dp)
+        else:  # dependency not available
+            deps.append(None)
+    if all([d is None for d in deps]):
+        raise RuntimeError(
+            "No dependencies available - Nodes cannot "
+            "operate without ANY dependencies available! "
+            "Node: %s" % node_class.__name__)
+    return deps
+
+
+def _priority_tiers(node_mgr, names):
+    '''
+    Priority tier of each node when processing with a deadline. Tiers are
+    taken from settings.NODE_PRIORITIES, the node's priority attribute or
+    settings.NODE_PRIORITY_DEFAULT in that order. Nodes required by
+    process_flight are within the required tier (0), and nodes are promoted to
+    the tier of any node which depends upon them so that each tier can be
+    derived without later tiers.
+
+    :param names: Names of nodes which will be derived in process order.
+    :type names: [str]
+    :returns: Tier of each node.
+    :rtype: dict
+    '''
+    tiers = {}
+    for name in names:
+        priority = node_mgr.derived_nodes[name].priority
+        if name in node_mgr.required:
+            tiers[name] = 0
+        elif name in NODE_PRIORITIES:
+            tiers[name] = NODE_PRIORITIES[name]
+        elif priority is not None:
+            tiers[name] = priority
+        else:
+            tiers[name] = NODE_PRIORITY_DEFAULT
+    # Dependents follow their dependencies within process order, so each
+    # node's tier is final before it is propagated to its dependencies.
+    for name in reversed(names):
+        for dep_name in node_mgr.derived_nodes[name].get_dependency_names():
+            if tiers.get(dep_name, 0) > tiers[name]:
+                tiers[dep_name] = tiers[name]
+    return tiers
+
+
+def _deadline_passed(param_name, tiers, deadline):
+    '''
+    :returns: Whether param_name is within an optional tier and deadline has passed.
+    :rtype: bool
+    '''
+    return deadline is not None and tiers.get(param_name, 0) > 0 and \
+        time.time() > deadline
+
+
+def _node_budget(param_name):
+    '''
+    :returns: Wall-clock (seconds) and memory (bytes) budgets for deriving a node (see settings.NODE_BUDGETS).
+    :rtype: (float or None, int or None)
+    '''
+    budget = NODE_BUDGETS.get(param_name, {})
+    return (budget.get('time', NODE_TIME_BUDGET),
+            budget.get('memory', NODE_MEMORY_BUDGET))
+
+
+def _current_rss(pid='self'):
+    '''
+    :param pid: Process ID, defaults to the current process.
+    :type pid: int or str
+    :returns: Current resident set size of the process in bytes if available.
+    :rtype: int or None
+    '''
+    try:
+        with open('/proc/%s/statm' % pid) as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, EnvironmentError, IndexError, ValueError):
+        return None
+
+
+def _budgets_enabled():
+    '''
+    :returns: Whether any node budget is configured (see settings.NODE_BUDGETS).
+    :rtype: bool
+    '''
+    return NODE_TIME_BUDGET is not None or NODE_MEMORY_BUDGET is not None \
+        or any(v is not None for budget in NODE_BUDGETS.values()
+               for v in budget.values())
+
+
+def _run_child(func, write_fd):
+    '''
+    Entry point of the child process forked by _run_within_budget. Writes the
+    pickled result of func, or the exception it raised, to write_fd and
+    exits without returning to the caller.
+    '''
+    status = 0
+    try:
+        try:
+            outcome = (True, func())
+        except BaseException as err:
+            outcome = (False, err)
+        try:
+            data = cPickle.dumps(outcome, cPickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # Exceptions which cannot be pickled are re-raised as
+            # RuntimeErrors.
+            data = cPickle.dumps(
+                (False, RuntimeError(traceback.format_exc())),
+                cPickle.HIGHEST_PROTOCOL)
+        with os.fdopen(write_fd, 'wb') as pipe:
+            pipe.write(data)
+    except BaseException:
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def _run_within_budget(param_name, func, time_budget=None,
+                       memory_budget=None):
+    '''
+    Call func within a forked child process which is killed if it runs for
+    longer than time_budget seconds or its own resident set size grows by
+    more than memory_budget bytes. The result of func is pickled and returned
+    to the calling process, so func only affects the caller's state through
+    its result. Where processes cannot be forked (Windows) func is called
+    without supervision.
+
+    :param param_name: Name of the node being derived.
+    :type param_name: str
+    :param func: Function called without arguments. The result must be picklable.
+    :type func: callable
+    :type time_budget: float or None
+    :type memory_budget: int or None
+    :raises NodeBudgetExceeded: If func exceeds either budget.
+    :returns: The result of func.
+    '''
+    if not hasattr(os, 'fork'):
+        logger.warning("Unable to enforce the budget of '%s' without "
+                       "os.fork.", param_name)
+        return func()
+
+    read_fd, write_fd = os.pipe()
+    start = time.time()
+    pid = os.fork()
+    if not pid:
+        os.close(read_fd)
+        _run_child(func, write_fd)
+    os.close(write_fd)
+
+    chunks = []
+    breach = None
+    rss_start = None if memory_budget is None else _current_rss(pid)
+    with os.fdopen(read_fd, 'rb') as pipe:
+        while True:
+            readable = select.select([pipe], [], [], BUDGET_POLL_INTERVAL)[0]
+            if readable:
+                chunk = os.read(read_fd, 1024 ** 2)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                continue
+            elapsed = time.time() - start
+            rss = None if rss_start is None else _current_rss(pid)
+            if time_budget is not None and elapsed > time_budget:
+                breach = NodeBudgetExceeded(param_name, 'time', time_budget,
+                                            elapsed)
+            elif rss is not None and rss - rss_start > memory_budget:
+                breach = NodeBudgetExceeded(param_name, 'memory',
+                                            memory_budget, rss - rss_start)
+            if breach:
+                os.kill(pid, signal.SIGKILL)
+                break
+    os.waitpid(pid, 0)
+    if breach:
+        raise breach
+    if not chunks:
+        raise RuntimeError("Deriving '%s' exited without a result." %
+                           param_name)
+    succeeded, value = cPickle.loads(b''.join(chunks))
+    if not succeeded:
+        raise value
+    return value
+
+
+def _derive_node(param_name, node_class, deps, hdf, node_mgr, params, cache,
+                 force=False, stats=None):
+    '''
+    Initialise node_class and derive it from deps.
+
+    :param force: Ignore errors raised while deriving the node. Nodes with a budget (see settings.NODE_BUDGETS) are derived within a child process (see _run_within_budget) which is killed if the node exceeds its budget and an empty node is returned.
+    :type force: bool
+    :param stats: Populated with the wall and CPU time of deriving the node, including the time spent aligning dependencies ('align') and within the derive method ('derive'), when profiling. A 'budget_breach' is recorded for nodes which exceeded their budget.
+    :type stats: dict or None
+    :returns: The derived node.
+    :rtype: Node
+    '''
+    # initialise node
+    node = node_class(cache=cache)
+    # shhh, secret accessors for developing nodes in debug mode
+    node._p = params
+    node._h = hdf
+    node._n = node_mgr
+    logger.debug("Processing %s `%s`", get_node_type(node, NODE_SUBCLASSES), param_name)
+    # Derive the resulting value
+    if stats is not None:
+        node._timings = stats
+        start = time.time()
+
+    def derive():
+        if stats is None:
+            return node.get_derived(deps)
+        cpu_start = _thread_cpu_time()
+        try:
+            return node.get_derived(deps)
+        finally:
+            stats['cpu'] = _thread_cpu_time() - cpu_start
+
+    def derive_detached():
+        # Runs within a child process, return the node without the secret
+        # accessors (which cannot be pickled) and the profiling statistics.
+        derived = derive()
+        for name in ('_p', '_h', '_n', '_timings'):
+            derived.__dict__.pop(name, None)
+        return derived, stats
+
+    budget = _node_budget(param_name) if force else (None, None)
+    try:
+        if budget == (None, None):
+            node = derive()
+        else:
+            node, child_stats = _run_within_budget(param_name,
+                                                   derive_detached, *budget)
+            # The node was derived with the child process' copy of the cache.
+            node._cache = cache
+            if stats is not None:
+                stats.update(child_stats)
+    except NodeBudgetExceeded as err:
+        logger.error("%s Storing as failed.", err)
+        if stats is not None:
+            stats['wall'] = time.time() - start
+            stats['budget_breach'] = {'budget': err.budget,
+                                      'limit': err.limit,
+                                      'value': err.value}
+        return node_class(cache=cache)
+    except:
+        if not force:
+            raise
+
+    if stats is not None:
+        stats['wall'] = time.time() - start
+    for name in ('_timings', '_p', '_h', '_n'):
+        node.__dict__.pop(name, None)
+    return node
+
+
+def _store_initial_node(param_name, node, results):
+    '''
+    Populate results with a node provided within the initial params. The
+    node's contents are expected to already be at 1Hz.
+    '''
+    ktis, kpvs, sections, approaches, flight_attrs = results
+    if node.node_type is KeyPointValueNode:
+        kpvs[param_name] = list(node)
+    elif node.node_type is KeyTimeInstanceNode:
+        ktis[param_name] = list(node)
+    elif node.node_type is FlightAttributeNode:
+        flight_attrs[param_name] = [Attribute(node.name, node.value)]
+    elif issubclass(node.node_type, SectionNode):
+        sections[param_name] = list(node)
+    elif issubclass(node.node_type, ApproachNode):
+        approaches[param_name] = list(node)
+    # DerivedParameterNodes are not supported in initial data.
+
+
+def _store_node(param_name, node, hdf, node_mgr, params, results, force=False):
+    '''
+    Validate a derived node and store its result. Non-parameter nodes are
+    stored within params for use as dependencies and their contents aligned to
+    1Hz are added to results. Parameter nodes are saved to the hdf.
+
+    :param results: Tuple of (ktis, kpvs, sections, approaches, flight_attrs) dictionaries.
+    :type results: tuple
+    '''
+    ktis, kpvs, sections, approaches, flight_attrs = results
+    duration = hdf.duration
+
+    if node.node_type in (KeyPointValueNode, KeyTimeInstanceNode):
+        params[param_name] = node
+
+        # align all indices to 1Hz and check they are within the data before
+        # copying any items
+        indices = node.get_aligned_indices(P(frequency=1, offset=0))
+        invalid = ~((indices >= 0) & (indices <= duration + 4))
+        if invalid.any():
+            position = np.argmax(invalid)
+            raise IndexError(
+                "%s '%s' index %.2f is not between 0 and %d" %
+                (node.node_type_abbr, node[position].name, indices[position],
+                 duration))
+        aligned_items = node.get_aligned_items(indices)
+        if node.node_type is KeyPointValueNode:
+            kpvs[param_name] = aligned_items
+        else:
+            ktis[param_name] = aligned_items
+    elif node.node_type is FlightAttributeNode:
+        params[param_name] = node
+        try:
+            # only has one Attribute node, store as a list for consistency
+            flight_attrs[param_name] = [Attribute(node.name, node.value)]
+        except:
+            logger.warning("Flight Attribute Node '%s' returned empty "
+                           "handed.", param_name)
+    elif issubclass(node.node_type, SectionNode):
+        aligned_section = node.get_aligned(P(frequency=1, offset=0))
+        for index, one_hz in enumerate(aligned_section):
+            # SectionNodes allow slice starts and stops being None which
+            # signifies the beginning and end of the data. To avoid
+            # TypeErrors in subsequent derive methods which perform
+            # arithmetic on section slice start and stops, replace with 0
+            # or hdf.duration.
+            fallback = lambda x, y: x if x is not None else y
+
+            duration = fallback(duration, 0)
+
+            start = fallback(one_hz.slice.start, 0)
+            stop = fallback(one_hz.slice.stop, duration)
+            start_edge = fallback(one_hz.start_edge, 0)
+            stop_edge = fallback(one_hz.stop_edge, duration)
+
+            slice_ = slice(start, stop)
+            one_hz = Section(one_hz.name, slice_, start_edge, stop_edge)
+            aligned_section[index] = one_hz
+
+            if not (0 <= start <= duration and 0 <= stop <= duration + 4):
+                msg = "Section '%s' (%.2f, %.2f) not between 0 and %d"
+                raise IndexError(
+                    msg % (one_hz.name, start, stop, duration))
+            if not 0 <= start_edge <= duration:
+                msg = "Section '%s' start_edge (%.2f) not between 0 and %d"
+                raise IndexError(msg % (one_hz.name, start_edge, duration))
+            if not 0 <= stop_edge <= duration + 4:
+                msg = "Section '%s' stop_edge (%.2f) not between 0 and %d"
+                raise IndexError(msg % (one_hz.name, stop_edge, duration))
+            #section_list.append(one_hz)
+        params[param_name] = aligned_section
+        sections[param_name] = list(aligned_section)
+    elif issubclass(node.node_type, DerivedParameterNode):
+        if duration:
+            # check that the right number of nodes were returned Allow a
+            # small tolerance. For example if duration in seconds is 2822,
+            # then there will be an array length of  1411 at 0.5Hz and 706
+            # at 0.25Hz (rounded upwards). If we combine two 0.25Hz
+            # parameters then we will have an array length of 1412.
+            expected_length = duration * node.frequency
+            if node.array is None or (force and len(node.array) == 0):
+                logger.warning("No array set; creating a fully masked "
+                               "array for %s", param_name)
+                array_length = expected_length
+                # Where a parameter is wholly masked, we fill the HDF
+                # file with masked zeros to maintain structure.
+                node.array = \
+                    np_ma_masked_zeros(expected_length)
+            else:
+                array_length = len(node.array)
+            length_diff = array_length - expected_length
+            if length_diff == 0:
+                pass
+            elif 0 < length_diff < 5:
+                logger.warning("Cutting excess data for parameter '%s'. "
+                               "Expected length was '%s' while resulting "
+                               "array length was '%s'.", param_name,
+                               expected_length, len(node.array))
+                node.array = node.array[:expected_length]
+            else:
+                raise ValueError("Array length mismatch for parameter "
+                                 "'%s'. Expected '%s', resulting array "
+                                 "length '%s'." % (param_name,
+                                                   expected_length,
+                                                   array_length))
+
+        hdf.set_param(node)
+        # Keep hdf_keys up to date.
+        node_mgr.hdf_keys.append(param_name)
+    elif issubclass(node.node_type, ApproachNode):
+        aligned_approach = node.get_aligned(P(frequency=1, offset=0))
+        for approach in aligned_approach:
+            # Does not allow slice start or stops to be None.
+            valid_turnoff = (not approach.turnoff or
+                             (0 <= approach.turnoff <= duration))
+            valid_slice = ((0 <= approach.slice.start <= duration) and
+                           (0 <= approach.slice.stop <= duration))
+            valid_gs_est = (not approach.gs_est or
+                            ((0 <= approach.gs_est.start <= duration) and
+                             (0 <= approach.gs_est.stop <= duration)))
+            valid_loc_est = (not approach.loc_est or
+                             ((0 <= approach.loc_est.start <= duration) and
+                              (0 <= approach.loc_est.stop <= duration)))
+            if not all([valid_turnoff, valid_slice, valid_gs_est,
+                        valid_loc_est]):
+                raise ValueError('ApproachItem contains index outside of '
+                                 'flight data: %s' % approach)
+        params[param_name] = aligned_approach
+        approaches[param_name] = list(aligned_approach)
+    else:
+        raise NotImplementedError("Unknown Type %s" % node.__class__)
+
+
+# Keys of process_flight results in the order of derive_parameters' results.
+RESULT_KEYS = ('kti', 'kpv', 'phases', 'approach', 'flight')
+
+
+def _node_results(param_name, results):
+    '''
+    :returns: The process_flight results key and the items stored for a node, or (None, None) for parameters which are not stored within results.
+    :rtype: (str, list) or (None, None)
+    '''
+    for key, result in zip(RESULT_KEYS, results):
+        if param_name in result:
+            return key, result[param_name]
+    return None, None
+
+
+def _complete_node(param_name, node, hdf, node_mgr, params, results, cache,
+                   force=False, stats=None, consumers=None, memory=None,
+                   callback=None):
+    '''
+    Store a derived node (see _store_node), record its profiling and memory
+    statistics, pass its result to callback and release nodes which are no
+    longer required.
+
+    See derive_parameters for argument descriptions.
+    '''
+    with _timer(stats, 'store'):
+        _store_node(param_name, node, hdf, node_mgr, params, results,
+                    force=force)
+    if stats is not None:
+        _profile_output(node, stats)
+    if memory is not None:
+        _record_memory(memory, cache, params)
+    if callback:
+        callback(param_name, node, *_node_results(param_name, results))
+    if consumers is not None:
+        _release_nodes(param_name, node_mgr.derived_nodes[param_name],
+                       consumers, params, cache, memory)
+
+
+def _derive_task(param_name, node_class, deps, hdf, node_mgr, params, cache,
+                 force, stats):
+    '''
+    Worker thread entry point for derive_parameters. Exceptions are returned
+    rather than raised so that they can be re-raised within the main thread.
+
+    :returns: (param_name, node or None, exc_info or None)
+    :rtype: tuple
+    '''
+    try:
+        node = _derive_node(param_name, node_class, deps, hdf, node_mgr,
+                            params, cache, force=force, stats=stats)
+    except Exception:
+        return param_name, None, sys.exc_info()
+    return param_name, node, None
+
+
+def _derive_parameters_parallel(hdf, node_mgr, process_order, params, results,
+                                cache, force, workers, profile, memory,
+                                callback, tiers, deadline, skipped):
+    '''
+    Derives nodes on a pool of worker threads, scheduling each node as soon as
+    all of the nodes it depends upon have been derived. Dependencies are
+    sourced, and results are validated and stored (including writing to the
+    hdf), within the calling thread so that only the derive methods run
+    concurrently. When several nodes are ready, they are submitted in
+    process_order.
+
+    See derive_parameters for argument descriptions.
+    '''
+    position = {name: index for index, name in enumerate(process_order)}
+    to_derive = []
+    for param_name in process_order:
+        if param_name in node_mgr.hdf_keys:
+            continue
+        elif param_name in params:
+            _store_initial_node(param_name, params[param_name], results)
+            if callback:
+                callback(param_name, params[param_name],
+                         *_node_results(param_name, results))
+        elif node_mgr.get_attribute(param_name) is not None:
+            continue
+        else:
+            to_derive.append(param_name)
+
+    # Only dependencies which are derived within this run need to be waited
+    # upon, everything else is already available.
+    derived_names = set(to_derive)
+    waiting = {}
+    dependents = {name: [] for name in to_derive}
+    for param_name in to_derive:
+        #NB raises KeyError if Node is "unknown"
+        node_class = node_mgr.derived_nodes[param_name]
+        waiting[param_name] = set(node_class.get_dependency_names()) & derived_names
+        for dep_name in waiting[param_name]:
+            dependents[dep_name].append(param_name)
+    consumers = _count_consumers(node_mgr, to_derive) \
+        if NODE_CACHE_EVICTION else None
+
+    ready = [position[n] for n in to_derive if not waiting[n]]
+    heapq.heapify(ready)
+    completed = six.moves.queue.Queue()
+    pool = ThreadPool(workers)
+    running = 0
+    failure = None
+    derived_names = set()
+    try:
+        while ready or running:
+            while ready and not failure:
+                param_name = process_order[heapq.heappop(ready)]
+                if _deadline_passed(param_name, tiers, deadline):
+                    # Nodes which depend upon param_name are never ready.
+                    continue
+                node_class = node_mgr.derived_nodes[param_name]
+                stats = None if profile is None else \
+                    profile.setdefault(param_name, {})
+                with _timer(stats, 'load'):
+                    deps = _get_dependencies(node_class, hdf, node_mgr,
+                                             params, cache)
+                pool.apply_async(
+                    _derive_task,
+                    (param_name, node_class, deps, hdf, node_mgr, params,
+                     cache, force, stats),
+                    callback=completed.put)
+                running += 1
+            if not running:
+                break
+            param_name, node, exc_info = completed.get()
+            running -= 1
+            if failure:
+                # Waiting for running nodes to finish before raising.
+                continue
+            elif exc_info:
+                failure = exc_info
+                continue
+            _complete_node(
+                param_name, node, hdf, node_mgr, params, results, cache,
+                force=force,
+                stats=None if profile is None else profile[param_name],
+                consumers=consumers, memory=memory, callback=callback)
+            derived_names.add(param_name)
+            for dependent in dependents[param_name]:
+                waiting[dependent].discard(param_name)
+                if not waiting[dependent]:
+                    heapq.heappush(ready, position[dependent])
+    finally:
+        pool.close()
+        pool.join()
+    if failure:
+        six.reraise(*failure)
+    if skipped is not None:
+        skipped.extend(n for n in to_derive if n not in derived_names)
+
+    # Results are stored as nodes complete, restore process_order so that
+    # the output is identical to deriving serially.
+    for result in results:
+        items = [(k, result.pop(k)) for k in process_order if k in result]
+        result.update(items)
+
+
+def derive_parameters(hdf, node_mgr, process_order, params=None, force=False,
+                      workers=1, profile=None, memory=None, write_behind=False,
+                      callback=None, deadline=None, skipped=None):
     '''
     Derives parameters in process_order. Dependencies are sourced via the
     node_mgr.
@@ -107,12 +1147,53 @@ def derive_parameters(hdf, node_mgr, process_order, params=None, force=False):
     :param process_order: Parameter / Node class names in the required order to
         be processed
     :type process_order: list of strings
+    :param params: Initial nodes which are not derived (excluding parameter nodes which are saved to the hdf).
+    :type params: dict
+    :param force: Ignore errors raised while deriving nodes. Nodes exceeding their budget (see settings.NODE_BUDGETS) are aborted and stored as failed. Budgets cannot be combined with workers or write_behind.
+    :type force: bool
+    :param workers: Number of threads to derive independent nodes with. Nodes are scheduled as soon as their dependencies have been derived. NumPy releases the GIL for most array operations, but nodes must not modify the arrays of their dependencies in place as aligned dependencies are shared via the node cache. The results are identical to deriving serially (workers=1).
+    :type workers: int
+    :param profile: Populated with profiling statistics for each derived node when provided. Times in seconds are recorded for loading dependencies ('load'), deriving the node ('wall' and 'cpu'), aligning dependencies ('align'), the derive method ('derive') and validating and storing the result ('store'). The size of the result is recorded as 'bytes' for parameters and 'items' for other nodes. Nodes aborted for exceeding their budget record the 'budget', 'limit' and 'value' within 'budget_breach'.
+    :type profile: dict or None
+    :param memory: Populated with the peak number of entries and bytes within the node cache ('peak_cache_entries' and 'peak_cache_bytes'), the peak number of nodes within params ('peak_params'), the number of nodes released once nothing else depends upon them ('evicted', see settings.NODE_CACHE_EVICTION) and the peak resident set size of the process in bytes ('max_rss') when provided.
+    :type memory: dict or None
+    :param write_behind: Write derived parameters to the hdf on a background thread (see WriteBehindHDF). All parameters have been written when this function returns or raises.
+    :type write_behind: bool
+    :param callback: Called as callback(name, node, key, items) as soon as each node within process_order has been derived and stored, or populated from params. key is the process_flight results key ('kti', 'kpv', 'phases', 'approach' or 'flight') and items is the node's content aligned to 1Hz, both are None for parameters. Called within the calling thread.
+    :type callback: callable or None
+    :param deadline: Time (as time.time()) after which nodes within optional priority tiers are no longer derived (see _priority_tiers). Nodes are derived tier by tier, starting with the required tier (0) which is always derived.
+    :type deadline: float or None
+    :param skipped: Populated with the names of nodes which were not derived because the deadline passed when provided.
+    :type skipped: list or None
+    :returns: ktis, kpvs, sections, approaches, flight_attrs
+    :rtype: tuple of dicts
     '''
+    if force and _budgets_enabled() and (write_behind or
+                                         (workers and workers > 1)):
+        # Forking a child process while other threads run may deadlock.
+        raise ValueError('Node budgets cannot be enforced with workers or '
+                         'write_behind.')
+
+    if write_behind:
+        writer = WriteBehindHDF(hdf)
+        try:
+            results = derive_parameters(writer, node_mgr, process_order,
+                                        params=params, force=force,
+                                        workers=workers, profile=profile,
+                                        memory=memory, callback=callback,
+                                        deadline=deadline, skipped=skipped)
+        except:
+            # Write the parameters derived before the error, but raise the
+            # original error.
+            exc_info = sys.exc_info()
+            writer.close(raise_error=False)
+            six.reraise(*exc_info)
+        writer.close()
+        return results
+
     if not params:
         params = {}
-    # OPT: local lookup is faster than module-level (small).
-    node_subclasses = NODE_SUBCLASSES
-    
+
     # store all derived params that aren't masked arrays
     approaches = {}
     # duplicate storage, but maintaining types
@@ -121,26 +1202,47 @@ def derive_parameters(hdf, node_mgr, process_order, params=None, force=False):
     # 'Node Name' : node()  pass in node.get_accessor()
     sections = {}
     flight_attrs = {}
+    results = (ktis, kpvs, sections, approaches, flight_attrs)
     # cache of nodes to avoid repeated array alignment
-    cache = {} if NODE_CACHE else None
-    duration = hdf.duration
+    cache = NodeCache() if NODE_CACHE else None
+
+    if deadline is not None:
+        tiers = _priority_tiers(node_mgr, [
+            n for n in process_order if n in node_mgr.derived_nodes])
+        # A stable sort keeps each tier within process order.
+        process_order = sorted(process_order, key=lambda n: tiers.get(n, 0))
+        if skipped is None:
+            skipped = []
+    else:
+        tiers = {}
+
+    if workers and workers > 1:
+        _derive_parameters_parallel(hdf, node_mgr, process_order, params,
+                                    results, cache, force, workers, profile,
+                                    memory, callback, tiers, deadline, skipped)
+        _log_skipped(skipped)
+        if memory is not None:
+            memory['max_rss'] = _max_rss()
+        return results
+
+    if NODE_CACHE_EVICTION:
+        hdf_keys = set(node_mgr.hdf_keys)
+        consumers = _count_consumers(node_mgr, [
+            n for n in process_order if n not in hdf_keys and n not in params
+            and node_mgr.get_attribute(n) is None])
+    else:
+        consumers = None
 
     for param_name in process_order:
         if param_name in node_mgr.hdf_keys:
             continue
-        
+
         elif param_name in params:
-            node = params[param_name]
             # populate output already at 1Hz
-            if node.node_type is KeyPointValueNode:
-                kpvs[param_name] = list(node)
-            elif node.node_type is KeyTimeInstanceNode:
-                ktis[param_name] = list(node)
-            elif node.node_type is FlightAttributeNode:
-                flight_attrs[param_name] = [Attribute(node.name, node.value)]
-            elif node.node_type is SectionNode:
-                sections[param_name] = list(node)
-            # DerivedParameterNodes are not supported in initial data.
+            _store_initial_node(param_name, params[param_name], results)
+            if callback:
+                callback(param_name, params[param_name],
+                         *_node_results(param_name, results))
             continue
 
         elif node_mgr.get_attribute(param_name) is not None:
@@ -152,177 +1254,68 @@ def derive_parameters(hdf, node_mgr, process_order, params=None, force=False):
         #NB raises KeyError if Node is "unknown"
         node_class = node_mgr.derived_nodes[param_name]
 
+        if _deadline_passed(param_name, tiers, deadline):
+            # Every remaining node is within an optional tier.
+            skipped.append(param_name)
+            continue
+
+        stats = None if profile is None else \
+            profile.setdefault(param_name, {})
+
         # build ordered dependencies
-        deps = []
-        node_deps = node_class.get_dependency_names()
-        for dep_name in node_deps:
-            if dep_name in params:  # already calculated KPV/KTI/Phase
-                deps.append(params[dep_name])
-            elif node_mgr.get_attribute(dep_name) is not None:
-                deps.append(node_mgr.get_attribute(dep_name))
-            elif dep_name in node_mgr.hdf_keys:
-                # LFL/Derived parameter
-                # all parameters (LFL or other) need get_aligned which is
-                # available on DerivedParameterNode
-                try:
-                    dp = derived_param_from_hdf(hdf.get_param(
-                        dep_name, valid_only=True), cache=cache)
-                except KeyError:
-                    # Parameter is invalid.
-                    dp = None
-                deps.append(dp)
-            else:  # dependency not available
-                deps.append(None)
-        if all([d is None for d in deps]):
-            raise RuntimeError(
-                "No dependencies available - Nodes cannot "
-                "operate without ANY dependencies available! "
-                "Node: %s" % node_class.__name__)
-
-        # initialise node
-        node = node_class(cache=cache)
-        # shhh, secret accessors for developing nodes in debug mode
-        node._p = params
-        node._h = hdf
-        node._n = node_mgr
-        logger.debug("Processing %s `%s`", get_node_type(node, node_subclasses), param_name)
-        # Derive the resulting value
-        
-        try:
-            node = node.get_derived(deps)
-        except:
-            if not force:
-                raise
-        
-        del node._p
-        del node._h
-        del node._n
+        with _timer(stats, 'load'):
+            deps = _get_dependencies(node_class, hdf, node_mgr, params, cache)
 
-        if node.node_type is KeyPointValueNode:
-            params[param_name] = node
-            
-            aligned_kpvs = []
-            for one_hz in node.get_aligned(P(frequency=1, offset=0)):
-                if not (0 <= one_hz.index <= duration+4):
-                    raise IndexError(
-                        "KPV '%s' index %.2f is not between 0 and %d" %
-                        (one_hz.name, one_hz.index, duration))
-                aligned_kpvs.append(one_hz)
-            kpvs[param_name] = aligned_kpvs
-        elif node.node_type is KeyTimeInstanceNode:
-            params[param_name] = node
-            
-            aligned_ktis = []
-            for one_hz in node.get_aligned(P(frequency=1, offset=0)):
-                if not (0 <= one_hz.index <= duration+4):
-                    raise IndexError(
-                        "KTI '%s' index %.2f is not between 0 and %d" %
-                        (one_hz.name, one_hz.index, duration))
-                aligned_ktis.append(one_hz)
-            ktis[param_name] = aligned_ktis
-        elif node.node_type is FlightAttributeNode:
-            params[param_name] = node
-            try:
-                # only has one Attribute node, store as a list for consistency
-                flight_attrs[param_name] = [Attribute(node.name, node.value)]
-            except:
-                logger.warning("Flight Attribute Node '%s' returned empty "
-                               "handed.", param_name)
-        elif issubclass(node.node_type, SectionNode):
-            aligned_section = node.get_aligned(P(frequency=1, offset=0))
-            for index, one_hz in enumerate(aligned_section):
-                # SectionNodes allow slice starts and stops being None which
-                # signifies the beginning and end of the data. To avoid
-                # TypeErrors in subsequent derive methods which perform
-                # arithmetic on section slice start and stops, replace with 0
-                # or hdf.duration.
-                fallback = lambda x, y: x if x is not None else y
-
-                duration = fallback(duration, 0)
-
-                start = fallback(one_hz.slice.start, 0)
-                stop = fallback(one_hz.slice.stop, duration)
-                start_edge = fallback(one_hz.start_edge, 0)
-                stop_edge = fallback(one_hz.stop_edge, duration)
-
-                slice_ = slice(start, stop)
-                one_hz = Section(one_hz.name, slice_, start_edge, stop_edge)
-                aligned_section[index] = one_hz
-
-                if not (0 <= start <= duration and 0 <= stop <= duration + 4):
-                    msg = "Section '%s' (%.2f, %.2f) not between 0 and %d"
-                    raise IndexError(
-                        msg % (one_hz.name, start, stop, duration))
-                if not 0 <= start_edge <= duration:
-                    msg = "Section '%s' start_edge (%.2f) not between 0 and %d"
-                    raise IndexError(msg % (one_hz.name, start_edge, duration))
-                if not 0 <= stop_edge <= duration + 4:
-                    msg = "Section '%s' stop_edge (%.2f) not between 0 and %d"
-                    raise IndexError(msg % (one_hz.name, stop_edge, duration))
-                #section_list.append(one_hz)
-            params[param_name] = aligned_section
-            sections[param_name] = list(aligned_section)
-        elif issubclass(node.node_type, DerivedParameterNode):
-            if duration:
-                # check that the right number of nodes were returned Allow a
-                # small tolerance. For example if duration in seconds is 2822,
-                # then there will be an array length of  1411 at 0.5Hz and 706
-                # at 0.25Hz (rounded upwards). If we combine two 0.25Hz
-                # parameters then we will have an array length of 1412.
-                expected_length = duration * node.frequency
-                if node.array is None or (force and len(node.array) == 0):
-                    logger.warning("No array set; creating a fully masked "
-                                   "array for %s", param_name)
-                    array_length = expected_length
-                    # Where a parameter is wholly masked, we fill the HDF
-                    # file with masked zeros to maintain structure.
-                    node.array = \
-                        np_ma_masked_zeros(expected_length)
-                else:
-                    array_length = len(node.array)
-                length_diff = array_length - expected_length
-                if length_diff == 0:
-                    pass
-                elif 0 < length_diff < 5:
-                    logger.warning("Cutting excess data for parameter '%s'. "
-                                   "Expected length was '%s' while resulting "
-                                   "array length was '%s'.", param_name,
-                                   expected_length, len(node.array))
-                    node.array = node.array[:expected_length]
-                else:
-                    raise ValueError("Array length mismatch for parameter "
-                                     "'%s'. Expected '%s', resulting array "
-                                     "length '%s'." % (param_name,
-                                                       expected_length,
-                                                       array_length))
-
-            hdf.set_param(node)
-            # Keep hdf_keys up to date.
-            node_mgr.hdf_keys.append(param_name)
-        elif issubclass(node.node_type, ApproachNode):
-            aligned_approach = node.get_aligned(P(frequency=1, offset=0))
-            for approach in aligned_approach:
-                # Does not allow slice start or stops to be None.
-                valid_turnoff = (not approach.turnoff or
-                                 (0 <= approach.turnoff <= duration))
-                valid_slice = ((0 <= approach.slice.start <= duration) and
-                               (0 <= approach.slice.stop <= duration))
-                valid_gs_est = (not approach.gs_est or
-                                ((0 <= approach.gs_est.start <= duration) and
-                                 (0 <= approach.gs_est.stop <= duration)))
-                valid_loc_est = (not approach.loc_est or
-                                 ((0 <= approach.loc_est.start <= duration) and
-                                  (0 <= approach.loc_est.stop <= duration)))
-                if not all([valid_turnoff, valid_slice, valid_gs_est,
-                            valid_loc_est]):
-                    raise ValueError('ApproachItem contains index outside of '
-                                     'flight data: %s' % approach)
-            params[param_name] = aligned_approach
-            approaches[param_name] = list(aligned_approach)
-        else:
-            raise NotImplementedError("Unknown Type %s" % node.__class__)
-        continue
-    return ktis, kpvs, sections, approaches, flight_attrs
+        node = _derive_node(param_name, node_class, deps, hdf, node_mgr,
+                            params, cache, force=force, stats=stats)
+
+        _complete_node(param_name, node, hdf, node_mgr, params, results,
+                       cache, force=force, stats=stats, consumers=consumers,
+                       memory=memory, callback=callback)
+    _log_skipped(skipped)
+    if memory is not None:
+        memory['max_rss'] = _max_rss()
+    return results
+
+
+def _log_skipped(skipped):
+    if skipped:
+        logger.warning("Deadline passed before deriving %d nodes within "
+                       "optional priority tiers: %s", len(skipped),
+                       ', '.join(skipped))
+
+
+def _unchanged_nodes(hdf, node_mgr, initial, fingerprints, previous):
+    '''
+    Find previously derived nodes whose fingerprints have not changed and can
+    therefore be reused rather than derived again.
+
+    :param hdf: Data file containing previously derived parameters.
+    :type hdf: hdf_file
+    :param node_mgr: Node manager whose hdf_keys only contain LFL parameters.
+    :type node_mgr: NodeManager
+    :param initial: Previously derived nodes (excluding parameter nodes).
+    :type initial: dict
+    :param fingerprints: Fingerprints of nodes within the current process order.
+    :type fingerprints: dict
+    :param previous: Fingerprints of previously derived nodes.
+    :type previous: dict
+    :returns: Names of reusable parameters within the hdf and reusable initial nodes. Initial nodes without a previous fingerprint are kept unless they are requested.
+    :rtype: [str], dict
+    '''
+    unchanged = lambda name: (name in fingerprints and
+                              previous.get(name) == fingerprints[name])
+    lfl_names = set(node_mgr.hdf_keys)
+    param_names = [name for name in hdf.valid_param_names()
+                   if name not in lfl_names and unchanged(name)]
+    params = {}
+    for name, node in six.iteritems(initial):
+        if name in previous:
+            if unchanged(name):
+                params[name] = node
+        elif name not in node_mgr.requested:
+            params[name] = node
+    return param_names, params
 
 
 def parse_analyser_profiles(analyser_profiles, filter_modules=None):
@@ -358,7 +1351,10 @@ def parse_analyser_profiles(analyser_profiles, filter_modules=None):
 def process_flight(segment_info, tail_number, aircraft_info={}, achieved_flight_record={},
                    requested=[], required=[], include_flight_attributes=True,
                    additional_modules=[], pre_flight_kwargs={}, force=False,
-                   initial={}, reprocess=False):
+                   initial={}, reprocess=False, workers=1, derived_nodes=None,
+                   incremental=False, profile=False, write_behind=False,
+                   callback=None, deadline=None, quick_look=False,
+                   checkpoint=False):
     '''
     Processes the HDF file (segment_info['File']) to derive the required_params (Nodes)
     within python modules (settings.NODE_MODULES).
@@ -384,11 +1380,30 @@ def process_flight(segment_info, tail_number, aircraft_info={}, achieved_flight_
     :type additional_modules: List of Strings
     :param pre_flight_kwargs: Keyword arguments for the pre-flight analysis hook.
     :type pre_flight_kwargs: dict
-    :param force: Ignore errors raised while deriving nodes.
+    :param force: Ignore errors raised while deriving nodes. Nodes exceeding their wall-clock or memory budget (see settings.NODE_BUDGETS) are aborted and stored as failed. Budgets cannot be combined with workers or write_behind, or enforced within iter_process_flight.
     :type force: bool
     :param initial: Initial content for nodes to avoid reprocessing (excluding parameter nodes which are saved to the hdf).
     :type initial: dict
     :param reprocess: Force reprocessing of all Nodes (including derived Nodes already saved to the HDF file).
+    :type reprocess: bool
+    :param workers: Number of threads used to derive independent nodes concurrently (see derive_parameters).
+    :type workers: int
+    :param derived_nodes: Derived nodes previously loaded from settings.NODE_MODULES and additional_modules with get_derived_nodes. Avoids collecting nodes from the modules for every flight when processing many flights within one interpreter.
+    :type derived_nodes: dict
+    :param incremental: Only derive nodes whose fingerprint (see analysis_engine.fingerprint) differs from the fingerprint stored within the HDF file or within initial['fingerprints'] by a previous incremental run. Unchanged parameters are reused from the HDF file and unchanged KPV/KTI/Phase/Approach/Attribute nodes from initial, so initial should contain the results of the previous run. Fingerprints of all derived nodes are returned within the 'fingerprints' key of the results. Nothing is reused when combined with reprocess.
+    :type incremental: bool
+    :param profile: Profile the derivation of each node (see derive_parameters). The report is stored within the HDF file's 'profile' attribute and returned within the 'profile' key of the results.
+    :type profile: bool
+    :param write_behind: Write derived parameters to the HDF file on a background thread (see derive_parameters).
+    :type write_behind: bool
+    :param callback: Called as callback(key, name, items) with the results of each KPV/KTI/Phase/Approach/Flight Attribute node as soon as it has been derived, where key is the results key (e.g. 'kpv') and items are as within the returned results. KPVs and KTIs are timestamped and geo-located first, so they are held back until 'Latitude Smoothed' and 'Longitude Smoothed' have been derived. See also iter_process_flight.
+    :type callback: callable or None
+    :param deadline: Seconds from calling process_flight after which nodes within optional priority tiers (see settings.NODE_PRIORITIES) are no longer derived. The required tier is derived first and always completes. Names of nodes which were not derived are returned within the 'skipped' key of the results and are excluded from the stored fingerprints so that a later incremental run derives them.
+    :type deadline: float or None
+    :param quick_look: Derive nodes from LFL parameters decimated to at most 1Hz (see analysis_engine.quick_look) for an approximate overview of the flight, usually with a small set of requested nodes. The HDF file is opened read only and derived parameters are kept in memory. Results are flagged with 'approximate': True. Incompatible with incremental and write_behind, which are ignored.
+    :type quick_look: bool
+    :param checkpoint: Periodically write the names of derived nodes and the results of KPV/KTI/Phase/Approach/Flight Attribute nodes to a sidecar file (the HDF file path with a '.checkpoint' suffix) every settings.CHECKPOINT_INTERVAL seconds and when processing fails. A later run with the same process order resumes from the checkpoint, reusing the derived parameters already saved to the HDF file, rather than deriving every node again. The checkpoint is removed once processing completes. Ignored with quick_look.
+    :type checkpoint: bool
 
     :returns: See below:
     :rtype: Dict
@@ -532,6 +1547,10 @@ def process_flight(segment_info, tail_number, aircraft_info={}, achieved_flight_
             if lat/long available
             else [KeyTimeInstance('index name')],
         'kpv':[KeyPointValue('index value name slice')]
+        'fingerprints': {'Node Name': 'fingerprint'} if incremental
+        'profile': {'duration': 12.3, 'workers': 1, 'nodes': {'Node Name': {...}}, 'memory': {...}, 'budget_breaches': {'Node Name': {'budget': 'time', 'limit': 60, 'value': 60.1}}} if profile
+        'skipped': ['Node Name'] if deadline
+        'approximate': True if quick_look
     }
 
     sample flight Attributes:
@@ -543,7 +1562,12 @@ def process_flight(segment_info, tail_number, aircraft_info={}, achieved_flight_
     ],
 
     '''
-    
+    if deadline is not None:
+        deadline += time.time()
+    if quick_look:
+        # Nothing is written to the HDF file.
+        incremental = write_behind = checkpoint = False
+
     hdf_path = segment_info['File']
     if 'Start Datetime' not in segment_info:
         import pytz
@@ -561,8 +1585,20 @@ def process_flight(segment_info, tail_number, aircraft_info={}, achieved_flight_
     aircraft_info['Tail Number'] = tail_number
 
     # go through modules to get derived nodes
-    node_modules = settings.NODE_MODULES + additional_modules
-    derived_nodes = get_derived_nodes(node_modules)
+    if derived_nodes is None:
+        node_modules = settings.NODE_MODULES + additional_modules
+        if settings.NODE_REGISTRY_PATH and requested:
+            # only import the modules defining requested nodes and their
+            # dependencies
+            registry = get_registry(node_modules, settings.NODE_REGISTRY_PATH)
+            roots = list(requested) + list(required)
+            if include_flight_attributes:
+                roots += module_node_names(registry,
+                                           'analysis_engine.flight_attribute')
+            derived_nodes = load_nodes(
+                registry, dependency_closure(registry, roots))
+        else:
+            derived_nodes = get_derived_nodes(node_modules)
 
     if requested:
         requested = \
@@ -578,12 +1614,17 @@ def process_flight(segment_info, tail_number, aircraft_info={}, achieved_flight_
             requested + list(get_derived_nodes(
                 ['analysis_engine.flight_attribute']).keys())))
     
+    initial_fingerprints = initial.get('fingerprints', {})
     initial = process_flight_to_nodes(initial)
-    for node_name in requested:
-        initial.pop(node_name, None)
+    if not incremental:
+        for node_name in requested:
+            initial.pop(node_name, None)
 
     # open HDF for reading
-    with hdf_file(hdf_path) as hdf:
+    hdf_kwargs = {'read_only': True} if quick_look else {}
+    with hdf_file(hdf_path, **hdf_kwargs) as hdf:
+        if quick_look:
+            hdf = QuickLookHDF(hdf)
         hdf.start_datetime = segment_info['Start Datetime']
         hook = hooks.PRE_FLIGHT_ANALYSIS
         if hook:
@@ -594,13 +1635,35 @@ def process_flight(segment_info, tail_number, aircraft_info={}, achieved_flight_
         else:
             logger.info("No PRE_FLIGHT_ANALYSIS actions to perform")
         # Track nodes.
-        param_names = hdf.valid_lfl_param_names() if reprocess else hdf.valid_param_names()
+        param_names = hdf.valid_lfl_param_names() \
+            if reprocess or incremental else hdf.valid_param_names()
         node_mgr = NodeManager(
             segment_info, hdf.duration, param_names,
             requested, required, derived_nodes, aircraft_info,
             achieved_flight_record)
-        # calculate dependency tree
-        process_order, gr_st = dependency_order(node_mgr, draw=False)
+        # calculate dependency tree (or reuse a cached plan, see
+        # settings.PLAN_CACHE_DIR)
+        process_order, gr_st = cached_dependency_order(node_mgr)
+        plan_order = process_order
+        if incremental:
+            fingerprints = node_fingerprints(node_mgr, process_order)
+            lfl_names = set(node_mgr.hdf_keys)
+            fingerprints = {name: fingerprint for name, fingerprint
+                            in six.iteritems(fingerprints)
+                            if name in derived_nodes and name not in lfl_names}
+            stored_fingerprints = dict(hdf.get_attr('node_fingerprints') or {})
+            previous = {}
+            if not reprocess:
+                previous.update(stored_fingerprints)
+                previous.update(initial_fingerprints)
+            unchanged_params, initial = _unchanged_nodes(
+                hdf, node_mgr, initial, fingerprints, previous)
+            node_mgr.hdf_keys.extend(unchanged_params)
+            logger.info("Reusing %d parameters and %d nodes with unchanged "
+                        "fingerprints, %d of %d derived nodes will be derived.",
+                        len(unchanged_params), len(initial),
+                        len(set(fingerprints) - set(unchanged_params) - set(initial)),
+                        len(fingerprints))
         if settings.CACHE_PARAMETER_MIN_USAGE:
             # find params used more than
             for node in gr_st.nodes():
@@ -612,33 +1675,218 @@ def process_flight(segment_info, tail_number, aircraft_info={}, achieved_flight_
             logging.info("HDF set to cache parameters: %s",
                          hdf.cache_param_list)
 
-        # derive parameters
-        ktis, kpvs, sections, approaches, flight_attrs = \
-            derive_parameters(hdf, node_mgr, process_order, params=initial, force=force)
+        # reorder independent nodes (see settings.PROCESS_ORDER_POLICY)
+        process_order = schedule(node_mgr, process_order)
+        # costs are only recorded for policies using them, costs of
+        # decimated parameters are not representative
+        cost_path = costs_path(aircraft_info) \
+            if needs_costs() and not quick_look else None
 
-        # geo locate KTIs
-        ktis = geo_locate(hdf, ktis)
-        ktis = _timestamp(segment_info['Start Datetime'], ktis)
+        # derive parameters
+        profile_nodes = {} if profile or cost_path else None
+        memory = {} if profile else None
+        stream = _ResultStream(hdf, node_mgr, process_order,
+                               segment_info['Start Datetime'],
+                               callback) if callback else None
+        if checkpoint:
+            # The plan's order does not depend upon the costs recorded by
+            # earlier runs.
+            checkpoint = _resume_checkpoint(hdf_path + '.checkpoint', hdf,
+                                            node_mgr, plan_order, initial,
+                                            stream)
+        skipped = None if deadline is None else []
+        start = time.time()
+        try:
+            ktis, kpvs, sections, approaches, flight_attrs = \
+                derive_parameters(hdf, node_mgr, process_order,
+                                  params=initial, force=force,
+                                  workers=workers, profile=profile_nodes,
+                                  memory=memory, write_behind=write_behind,
+                                  callback=checkpoint or stream,
+                                  deadline=deadline, skipped=skipped)
+        except:
+            if checkpoint:
+                exc_info = sys.exc_info()
+                checkpoint.write()
+                six.reraise(*exc_info)
+            raise
+        if cost_path:
+            try:
+                save_costs(cost_path, profile_nodes)
+            except (IOError, OSError):
+                logger.exception("Unable to store node costs '%s'.",
+                                 cost_path)
+        if profile:
+            profile_report = {
+                'duration': time.time() - start,
+                'workers': workers,
+                'nodes': profile_nodes,
+                'memory': memory,
+                'budget_breaches': {
+                    name: stats['budget_breach'] for name, stats
+                    in six.iteritems(profile_nodes) if 'budget_breach' in stats},
+            }
 
-        # geo locate KPVs
-        kpvs = geo_locate(hdf, kpvs)
-        kpvs = _timestamp(segment_info['Start Datetime'], kpvs)
+        if stream:
+            # KTIs and KPVs were geo located as they were derived.
+            stream.close()
+        else:
+            # Geo locate and timestamp KTIs and KPVs together so that the
+            # position parameters are only loaded and repaired once.
+            items = _result_items(ktis, kpvs)
+            positions = _geo_positions(hdf)
+            if positions:
+                _set_item_positions(positions, items)
+            _set_item_datetimes(segment_info['Start Datetime'], items)
 
         # Store version of FlightDataAnalyser
         hdf.analysis_version = __version__
         # Store dependency tree
-        hdf.dependency_tree = json.dumps(json_graph.node_link_data(gr_st))
+        hdf.dependency_tree = json.dumps(
+            json_graph.node_link_data(gr_st.to_networkx()))
+        if profile:
+            hdf.set_attr('profile', profile_report)
         # Store aircraft info
         hdf.set_attr('aircraft_info', aircraft_info)
         hdf.set_attr('achieved_flight_record', achieved_flight_record)
-
-    return {
+        if incremental:
+            # Nodes skipped due to the deadline are derived by the next
+            # incremental run.
+            for name in skipped or []:
+                fingerprints.pop(name, None)
+                stored_fingerprints.pop(name, None)
+            # Parameters derived by earlier runs which were not required by
+            # this run remain valid within the HDF file.
+            stored_fingerprints.update(fingerprints)
+            hdf.set_attr('node_fingerprints', stored_fingerprints)
+        if checkpoint:
+            checkpoint.remove()
+
+    results = {
         'flight': flight_attrs,
         'kti': ktis,
         'kpv': kpvs,
         'approach': approaches,
         'phases': sections,
     }
+    if incremental:
+        results['fingerprints'] = fingerprints
+    if profile:
+        results['profile'] = profile_report
+    if deadline is not None:
+        results['skipped'] = skipped
+    if quick_look:
+        results['approximate'] = True
+    return results
+
+
+def _resume_checkpoint(path, hdf, node_mgr, process_order, initial,
+                       callback):
+    '''
+    Resume from the checkpoint of a previous run (see process_flight's
+    checkpoint argument). Completed parameters found within the hdf are added
+    to node_mgr.hdf_keys and the results of other completed nodes are added to
+    initial so that neither are derived again.
+
+    :param path: Path of the checkpoint file.
+    :type path: str
+    :type initial: dict
+    :param callback: derive_parameters callback wrapped by the checkpoint.
+    :type callback: callable or None
+    :returns: derive_parameters callback which writes the checkpoint.
+    :rtype: _Checkpoint
+    '''
+    completed, results = _Checkpoint.load(path, process_order)
+    if completed:
+        derived_nodes = node_mgr.derived_nodes
+        resumed = process_flight_to_nodes(results, derived_nodes=derived_nodes)
+        hdf_keys = set(node_mgr.hdf_keys)
+        completed = [name for name in completed if name in hdf_keys or
+                     name in resumed or name in initial or name in hdf]
+        for name in completed:
+            if name in hdf_keys:
+                continue
+            elif name in resumed:
+                initial.setdefault(name, resumed[name])
+            elif name not in initial and \
+                    issubclass(derived_nodes[name], DerivedParameterNode):
+                node_mgr.hdf_keys.append(name)
+        logger.info("Resuming from checkpoint '%s' with %d of %d nodes "
+                    "completed.", path, len(completed), len(process_order))
+    return _Checkpoint(path, process_order, completed=completed,
+                       results=results, callback=callback)
+
+
+def iter_process_flight(segment_info, tail_number, **kwargs):
+    '''
+    Generator variant of process_flight which yields (key, name, items) for
+    each KPV/KTI/Phase/Approach/Flight Attribute node as soon as it has been
+    derived (see process_flight's callback argument), so that results can be
+    consumed while later nodes are still being derived.
+
+    Processing runs within a background (daemon) thread. Exceptions are
+    raised by the generator. Stopping is cooperative: closing the generator
+    early asks the thread to stop when the next result is available, i.e.
+    after deriving the current node and any nodes without results (such as
+    parameters) which follow it. The generator waits at most STOP_TIMEOUT
+    seconds for the thread to stop, after which it may continue to derive
+    nodes and write to the HDF file in the background. Node budgets (see
+    settings.NODE_BUDGETS) cannot be enforced when forcing.
+
+    :param segment_info: Details of the segment to process.
+    :type segment_info: dict
+    :param tail_number: Aircraft tail number.
+    :type tail_number: str
+    :param kwargs: Keyword arguments passed into process_flight.
+    :raises ValueError: If forcing while node budgets are configured.
+    :returns: Generator of (results key, node name, items) tuples.
+    :rtype: generator
+    '''
+    if kwargs.get('force') and _budgets_enabled():
+        # Budgets are enforced by forking a child process, which may deadlock
+        # when forked from the processing thread.
+        raise ValueError('Node budgets cannot be enforced with '
+                         'iter_process_flight.')
+
+    # Queue of ('result', (key, name, items)), ('error', exc_info) or
+    # ('done', None) messages from the processing thread.
+    messages = six.moves.queue.Queue()
+    stop = threading.Event()
+
+    def callback(key, name, items):
+        if stop.is_set():
+            raise _StopProcessing()
+        messages.put(('result', (key, name, items)))
+
+    def run():
+        try:
+            process_flight(segment_info, tail_number, callback=callback,
+                           **kwargs)
+        except _StopProcessing:
+            pass
+        except Exception:
+            messages.put(('error', sys.exc_info()))
+            return
+        messages.put(('done', None))
+
+    thread = threading.Thread(target=run, name='iter_process_flight')
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            message, value = messages.get()
+            if message == 'result':
+                yield value
+            elif message == 'error':
+                six.reraise(*value)
+            else:
+                break
+    finally:
+        stop.set()
+        thread.join(STOP_TIMEOUT)
+        if thread.is_alive():
+            logger.warning("Processing of '%s' is stopping in the "
+                           "background.", segment_info.get('File'))
 
 
 def main():
@@ -673,6 +1921,20 @@ def main():
                         help='Strip the HDF5 file to only the LFL parameters')
     parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
                         help='Verbose logging')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, default=1,
+                        help='Number of threads to derive independent nodes with.')
+    parser.add_argument('--profile', dest='profile', type=str, metavar='PATH',
+                        help='Write a JSON profile of deriving each node to PATH.')
+    parser.add_argument('--write-behind', dest='write_behind',
+                        action='store_true',
+                        help='Write derived parameters on a background thread.')
+    parser.add_argument('--quick-look', dest='quick_look', action='store_true',
+                        help='Derive approximate results from parameters '
+                        'decimated to 1Hz without modifying the file.')
+    parser.add_argument('--deadline', dest='deadline', type=float,
+                        metavar='SECS',
+                        help='Only derive nodes within optional priority '
+                        'tiers until SECS have elapsed.')
 
     # Aircraft info
     parser.add_argument('-aircraft-family', dest='aircraft_family', type=str,
@@ -789,10 +2051,18 @@ def main():
     res = process_flight(
         segment_info, args.tail_number, aircraft_info=aircraft_info,
         requested=args.requested, required=args.required, initial=initial,
+        workers=args.workers, profile=bool(args.profile),
+        write_behind=args.write_behind, deadline=args.deadline,
+        quick_look=args.quick_look,
     )
+    if args.profile:
+        with open(args.profile, 'w') as profile_file:
+            json.dump(res['profile'], profile_file, indent=2, sort_keys=True)
+        logger.info("Profile of derived nodes written to json: %s",
+                    args.profile)
     # Flatten results.
-    res = {k: list(itertools.chain.from_iterable(six.itervalues(v)))
-           for k, v in six.iteritems(res)}
+    res = {k: list(itertools.chain.from_iterable(six.itervalues(res[k])))
+           for k in PROCESS_FLIGHT_RESULT_KEYS}
     
     logger.info("Derived parameters stored in hdf: %s", hdf_copy)
     # Write CSV file
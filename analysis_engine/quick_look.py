@@ -0,0 +1,174 @@
+'''
+Reduced-rate quick-look processing.
+
+QuickLookHDF wraps an hdf_file so that parameters are decimated to at most
+1Hz when they are loaded and derived parameters are kept in memory, leaving
+the HDF file unchanged. Deriving nodes from the decimated parameters gives an
+approximate overview of a flight far faster than processing at full rate
+(see process_flight's quick_look argument).
+'''
+import copy
+import numpy as np
+
+from flightdatautilities import units as ut
+
+from hdfaccess.parameter import MappedArray
+
+
+# LFL data types of parameters whose values are states rather than
+# measurements and which cannot be averaged.
+DISCRETE_DATA_TYPES = ('Discrete', 'Multi-state')
+
+
+def _is_discrete(param):
+    return isinstance(param.array, MappedArray) or \
+        getattr(param, 'data_type', None) in DISCRETE_DATA_TYPES or \
+        param.array.dtype == np.bool_
+
+
+def _circular_mean(blocks):
+    '''
+    :param blocks: Angles in degrees, averaged along axis 1.
+    :type blocks: np.ma.masked_array
+    :returns: Mean direction of each block in degrees between -180 and 180.
+    :rtype: np.ma.masked_array
+    '''
+    radians = np.radians(blocks)
+    return np.degrees(np.ma.arctan2(np.ma.sin(radians).mean(axis=1),
+                                    np.ma.cos(radians).mean(axis=1)))
+
+
+def decimate_param(param, max_frequency=1.0):
+    '''
+    Reduce the frequency of param to at most max_frequency by an integer
+    factor. Multistate and discrete parameters keep every nth sample
+    (sample-and-hold). Other parameters are averaged over each block of n
+    samples, moving the offset to the centre of the block. Angles (in
+    degrees) are averaged as directions so that blocks crossing 0/360, e.g.
+    Heading, are not averaged to the opposite direction.
+
+    :type param: Parameter
+    :param max_frequency: Maximum frequency of the decimated parameter.
+    :type max_frequency: float
+    :returns: A decimated copy of param or param if its frequency is not above max_frequency.
+    :rtype: Parameter
+    '''
+    if param.frequency <= max_frequency:
+        return param
+    step = int(np.ceil(param.frequency / float(max_frequency) - 1e-9))
+    decimated = copy.copy(param)
+    frequency = param.frequency / float(step)
+    decimated.frequency = frequency
+    # hdfaccess Parameters store the frequency under several names.
+    for alias in ('hz', 'sample_rate'):
+        if alias in vars(decimated):
+            setattr(decimated, alias, frequency)
+
+    if _is_discrete(param):
+        decimated.array = param.array[::step]
+        return decimated
+
+    count = -(-len(param.array) // step)
+    padded = np.ma.masked_all(count * step, dtype=np.float64)
+    padded[:len(param.array)] = param.array
+    blocks = padded.reshape(count, step)
+    if getattr(param, 'units', None) == ut.DEGREE:
+        array = _circular_mean(blocks)
+        if not np.ma.any(param.array < 0):
+            # Keep the range of unsigned angles, e.g. 0 to 360 for Heading.
+            array %= 360
+            # Tiny negative angles wrap to 360.
+            array[array >= 360] = 0
+        decimated.array = array
+    else:
+        decimated.array = blocks.mean(axis=1)
+    decimated.offset = param.offset + (step - 1) / (2.0 * param.frequency)
+    return decimated
+
+
+class QuickLookHDF(object):
+    '''
+    Wraps an hdf_file (which may be opened read only) for quick-look
+    processing. LFL parameters are decimated to at most max_frequency when
+    first loaded. Derived parameters and attributes are stored in memory and
+    are never written to the HDF file. All other attributes are those of the
+    wrapped hdf_file.
+    '''
+
+    def __init__(self, hdf, max_frequency=1.0):
+        '''
+        :param hdf: HDF file to load parameters from.
+        :type hdf: hdf_file
+        :param max_frequency: Maximum frequency of loaded parameters.
+        :type max_frequency: float
+        '''
+        self.hdf = hdf
+        self.max_frequency = max_frequency
+        self._decimated = {}
+        self._derived = {}
+        self._attrs = {}
+
+    def __getattr__(self, name):
+        return getattr(self.hdf, name)
+
+    def __contains__(self, name):
+        return name in self._derived or name in self.hdf
+
+    def __getitem__(self, name):
+        return self.get_param(name)
+
+    def valid_lfl_param_names(self):
+        return self.hdf.valid_lfl_param_names()
+
+    def valid_param_names(self):
+        '''
+        Parameters derived by an earlier full rate run are ignored so that
+        they are derived from the decimated LFL parameters.
+
+        :returns: Names of valid LFL parameters and derived parameters stored in memory.
+        :rtype: [str]
+        '''
+        names = self.valid_lfl_param_names()
+        lfl_names = set(names)
+        return names + [n for n in self._derived if n not in lfl_names]
+
+    def get_param(self, name, valid_only=False, **kwargs):
+        '''
+        Get a copy of a derived parameter from memory or of an LFL parameter
+        decimated to at most max_frequency.
+
+        :param name: Name of parameter.
+        :type name: str
+        :param valid_only: Raise KeyError if the parameter is invalid.
+        :type valid_only: bool
+        :param kwargs: Keyword arguments passed into hdf_file.get_param.
+        '''
+        param = self._derived.get(name)
+        if param is None:
+            key = (name, valid_only)
+            param = None if kwargs else self._decimated.get(key)
+            if param is None:
+                param = decimate_param(
+                    self.hdf.get_param(name, valid_only=valid_only, **kwargs),
+                    self.max_frequency)
+                if not kwargs:
+                    self._decimated[key] = param
+        param = copy.copy(param)
+        param.array = param.array.copy()
+        return param
+
+    def set_param(self, param):
+        '''
+        Store a derived parameter in memory.
+
+        :type param: DerivedParameterNode
+        '''
+        self._derived[param.name] = param
+
+    def get_attr(self, name, default=None):
+        if name in self._attrs:
+            return self._attrs[name]
+        return self.hdf.get_attr(name, default=default)
+
+    def set_attr(self, name, value):
+        self._attrs[name] = value
@@ -0,0 +1,396 @@
+'''
+Cost-model driven ordering of the process order calculated by
+dependency_order.
+
+dependency_order orders nodes depth first without regard for how long each
+node takes to derive or how large its result is. Ordering policies reorder
+nodes which are independent of each other using the costs of deriving each
+node recorded by previous runs for the same frame (see NodeCosts), e.g. to
+start long chains of nodes first when deriving nodes concurrently or to
+release aligned arrays sooner. A node is never moved before a node it depends
+upon.
+
+A policy is called as policy(process_order, dependencies, costs) and returns
+the reordered list of names, where dependencies maps each name within
+process_order to the names it depends upon and costs is a NodeCosts. The
+policy is selected with settings.PROCESS_ORDER_POLICY, either by name from
+ORDERING_POLICIES or as a callable. Costs are stored as JSON within
+settings.NODE_COSTS_DIR and are only recorded while the selected policy uses
+them (see needs_costs).
+'''
+import errno
+import heapq
+import logging
+import os
+import re
+import simplejson as json
+import six
+import tempfile
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from analysis_engine import settings
+
+
+logger = logging.getLogger(name=__name__)
+
+# Weight of the latest run within the recorded costs of a node.
+COST_WEIGHT = 0.3
+
+
+class NodeCosts(object):
+    '''
+    Wall time (seconds) and result size (bytes) of deriving each node,
+    averaged over previous runs. Nodes without recorded costs are assumed to
+    cost the mean of the recorded nodes.
+    '''
+
+    def __init__(self, costs=None):
+        '''
+        :param costs: Costs keyed by node name, e.g. {'Node Name': {'wall': 0.5, 'bytes': 8192}}.
+        :type costs: dict or None
+        '''
+        self.costs = costs or {}
+        self._defaults = {}
+
+    def __contains__(self, name):
+        return name in self.costs
+
+    def _default(self, key):
+        if key not in self._defaults:
+            values = [c[key] for c in self.costs.values() if key in c]
+            self._defaults[key] = \
+                float(sum(values)) / len(values) if values else 0.0
+        return self._defaults[key]
+
+    def _get(self, name, key):
+        try:
+            return self.costs[name][key]
+        except KeyError:
+            return self._default(key)
+
+    def wall(self, name):
+        '''
+        :returns: Seconds taken to derive the node.
+        :rtype: float
+        '''
+        return self._get(name, 'wall')
+
+    def nbytes(self, name):
+        '''
+        :returns: Size of the node's result in bytes.
+        :rtype: float
+        '''
+        return self._get(name, 'bytes')
+
+    def update(self, profile):
+        '''
+        Record the costs of a run.
+
+        :param profile: Statistics of each derived node as populated by derive_parameters' profile argument.
+        :type profile: dict
+        '''
+        for name, stats in six.iteritems(profile):
+            if 'budget_breach' in stats:
+                # The node was aborted, the cost is not representative.
+                continue
+            cost = self.costs.setdefault(name, {})
+            for key in ('wall', 'bytes'):
+                if key not in stats:
+                    continue
+                elif key in cost:
+                    cost[key] += COST_WEIGHT * (stats[key] - cost[key])
+                else:
+                    cost[key] = stats[key]
+        self._defaults = {}
+
+
+def costs_path(aircraft_info, cost_dir=None):
+    '''
+    :param aircraft_info: Aircraft attributes including 'Frame' and optionally 'Frame Qualifier'.
+    :type aircraft_info: dict
+    :param cost_dir: Directory of stored costs, defaults to settings.NODE_COSTS_DIR.
+    :type cost_dir: str or None
+    :returns: Path of the costs of the aircraft's frame or None if costs are not stored.
+    :rtype: str or None
+    '''
+    if cost_dir is None:
+        cost_dir = settings.NODE_COSTS_DIR
+    frame = aircraft_info.get('Frame')
+    if cost_dir is None or not frame:
+        return None
+    qualifier = aircraft_info.get('Frame Qualifier')
+    if qualifier:
+        frame = '%s-%s' % (frame, qualifier)
+    return os.path.join(cost_dir, re.sub(r'[^\w.-]', '_', frame) + '.json')
+
+
+def load_costs(path):
+    '''
+    :param path: Path of stored costs (see costs_path).
+    :type path: str or None
+    :returns: Stored costs, empty if path is None or unreadable.
+    :rtype: NodeCosts
+    '''
+    if path is None or not os.path.exists(path):
+        return NodeCosts()
+    try:
+        with open(path) as costs_file:
+            return NodeCosts(json.load(costs_file))
+    except (IOError, ValueError):
+        logger.warning("Ignoring unreadable node costs '%s'.", path)
+        return NodeCosts()
+
+
+@contextmanager
+def _costs_lock(path):
+    '''
+    Hold an exclusive lock of the stored costs so that concurrent runs do not
+    overwrite each other's updates. Costs are updated without a lock where
+    fcntl is not available (Windows).
+    '''
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def save_costs(path, profile):
+    '''
+    Record the costs of a run within the stored costs. The stored costs are
+    locked while they are updated, and written to a temporary file before
+    renaming so that concurrent readers never see partially written costs.
+
+    :param path: Path of stored costs (see costs_path).
+    :type path: str
+    :param profile: Statistics of each derived node (see NodeCosts.update).
+    :type profile: dict
+    '''
+    dirname = os.path.dirname(path)
+    try:
+        os.makedirs(dirname)
+    except OSError as err:
+        if err.errno != errno.EEXIST:
+            raise
+    with _costs_lock(path):
+        costs = load_costs(path)
+        costs.update(profile)
+        fd, temp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        with os.fdopen(fd, 'w') as costs_file:
+            json.dump(costs.costs, costs_file, sort_keys=True)
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            # Another process saved costs first (Windows).
+            os.remove(temp_path)
+
+
+def order_dependencies(node_mgr, process_order):
+    '''
+    :type node_mgr: NodeManager
+    :param process_order: Names of nodes in dependency order.
+    :type process_order: [str]
+    :returns: Names of derived nodes within process_order which each node depends upon. Nodes which are not derived (LFL parameters and attributes) have no dependencies and their position within the process order does not matter.
+    :rtype: {str: [str]}
+    '''
+    hdf_keys = set(node_mgr.hdf_keys)
+    derived = set(name for name in process_order
+                  if name in node_mgr.derived_nodes and name not in hdf_keys
+                  and node_mgr.get_attribute(name) is None)
+    dependencies = {}
+    for name in process_order:
+        if name in derived:
+            node_class = node_mgr.derived_nodes[name]
+            dependencies[name] = [d for d in node_class.get_dependency_names()
+                                  if d in derived]
+        else:
+            dependencies[name] = []
+    return dependencies
+
+
+def _consumers(process_order, dependencies):
+    consumers = {name: [] for name in process_order}
+    for name in process_order:
+        for dep_name in dependencies[name]:
+            consumers[dep_name].append(name)
+    return consumers
+
+
+def check_order(process_order, dependencies):
+    '''
+    :returns: Names within process_order which precede a node they depend upon.
+    :rtype: [str]
+    '''
+    seen = set()
+    invalid = []
+    for name in process_order:
+        if any(d not in seen for d in dependencies[name]):
+            invalid.append(name)
+        seen.add(name)
+    return invalid
+
+
+def dependency_policy(process_order, dependencies, costs):
+    '''
+    Keep the depth first order of dependency_order.
+    '''
+    return list(process_order)
+
+
+def critical_path_policy(process_order, dependencies, costs):
+    '''
+    Order nodes by the longest time to derive the node and the nodes which
+    depend upon it, so that long chains of nodes are started first when
+    deriving nodes concurrently (see derive_parameters' workers argument).
+    '''
+    consumers = _consumers(process_order, dependencies)
+    priority = {}
+    # process_order is in dependency order, so each node's consumers are
+    # visited first when reversed.
+    for name in reversed(process_order):
+        priority[name] = costs.wall(name) + max(
+            [priority[c] for c in consumers[name]] or [0])
+
+    position = {name: index for index, name in enumerate(process_order)}
+    waiting = {name: len(dependencies[name]) for name in process_order}
+    ready = [(-priority[n], position[n], n) for n in process_order
+             if not waiting[n]]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        name = heapq.heappop(ready)[2]
+        order.append(name)
+        for consumer in consumers[name]:
+            waiting[consumer] -= 1
+            if not waiting[consumer]:
+                heapq.heappush(ready, (-priority[consumer],
+                                       position[consumer], consumer))
+    return order
+
+
+def memory_policy(process_order, dependencies, costs):
+    '''
+    Greedily derive the node which releases the most bytes of results no
+    longer required by other nodes, less the size of its own result if other
+    nodes depend upon it, to reduce the peak size of the results held in
+    memory.
+    '''
+    consumers = _consumers(process_order, dependencies)
+    # Number of consumers of each node which are yet to be ordered.
+    remaining = {name: len(consumers[name]) for name in process_order}
+    position = {name: index for index, name in enumerate(process_order)}
+    waiting = {name: len(dependencies[name]) for name in process_order}
+    ordered = set()
+
+    def score(name):
+        released = sum(costs.nbytes(d) for d in set(dependencies[name])
+                       if remaining[d] == 1)
+        return released - (costs.nbytes(name) if consumers[name] else 0)
+
+    def push(name):
+        heapq.heappush(ready, (-score(name), position[name], name))
+
+    ready = []
+    for name in process_order:
+        if not waiting[name]:
+            push(name)
+    order = []
+    while ready:
+        neg_score, _, name = heapq.heappop(ready)
+        if name in ordered:
+            continue
+        elif -neg_score != score(name):
+            # Stale entry, the score increased after it was pushed.
+            push(name)
+            continue
+        ordered.add(name)
+        order.append(name)
+        for dep_name in set(dependencies[name]):
+            remaining[dep_name] -= 1
+            if remaining[dep_name] == 1:
+                # The last consumer now releases dep_name.
+                for consumer in consumers[dep_name]:
+                    if consumer not in ordered and not waiting[consumer]:
+                        push(consumer)
+        for consumer in consumers[name]:
+            waiting[consumer] -= 1
+            if not waiting[consumer]:
+                push(consumer)
+    return order
+
+
+ORDERING_POLICIES = {
+    'dependency': dependency_policy,
+    'critical_path': critical_path_policy,
+    'memory': memory_policy,
+}
+
+
+def get_policy(policy):
+    '''
+    :param policy: Name of a policy within ORDERING_POLICIES or a policy callable.
+    :type policy: str or callable
+    :rtype: callable
+    :raises KeyError: If the policy name is unknown.
+    '''
+    return policy if callable(policy) else ORDERING_POLICIES[policy]
+
+
+def needs_costs(policy=None):
+    '''
+    :param policy: Ordering policy, defaults to settings.PROCESS_ORDER_POLICY (see get_policy).
+    :type policy: str or callable or None
+    :returns: Whether the policy orders nodes by their costs, i.e. whether costs should be recorded. Custom policies are assumed to use costs.
+    :rtype: bool
+    '''
+    policy = get_policy(settings.PROCESS_ORDER_POLICY if policy is None
+                        else policy)
+    return policy is not dependency_policy
+
+
+def schedule(node_mgr, process_order, policy=None, costs=None):
+    '''
+    Reorder process_order with an ordering policy. The process order is
+    returned unchanged if the policy's order contains different nodes or
+    violates dependencies.
+
+    :type node_mgr: NodeManager
+    :param process_order: Names of nodes in dependency order (see dependency_order).
+    :type process_order: [str]
+    :param policy: Ordering policy, defaults to settings.PROCESS_ORDER_POLICY (see get_policy).
+    :type policy: str or callable or None
+    :param costs: Node costs, defaults to the stored costs of node_mgr's frame.
+    :type costs: NodeCosts or None
+    :returns: Reordered process order.
+    :rtype: [str]
+    '''
+    policy = get_policy(settings.PROCESS_ORDER_POLICY if policy is None
+                        else policy)
+    if not needs_costs(policy):
+        return process_order
+    if costs is None:
+        costs = load_costs(costs_path(node_mgr.aircraft_info))
+    dependencies = order_dependencies(node_mgr, process_order)
+    order = policy(list(process_order), dependencies, costs)
+    if sorted(order) != sorted(process_order):
+        logger.error("Ordering policy '%s' changed the nodes within the "
+                     "process order, ignoring.",
+                     getattr(policy, '__name__', policy))
+        return process_order
+    invalid = check_order(order, dependencies)
+    if invalid:
+        logger.error("Ordering policy '%s' moved nodes before their "
+                     "dependencies, ignoring: %s",
+                     getattr(policy, '__name__', policy), invalid)
+        return process_order
+    return order
@@ -53,6 +53,78 @@ WORKING_DIR = os.path.expanduser('~')
 # Cache parameters which are used more than n times in HDF
 CACHE_PARAMETER_MIN_USAGE = 0
 
+# Directory to cache execution plans (process order and dependency tree) in.
+# Plans are reused for segments with the same node modules, parameters,
+# requested nodes and aircraft attributes. None disables the plan cache.
+PLAN_CACHE_DIR = None
+
+# Path of the node registry manifest (see analysis_engine.node_registry).
+# When set, process_flight only imports the node modules required by the
+# requested nodes. The manifest is rebuilt when node modules change. None
+# imports all NODE_MODULES.
+NODE_REGISTRY_PATH = None
+
+# Maximum number of derived parameters waiting to be written to the HDF when
+# writing behind derivation (see process_flight's write_behind argument).
+HDF_WRITE_BEHIND_MAX_PENDING = 10
+
+# Priority tier of nodes when processing with a deadline (see process_flight's
+# deadline argument). Tier 0 is always derived, optional tiers (1, 2, ...) are
+# derived in order only while time remains before the deadline. Nodes without
+# a priority class attribute are within NODE_PRIORITY_DEFAULT. NODE_PRIORITIES
+# overrides the tier of nodes by name, e.g. {'Approach Information': 2}. A node
+# is promoted to the tier of any node which depends upon it, so an optional
+# node is only skipped if the nodes depending upon it are optional too.
+NODE_PRIORITY_DEFAULT = 0
+NODE_PRIORITIES = {}
+
+# Minimum number of seconds between writing checkpoints of the derived nodes
+# to the sidecar file (see process_flight's checkpoint argument). A final
+# checkpoint is written when processing fails.
+CHECKPOINT_INTERVAL = 60
+
+# Wall-clock (seconds) and memory (bytes) budgets for deriving each node when
+# errors are ignored (see process_flight's force argument). Nodes with a
+# budget are derived within a forked child process which is killed when it
+# exceeds the budget and the node is stored as failed. Memory is measured as
+# the growth of the child's resident set size and is only enforced where
+# /proc/<pid>/statm is available. Budgets cannot be combined with workers or
+# write_behind.
+# None disables the budget. NODE_BUDGETS overrides the budgets of nodes by
+# name, e.g. {'Latitude Smoothed': {'time': 600, 'memory': None}}.
+NODE_TIME_BUDGET = None
+NODE_MEMORY_BUDGET = None
+NODE_BUDGETS = {}
+
+# Remember the result of each derived node's can_operate for the available
+# dependencies and attribute values it was called with. The cache is kept for
+# the lifetime of the process, so it is shared by every flight processed by a
+# worker, and is cleared once it holds CAN_OPERATE_CACHE_SIZE results. Nodes
+# whose can_operate is not a pure function of its arguments, including those
+# which log why they cannot operate, set the can_operate_cacheable class
+# attribute to False.
+CAN_OPERATE_CACHE = False
+CAN_OPERATE_CACHE_SIZE = 100000
+
+# Maximum number of alignment plans (the slave sample offsets and
+# interpolation weights of a single period for each combination of array
+# length, frequencies and offsets) kept by align_args. The cache is cleared
+# once it holds this many plans.
+ALIGNMENT_PLAN_CACHE_SIZE = 32
+
+# Policy reordering independent nodes within the process order (see
+# analysis_engine.scheduling). 'dependency' keeps the order of
+# dependency_order, 'critical_path' starts the longest chains of nodes first
+# when deriving nodes concurrently and 'memory' reduces the size of the
+# results held in memory. A callable may be used as a custom policy.
+PROCESS_ORDER_POLICY = 'dependency'
+
+# Directory to store the average wall time and result size of each derived
+# node in, per frame, which ordering policies use as their cost model. Costs
+# are only recorded when PROCESS_ORDER_POLICY is not 'dependency'. None
+# disables recording costs.
+NODE_COSTS_DIR = None
+
 
 ##############################################################################
 # Segment Splitting
@@ -92,6 +164,16 @@ NODE_CACHE = True
 # accurate to. A value of None will retain full accuracy.
 NODE_CACHE_OFFSET_DP = None
 
+# Release cached nodes, and derived nodes which are not saved to the HDF, once
+# every node which depends upon them has been derived. Reduces peak memory
+# usage without affecting results.
+NODE_CACHE_EVICTION = True
+
+# Minimum number of items (KPVs or KTIs) within a node for queries such as
+# get, get_max and get_next to use an array-backed columnar index of the
+# items rather than checking each item in turn.
+NODE_COLUMNS_MIN_ITEMS = 20
+
 
 ##############################################################################
 # Parameter Analysis
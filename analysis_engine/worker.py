@@ -0,0 +1,526 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Long-lived analysis worker service.
+
+Starting a fresh interpreter for every file spends several seconds importing
+the node modules before any data is read. A worker imports the node modules,
+loads the node registry, settings, hooks and API handler once and then
+processes jobs from a directory based job queue until it is stopped::
+
+    FlightDataWorker /var/spool/analyser --processes 4
+
+Jobs are JSON files submitted to the queue's 'jobs' directory (see
+JobQueue.submit and WorkerClient)::
+
+    {"id": "...", "type": "process_flight", "file": "/data/G-ABCD_1.hdf5",
+     "tail_number": "G-ABCD",
+     "segment_info": {"Start Datetime": "2015-01-01T13:00:00+00:00"},
+     "aircraft_info": {"Family": "A320"}, "achieved_flight_record": {},
+     "requested": [], "required": [], "deadline": 30, "quick_look": false,
+     "checkpoint": true}
+
+    {"id": "...", "type": "split_hdf_to_segments", "file": "/data/G-ABCD.hdf5",
+     "tail_number": "G-ABCD", "fallback_dt": "2015-01-01T13:00:00+00:00",
+     "validation_dt": null, "dest_dir": "/data/segments"}
+
+Process flight jobs accept the keys of process_batch manifest entries.
+Workers claim jobs by renaming them into the 'claimed' directory, so any
+number of workers may share a queue, and write the result of each job to
+'results/<id>.json'. Jobs left within the 'claimed' directory by workers
+which stopped unexpectedly are returned to the queue when a worker starts
+(see JobQueue.recover)::
+
+    {"id": "...", "type": "process_flight", "status": "success",
+     "duration": 12.3, "result": {...}}
+
+The result of a process_flight job is the JSON of process_flight_to_json and
+the result of a split_hdf_to_segments job is a list of segments converted
+with node_to_jsondict. Failed jobs have "error" and "traceback" instead of
+"result".
+'''
+
+from __future__ import print_function
+
+import argparse
+import errno
+import logging
+import multiprocessing
+import os
+import simplejson as json
+import socket
+import sys
+import tempfile
+import time
+import traceback
+import uuid
+
+from dateutil import parser as date_parser
+
+from flightdatautilities import api
+
+from analysis_engine import settings
+from analysis_engine.json_tools import node_to_jsondict, process_flight_to_json
+from analysis_engine.node import can_operate_cache
+from analysis_engine.node_registry import get_registry
+from analysis_engine.process_batch import segment_job
+from analysis_engine.process_flight import process_flight
+from analysis_engine.split_hdf_to_segments import split_hdf_to_segments
+from analysis_engine.utils import get_aircraft_info, get_derived_nodes
+
+
+logger = logging.getLogger(name=__name__)
+
+JOB_TYPES = ('process_flight', 'split_hdf_to_segments')
+
+
+def _write_json(path, obj):
+    '''
+    Write obj to a temporary file before renaming so that readers never see
+    a partially written file.
+    '''
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                     suffix='.tmp')
+    with os.fdopen(fd, 'w') as json_file:
+        json.dump(obj, json_file)
+    os.rename(temp_path, path)
+
+
+def _process_running(pid):
+    '''
+    :returns: Whether a process with the pid is running on this host.
+    :rtype: bool
+    '''
+    try:
+        os.kill(pid, 0)
+    except OSError as err:
+        return err.errno != errno.ESRCH
+    return True
+
+
+def _parse_datetime(value):
+    if value is None:
+        return None
+    return date_parser.parse(value)
+
+
+class JobQueue(object):
+    '''
+    Directory based job queue shared by workers and clients.
+
+    :ivar path: Root directory of the queue.
+    :type path: str
+    '''
+    STOP_FILENAME = 'stop'
+    # Number of times a job is returned to the queue after its worker stopped
+    # unexpectedly before the job is failed, e.g. if the job crashes workers.
+    MAX_RECOVERIES = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.jobs_dir = os.path.join(path, 'jobs')
+        self.claimed_dir = os.path.join(path, 'claimed')
+        self.results_dir = os.path.join(path, 'results')
+        for dirname in (self.jobs_dir, self.claimed_dir, self.results_dir):
+            try:
+                os.makedirs(dirname)
+            except OSError as err:
+                if err.errno != errno.EEXIST:
+                    raise
+
+    def submit(self, job):
+        '''
+        Add a job to the queue. A job id is assigned if job does not have one.
+
+        :type job: dict
+        :returns: Job id.
+        :rtype: str
+        '''
+        job = dict(job)
+        job.setdefault('id', uuid.uuid4().hex)
+        if job.get('type') not in JOB_TYPES:
+            raise ValueError("Unknown job type '%s'." % job.get('type'))
+        # Jobs are claimed in the order they were submitted.
+        filename = '%017.6f-%s.json' % (time.time(), job['id'])
+        _write_json(os.path.join(self.jobs_dir, filename), job)
+        return job['id']
+
+    def _fail(self, claimed_path, error, tb=None):
+        '''
+        Store a failed result for a claimed job which cannot be run.
+        '''
+        filename = os.path.basename(claimed_path).rsplit('@', 2)[0]
+        # Job files are named '<submitted>-<id>.json'.
+        job_id = filename.split('-', 1)[-1][:-len('.json')]
+        logger.error("Failed job '%s': %s", job_id, error)
+        self.complete(claimed_path, {
+            'id': job_id, 'type': None, 'status': 'failed', 'error': error,
+            'traceback': tb, 'duration': 0.0})
+
+    def claim(self):
+        '''
+        Claim the oldest job within the queue. Claimed job files are named
+        after the claiming host and process (see recover). Jobs which cannot
+        be read are stored as failed and skipped.
+
+        :returns: Path of the claimed job file and the job or None if the queue is empty.
+        :rtype: (str, dict) or None
+        '''
+        owner = '@%s@%d' % (socket.gethostname(), os.getpid())
+        for filename in sorted(os.listdir(self.jobs_dir)):
+            if not filename.endswith('.json'):
+                continue
+            claimed_path = os.path.join(self.claimed_dir, filename + owner)
+            try:
+                os.rename(os.path.join(self.jobs_dir, filename), claimed_path)
+            except OSError:
+                # Claimed by another worker.
+                continue
+            try:
+                with open(claimed_path) as job_file:
+                    job = json.load(job_file)
+                if not isinstance(job, dict):
+                    raise ValueError('Job is not a JSON object.')
+            except (IOError, ValueError) as err:
+                self._fail(claimed_path, '%s: %s' % (err.__class__.__name__,
+                                                     err),
+                           traceback.format_exc())
+                continue
+            return claimed_path, job
+        return None
+
+    def recover(self):
+        '''
+        Return jobs claimed by worker processes on this host which are no
+        longer running to the queue. A job which has already been recovered
+        MAX_RECOVERIES times is stored as failed instead.
+
+        :returns: Number of recovered jobs.
+        :rtype: int
+        '''
+        hostname = socket.gethostname()
+        recovered = 0
+        for claimed_name in os.listdir(self.claimed_dir):
+            try:
+                filename, host, pid = claimed_name.rsplit('@', 2)
+                pid = int(pid)
+            except ValueError:
+                continue
+            if host != hostname or _process_running(pid):
+                continue
+            claimed_path = os.path.join(self.claimed_dir, claimed_name)
+            # Rename before reading so that only one worker recovers the job.
+            recovering_path = claimed_path + '.recovering'
+            try:
+                os.rename(claimed_path, recovering_path)
+            except OSError:
+                continue
+            try:
+                with open(recovering_path) as job_file:
+                    job = json.load(job_file)
+                job['recoveries'] = job.get('recoveries', 0) + 1
+            except (AttributeError, IOError, ValueError) as err:
+                self._fail(recovering_path, '%s: %s' % (
+                    err.__class__.__name__, err), traceback.format_exc())
+                continue
+            if job['recoveries'] > self.MAX_RECOVERIES:
+                self._fail(recovering_path, 'Worker stopped while running '
+                                            'the job %d times.' %
+                           job['recoveries'])
+                continue
+            logger.warning("Recovering job '%s' claimed by stopped worker "
+                           "process %d.", job.get('id'), pid)
+            _write_json(os.path.join(self.jobs_dir, filename), job)
+            os.remove(recovering_path)
+            recovered += 1
+        return recovered
+
+    def complete(self, claimed_path, result):
+        '''
+        Store the result of a claimed job and remove it from the queue.
+        '''
+        _write_json(self.result_path(result['id']), result)
+        os.remove(claimed_path)
+
+    def result_path(self, job_id):
+        return os.path.join(self.results_dir, '%s.json' % job_id)
+
+    def get_result(self, job_id):
+        '''
+        :returns: Result of the job or None if it has not completed.
+        :rtype: dict or None
+        '''
+        try:
+            with open(self.result_path(job_id)) as result_file:
+                return json.load(result_file)
+        except IOError as err:
+            if err.errno != errno.ENOENT:
+                raise
+            return None
+
+    def request_stop(self):
+        '''
+        Ask workers serving this queue to exit once their current job is
+        complete.
+        '''
+        open(os.path.join(self.path, self.STOP_FILENAME), 'w').close()
+
+    def stop_requested(self):
+        return os.path.exists(os.path.join(self.path, self.STOP_FILENAME))
+
+
+class AnalysisWorker(object):
+    '''
+    Processes jobs within a single interpreter which has imported the node
+    modules once.
+
+    :ivar derived_nodes: Derived nodes collected from the node modules.
+    :type derived_nodes: dict
+    '''
+
+    def __init__(self, additional_modules=[]):
+        '''
+        :param additional_modules: List of module paths to import in addition to settings.NODE_MODULES.
+        :type additional_modules: [str]
+        '''
+        start = time.time()
+        node_modules = settings.NODE_MODULES + additional_modules
+        self.derived_nodes = get_derived_nodes(node_modules)
+        if settings.NODE_REGISTRY_PATH:
+            # Keep the registry current for analyser processes which are
+            # not served by the worker.
+            get_registry(node_modules, settings.NODE_REGISTRY_PATH)
+        # Importing process_flight loads the hooks, creating the API handler
+        # imports it and any data it caches.
+        api.get_handler(settings.API_HANDLER)
+        logger.info("Worker loaded %d nodes in %.2f secs.",
+                    len(self.derived_nodes), time.time() - start)
+
+    def run_job(self, job):
+        '''
+        Run a job, see the module docstring for the keys of jobs and results.
+
+        Exceptions are recorded in the result rather than raised so that the
+        worker continues to process jobs.
+
+        :type job: dict
+        :rtype: dict
+        '''
+        result = {'id': job.get('id'), 'type': job.get('type'),
+                  'status': 'failed'}
+        start = time.time()
+        try:
+            if job.get('type') == 'process_flight':
+                result['result'] = self.process_flight(job)
+            elif job.get('type') == 'split_hdf_to_segments':
+                result['result'] = self.split_hdf_to_segments(job)
+            else:
+                raise ValueError("Unknown job type '%s'." % job.get('type'))
+            result['status'] = 'success'
+        except Exception as err:
+            logger.exception("Failed to run %s job '%s'.", job.get('type'),
+                             job.get('id'))
+            result['error'] = '%s: %s' % (err.__class__.__name__, err)
+            result['traceback'] = traceback.format_exc()
+        result['duration'] = time.time() - start
+        return result
+
+    def process_flight(self, job):
+        '''
+        :returns: process_flight results converted with process_flight_to_json.
+        :rtype: dict
+        '''
+        segment = segment_job(job)
+        segment_info = dict(segment['segment_info'], File=segment['file'])
+        res = process_flight(
+            segment_info, segment['tail_number'],
+            aircraft_info=dict(segment['aircraft_info']),
+            achieved_flight_record=segment['achieved_flight_record'],
+            requested=job.get('requested') or [],
+            required=job.get('required') or [],
+            derived_nodes=self.derived_nodes,
+            deadline=job.get('deadline'),
+            quick_look=job.get('quick_look', False),
+            checkpoint=job.get('checkpoint', False))
+        return json.loads(process_flight_to_json(res, indent=None))
+
+    def split_hdf_to_segments(self, job):
+        '''
+        :returns: Segments converted with node_to_jsondict.
+        :rtype: [dict]
+        '''
+        aircraft_info = job.get('aircraft_info') or \
+            get_aircraft_info(job['tail_number'])
+        segments = split_hdf_to_segments(
+            job['file'], aircraft_info,
+            fallback_dt=_parse_datetime(job.get('fallback_dt')),
+            validation_dt=_parse_datetime(job.get('validation_dt')),
+            dest_dir=job.get('dest_dir'))
+        return [node_to_jsondict(segment) for segment in segments]
+
+    def serve(self, queue, poll_interval=1.0, max_jobs=None):
+        '''
+        Recover jobs of stopped workers (see JobQueue.recover) and process
+        jobs from queue until a stop is requested.
+
+        :type queue: JobQueue
+        :param poll_interval: Seconds to wait before checking an empty queue again.
+        :type poll_interval: float
+        :param max_jobs: Return after processing this many jobs.
+        :type max_jobs: int or None
+        :returns: Number of jobs processed.
+        :rtype: int
+        '''
+        queue.recover()
+        processed = 0
+        while not queue.stop_requested():
+            if max_jobs is not None and processed >= max_jobs:
+                break
+            claimed = queue.claim()
+            if claimed is None:
+                time.sleep(poll_interval)
+                continue
+            claimed_path, job = claimed
+            result = self.run_job(job)
+            queue.complete(claimed_path, result)
+            logger.info("Completed %s job '%s' (%s) in %.2f secs.",
+                        result['type'], result['id'], result['status'],
+                        result['duration'])
+            if settings.CAN_OPERATE_CACHE:
+                stats = can_operate_cache.stats()
+                logger.info("can_operate cache: %d hits, %d misses (%.1f%% "
+                            "hit rate), %d results.", stats['hits'],
+                            stats['misses'], stats['hit_rate'] * 100,
+                            stats['size'])
+            processed += 1
+        return processed
+
+
+class WorkerClient(object):
+    '''
+    Client submitting jobs to workers serving a JobQueue.
+    '''
+
+    def __init__(self, path, poll_interval=0.1):
+        self.queue = JobQueue(path)
+        self.poll_interval = poll_interval
+
+    def submit(self, job_type, **kwargs):
+        '''
+        :param job_type: One of JOB_TYPES.
+        :type job_type: str
+        :param kwargs: Job keys, see module docstring.
+        :returns: Job id.
+        :rtype: str
+        '''
+        return self.queue.submit(dict(kwargs, type=job_type))
+
+    def wait(self, job_id, timeout=None):
+        '''
+        Wait for the result of a job.
+
+        :param timeout: Seconds to wait for the result, or forever if None.
+        :type timeout: float or None
+        :rtype: dict
+        :raises RuntimeError: If the result is not available within timeout.
+        '''
+        start = time.time()
+        while True:
+            result = self.queue.get_result(job_id)
+            if result is not None:
+                return result
+            if timeout is not None and time.time() - start > timeout:
+                raise RuntimeError("Timed out waiting for job '%s'." % job_id)
+            time.sleep(self.poll_interval)
+
+    def run(self, job_type, timeout=None, **kwargs):
+        '''
+        Submit a job and wait for its result.
+
+        :rtype: dict
+        '''
+        return self.wait(self.submit(job_type, **kwargs), timeout=timeout)
+
+
+class LocalClient(object):
+    '''
+    Stand-in for WorkerClient which runs jobs within the calling process,
+    e.g. for tests.
+    '''
+
+    def __init__(self, worker=None):
+        self.worker = worker or AnalysisWorker()
+        self.results = {}
+
+    def submit(self, job_type, **kwargs):
+        job = dict(kwargs, type=job_type)
+        job.setdefault('id', uuid.uuid4().hex)
+        # Round trip through JSON as the job would be within the queue.
+        job = json.loads(json.dumps(job))
+        self.results[job['id']] = json.loads(json.dumps(
+            self.worker.run_job(job)))
+        return job['id']
+
+    def wait(self, job_id, timeout=None):
+        return self.results.pop(job_id)
+
+    def run(self, job_type, timeout=None, **kwargs):
+        return self.wait(self.submit(job_type, **kwargs), timeout=timeout)
+
+
+def _serve_process(path, additional_modules, poll_interval):
+    '''
+    Target of worker processes started by main.
+    '''
+    worker = AnalysisWorker(additional_modules=additional_modules)
+    worker.serve(JobQueue(path), poll_interval=poll_interval)
+
+
+def main():
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler(stream=sys.stdout))
+    parser = argparse.ArgumentParser(
+        description='Process jobs from a directory based job queue.')
+    parser.add_argument('path', help='Job queue directory.')
+    parser.add_argument('-p', '--processes', dest='processes', type=int,
+                        default=1, help='Number of worker processes.')
+    parser.add_argument('-m', '--module', dest='modules', action='append',
+                        default=[], help='Additional node module to import.')
+    parser.add_argument('--poll-interval', dest='poll_interval', type=float,
+                        default=1.0,
+                        help='Seconds between checks of an empty queue.')
+    parser.add_argument('--stop', dest='stop', action='store_true',
+                        help='Ask workers serving the queue to exit.')
+    args = parser.parse_args()
+
+    queue = JobQueue(args.path)
+    if args.stop:
+        queue.request_stop()
+        return
+    stop_path = os.path.join(args.path, JobQueue.STOP_FILENAME)
+    if os.path.exists(stop_path):
+        os.remove(stop_path)
+
+    if args.processes == 1:
+        _serve_process(args.path, args.modules, args.poll_interval)
+        return
+    processes = [multiprocessing.Process(
+        target=_serve_process,
+        args=(args.path, args.modules, args.poll_interval))
+        for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        queue.request_stop()
+        for process in processes:
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
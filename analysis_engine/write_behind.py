@@ -0,0 +1,119 @@
+'''
+Write-behind persistence of derived parameters to an HDF file.
+'''
+import copy
+import logging
+import six
+import sys
+import threading
+
+from analysis_engine import settings
+
+
+logger = logging.getLogger(name=__name__)
+
+
+class WriteBehindHDF(object):
+    '''
+    Wraps an hdf_file so that parameters are saved by a background thread
+    while derivation continues. Parameters which have not been written yet
+    are served from memory. All other attributes are those of the wrapped
+    hdf_file.
+
+    Pending parameters are held within a bounded queue so that set_param
+    blocks while max_pending parameters are waiting to be written. Errors
+    raised while writing are re-raised by the next call to set_param or by
+    close, which must be called to ensure every parameter has been written.
+    '''
+
+    def __init__(self, hdf, max_pending=None):
+        '''
+        :param hdf: HDF file to write parameters to.
+        :type hdf: hdf_file
+        :param max_pending: Maximum number of parameters waiting to be written, defaults to settings.HDF_WRITE_BEHIND_MAX_PENDING.
+        :type max_pending: int or None
+        '''
+        if max_pending is None:
+            max_pending = settings.HDF_WRITE_BEHIND_MAX_PENDING
+        self.hdf = hdf
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # Serialises access to the HDF file between the writer and readers.
+        self._hdf_lock = threading.Lock()
+        self._queue = six.moves.queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._write,
+                                        name='WriteBehindHDF')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __getattr__(self, name):
+        return getattr(self.hdf, name)
+
+    def _write(self):
+        '''
+        Writer thread: save parameters from the queue until the sentinel None
+        is received. Once an error has occurred, remaining parameters are
+        discarded.
+        '''
+        while True:
+            param = self._queue.get()
+            if param is None:
+                break
+            if self._error is None:
+                try:
+                    with self._hdf_lock:
+                        self.hdf.set_param(param)
+                except Exception:
+                    logger.exception("Failed to write parameter '%s'.",
+                                     param.name)
+                    self._error = sys.exc_info()
+            with self._pending_lock:
+                if self._pending.get(param.name) is param:
+                    del self._pending[param.name]
+
+    def _raise_error(self):
+        if self._error is not None:
+            six.reraise(*self._error)
+
+    def set_param(self, param):
+        '''
+        Queue param to be written to the HDF file.
+
+        :type param: DerivedParameterNode
+        :raises: Any error raised while writing a previous parameter.
+        '''
+        self._raise_error()
+        with self._pending_lock:
+            self._pending[param.name] = param
+        self._queue.put(param)
+
+    def get_param(self, name, **kwargs):
+        '''
+        Get a copy of a parameter, from memory if it has not been written.
+
+        :param name: Name of parameter.
+        :type name: str
+        :param kwargs: Keyword arguments passed into hdf_file.get_param.
+        '''
+        with self._pending_lock:
+            param = self._pending.get(name)
+        if param is None:
+            with self._hdf_lock:
+                return self.hdf.get_param(name, **kwargs)
+        param = copy.copy(param)
+        param.array = param.array.copy()
+        return param
+
+    def close(self, raise_error=True):
+        '''
+        Wait until all pending parameters have been written and stop the
+        writer thread.
+
+        :param raise_error: Raise any error which occurred while writing, otherwise it is only logged.
+        :type raise_error: bool
+        '''
+        self._queue.put(None)
+        self._thread.join()
+        if raise_error:
+            self._raise_error()
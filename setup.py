@@ -38,6 +38,9 @@ setup(
         'console_scripts': [
             'FlightDataSplitter = analysis_engine.split_hdf_to_segments:main',
             'FlightDataAnalyzer = analysis_engine.process_flight:main',
+            'FlightDataBatchAnalyzer = analysis_engine.process_batch:main',
+            'FlightDataNodeRegistry = analysis_engine.node_registry:main',
+            'FlightDataWorker = analysis_engine.worker:main',
         ],
         'gui_scripts' : [],
     },
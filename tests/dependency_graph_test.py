@@ -2,6 +2,7 @@ from __future__ import print_function
 
 import collections
 import imp
+import mock
 import os
 import networkx as nx
 import six
@@ -9,10 +10,14 @@ import unittest
 
 from datetime import datetime
 
+from analysis_engine import settings
 from analysis_engine.node import (DerivedParameterNode, Node, NodeManager, P)
 from analysis_engine.dependency_graph import (
+    _dependency_order,
     any_predecessors_in_requested,
+    dependencies3,
     dependency_order, 
+    DependencyIndex,
     graph_nodes, 
     graph_adjacencies,
     indent_tree,
@@ -360,6 +365,131 @@ Node: Start Datetime 	Pre: [] 	Succ: [] 	Neighbors: [] 	Edges: []
 
         # try a bigger cyclic dependency on top of the above one
         
+    def test_dependency_order_matches_graph(self):
+        self.derived_nodes['P9'] = MockParam(dependencies=['P7', 'Raw9'])
+        self.derived_nodes['P4'].operational = False
+        for requested in (['P7', 'P8'], ['P4', 'P6', 'P9']):
+            mgr = NodeManager({'Start Datetime': datetime.now()}, 10,
+                              self.lfl_params, requested, [],
+                              self.derived_nodes, {}, {})
+            order, gr_st = _dependency_order(mgr, draw=False)
+            gr_all, expected_gr_st, expected_order = process_order(
+                graph_nodes(mgr), mgr)
+            self.assertEqual(order, expected_order)
+            self.assertEqual(sorted(gr_st.nodes()),
+                             sorted(expected_gr_st.nodes()))
+            self.assertEqual(sorted(gr_st.edges()),
+                             sorted(expected_gr_st.edges()))
+            # dependency_order returns the spanning tree as a networkx graph.
+            public_order, graph = dependency_order(mgr, draw=False)
+            self.assertEqual(public_order, order)
+            self.assertIsInstance(graph, nx.DiGraph)
+            self.assertEqual(sorted(graph.edges()),
+                             sorted(expected_gr_st.edges()))
+            for name in expected_gr_st.nodes():
+                self.assertEqual(gr_st.node[name],
+                                 expected_gr_st.node[name])
+                self.assertEqual(graph.node[name],
+                                 expected_gr_st.node[name])
+                self.assertEqual(sorted(gr_st.predecessors(name)),
+                                 sorted(expected_gr_st.predecessors(name)))
+
+    def test_dependency_index(self):
+        index = DependencyIndex.get(self.derived_nodes)
+        self.assertIs(DependencyIndex.get(dict(self.derived_nodes)), index)
+        names = index.names
+        p7 = index.positions['P7']
+        self.assertEqual(
+            [names[i] for i in index.indices[index.indptr[p7]:
+                                             index.indptr[p7 + 1]]],
+            ['P4', 'P5', 'P6'])
+        raw3 = index.positions['Raw3']
+        self.assertTrue(raw3 >= index.derived_count)
+        self.assertEqual(
+            sorted(names[i] for i in index.pred_indices[
+                index.pred_indptr[raw3]:index.pred_indptr[raw3 + 1]]),
+            ['P5', 'P6'])
+        # Derived nodes available as HDF parameters have no dependencies.
+        mgr = NodeManager({'Start Datetime': datetime.now()}, 10,
+                          self.lfl_params + ['P5'], ['P7'], [],
+                          self.derived_nodes, {}, {})
+        flight_graph = index.flight_graph(mgr)
+        self.assertEqual(flight_graph.successors('root'), ['P7'])
+        self.assertEqual(flight_graph.successors('P5'), [])
+        self.assertEqual(flight_graph.successors('P6'), ['Raw3'])
+        self.derived_nodes['P6'] = MockParam(dependencies=['Raw4'])
+        self.assertIsNot(DependencyIndex.get(self.derived_nodes), index)
+
+    def test_dependencies3_long_chain(self):
+        # Deeper than the recursion limit.
+        length = 5000
+        derived = dict(('P%d' % n, MockParam(dependencies=['P%d' % (n + 1)]))
+                       for n in range(length))
+        derived['P%d' % length] = MockParam(dependencies=['Raw1'])
+        mgr = NodeManager({'Start Datetime': datetime.now()}, 10, ['Raw1'],
+                          ['P0'], [], derived, {}, {})
+        order, _ = dependency_order(mgr, draw=False)
+        self.assertEqual(order, ['Raw1'] + ['P%d' % n for n in
+                                            range(length, -1, -1)])
+
+    def test_dependencies3_inoperable_not_revisited(self):
+        # P1 to P3 all depend upon the inoperable P4, which is only
+        # traversed once.
+        derived = {
+            'P1': MockParam(dependencies=['P4', 'Raw1']),
+            'P2': MockParam(dependencies=['P4', 'Raw1']),
+            'P3': MockParam(dependencies=['P4', 'Raw1']),
+            'P4': MockParam(dependencies=['P5'], operational=False),
+            'P5': MockParam(dependencies=['Raw2']),
+        }
+        mgr = NodeManager({'Start Datetime': datetime.now()}, 10,
+                          ['Raw1', 'Raw2'], ['P1', 'P2', 'P3'], [], derived,
+                          {}, {})
+        graph = graph_nodes(mgr)
+        with mock.patch.object(mgr, 'operational',
+                               side_effect=mgr.operational) as operational:
+            order = dependencies3(graph, 'root', mgr)
+        self.assertEqual(order[-1], 'root')
+        self.assertEqual(sorted(order[:-1]),
+                         ['P1', 'P2', 'P3', 'P5', 'Raw1', 'Raw2'])
+        called = [c[0][0] for c in operational.call_args_list]
+        self.assertEqual(called.count('P4'), 1)
+        self.assertEqual(called.count('P5'), 1)
+
+    def test_dependencies3_circular_inoperable_revisited(self):
+        # P2 is inoperable while P3 is within the branch path as it depends
+        # upon P3, so is traversed again once P3 is operational.
+        derived = {
+            'P1': MockParam(dependencies=['P3', 'P2']),
+            'P2': MockParam(dependencies=['P3']),
+            'P3': MockParam(dependencies=['P2', 'Raw1']),
+        }
+        for node in derived.values():
+            node.can_operate = lambda avail: bool(avail)
+        mgr = NodeManager({'Start Datetime': datetime.now()}, 10, ['Raw1'],
+                          ['P1'], [], derived, {}, {})
+        order = dependencies3(graph_nodes(mgr), 'root', mgr)
+        self.assertEqual(order, ['Raw1', 'P3', 'P2', 'P1', 'root'])
+
+    def test_time_taken(self):
+        '''
+        Benchmark of resolving the dependency order of all nodes within
+        settings.NODE_MODULES with half of their raw parameters available.
+        '''
+        from timeit import Timer
+        derived = get_derived_nodes(settings.NODE_MODULES)
+        dependencies = set()
+        for node in derived.values():
+            dependencies.update(node.get_dependency_names())
+        lfl_params = sorted(dependencies - set(derived))[::2]
+        mgr = NodeManager({'Start Datetime': datetime.now()}, 10, lfl_params,
+                          list(derived), [], derived, {}, {})
+        graph = graph_nodes(mgr)
+        timer = Timer(lambda: dependencies3(graph, 'root', mgr))
+        time = min(timer.repeat(3, 1))
+        print("Resolved %d nodes in %.3f secs" % (len(derived), time))
+        self.assertLess(time, 5, msg="Took too long")
+
 
 
 class TestGraphAdjacencies(unittest.TestCase):
@@ -0,0 +1,109 @@
+import inspect
+import mock
+import unittest
+
+from datetime import datetime
+
+from analysis_engine.fingerprint import (
+    class_fingerprint,
+    node_fingerprints,
+    value_fingerprint,
+)
+from analysis_engine.node import (
+    A,
+    DerivedParameterNode,
+    KeyPointValueNode,
+    NodeManager,
+    P,
+)
+
+from process_flight_test import Doubled, Summed
+
+
+class DoubledMax(KeyPointValueNode):
+    @classmethod
+    def can_operate(cls, available):
+        return 'Doubled' in available
+
+    def derive(self, doubled=P('Doubled'), other=P('Other'),
+               family=A('Family')):
+        self.create_kpv(0, doubled.array.max())
+
+
+class TestClassFingerprint(unittest.TestCase):
+    def test_class_fingerprint(self):
+        self.assertEqual(class_fingerprint(Doubled), class_fingerprint(Doubled))
+        self.assertEqual(len(class_fingerprint(Doubled)), 40)
+        self.assertNotEqual(class_fingerprint(Doubled),
+                            class_fingerprint(Summed))
+
+    def test_class_fingerprint_no_source(self):
+        cls = type('Dynamic', (DerivedParameterNode,), {})
+        self.assertEqual(len(class_fingerprint(cls)), 40)
+
+    def test_class_fingerprint_inherited(self):
+        class Tripled(Doubled):
+            pass
+
+        class TripledCopy(Doubled):
+            pass
+        fingerprint = class_fingerprint(TripledCopy)
+        # Source includes the class name.
+        self.assertNotEqual(class_fingerprint(Tripled), fingerprint)
+        # Changes to the source of base classes change the fingerprint.
+        getsource = inspect.getsource
+        with mock.patch('analysis_engine.fingerprint._CLASS_FINGERPRINTS',
+                        {}):
+            with mock.patch('analysis_engine.fingerprint.inspect.getsource',
+                            side_effect=lambda cls: 'changed' if cls is
+                            Doubled else getsource(cls)):
+                self.assertNotEqual(class_fingerprint(TripledCopy),
+                                    fingerprint)
+        # So do changes to the library and version.
+        with mock.patch('analysis_engine.fingerprint._CLASS_FINGERPRINTS',
+                        {}):
+            with mock.patch('analysis_engine.fingerprint._LIBRARY_FINGERPRINT',
+                            ['changed']):
+                self.assertNotEqual(class_fingerprint(TripledCopy),
+                                    fingerprint)
+
+
+class TestValueFingerprint(unittest.TestCase):
+    def test_value_fingerprint(self):
+        self.assertEqual(value_fingerprint({'a': 1, 'b': [1, 2]}),
+                         value_fingerprint({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(value_fingerprint({'a': 1}),
+                            value_fingerprint({'a': 2}))
+        self.assertEqual(value_fingerprint(datetime(2015, 1, 1)),
+                         value_fingerprint(datetime(2015, 1, 1)))
+
+
+class TestNodeFingerprints(unittest.TestCase):
+    def _fingerprints(self, process_order, family='A320'):
+        derived_nodes = {'Doubled': Doubled, 'Doubled Max': DoubledMax}
+        node_mgr = NodeManager({}, 100, ['Raw1', 'Other'], ['Doubled Max'],
+                               [], derived_nodes, {'Family': family}, {})
+        return node_fingerprints(node_mgr, process_order)
+
+    def test_node_fingerprints(self):
+        order = ['Raw1', 'Family', 'Doubled', 'Doubled Max']
+        fingerprints = self._fingerprints(order)
+        self.assertEqual(sorted(fingerprints), sorted(order))
+        self.assertEqual(fingerprints, self._fingerprints(order))
+
+    def test_node_fingerprints_attribute_changed(self):
+        order = ['Raw1', 'Family', 'Doubled', 'Doubled Max']
+        original = self._fingerprints(order)
+        changed = self._fingerprints(order, family='B737')
+        self.assertEqual(original['Doubled'], changed['Doubled'])
+        self.assertNotEqual(original['Family'], changed['Family'])
+        self.assertNotEqual(original['Doubled Max'], changed['Doubled Max'])
+
+    def test_node_fingerprints_dependency_unavailable(self):
+        with_other = self._fingerprints(
+            ['Raw1', 'Other', 'Family', 'Doubled', 'Doubled Max'])
+        without_other = self._fingerprints(
+            ['Raw1', 'Family', 'Doubled', 'Doubled Max'])
+        self.assertEqual(with_other['Doubled'], without_other['Doubled'])
+        self.assertNotEqual(with_other['Doubled Max'],
+                            without_other['Doubled Max'])
@@ -90,6 +90,16 @@ class TestJsonTools(unittest.TestCase):
         self.assertEqual(json_to_process_flight(simplejson.dumps(process_flight_json)), {})
         
     
+    def test_process_flight_fingerprints(self):
+        process_flight = dict(deepcopy(PROCESS_FLIGHT),
+                              fingerprints={KTI_NAME: 'abc123'})
+        txt = process_flight_to_json(process_flight)
+        self.assertEqual(simplejson.loads(txt)['fingerprints'],
+                         {KTI_NAME: 'abc123'})
+        self.assertEqual(json_to_process_flight(txt), process_flight)
+        nodes = process_flight_to_nodes(process_flight)
+        self.assertEqual(list(nodes.keys()), [KTI_NAME])
+    
     def test_jsondict_to_node(self):
         # TODO: Other types.
         self.assertEqual(jsondict_to_node(KTI_JSONDICT.copy()), KTI)
@@ -1030,6 +1030,30 @@ class TestAlign(unittest.TestCase):
         np.testing.assert_array_equal(result.data, [0,2,3,5,7,8,10,12,13,15,17,18,20,22,23])
         np.testing.assert_array_equal(result.mask, [0] * 15)
 
+    def test_align_args_plan_cache(self):
+        slave = np.ma.arange(8.0)
+        slave[3] = np.ma.masked
+        expected = [None, 0.25, 0.75, 1.25, 1.75, None, None, None, None,
+                    4.25, 4.75, 5.25, 5.75, 6.25, 6.75, None]
+        with patch('analysis_engine.library._ALIGNMENT_PLANS', {}) as plans:
+            result = align_args(slave, 1, 0.5, 2, 0.25)
+            self.assertEqual(result.tolist(), expected)
+            self.assertEqual(len(plans), 1)
+            plan = list(plans.values())[0]
+            # The plan only holds a single period of offsets and weights.
+            self.assertEqual((plan.period, plan.slave_period), (2, 1))
+            self.assertEqual(plan.offsets.tolist(), [-1, 0])
+            # The plan is reused for arrays of the same length.
+            result = align_args(slave * 2, 1, 0.5, 2, 0.25)
+            self.assertEqual(result.tolist(),
+                             [None if v is None else v * 2 for v in expected])
+            self.assertIs(list(plans.values())[0], plan)
+            align_args(np.ma.arange(16.0), 1, 0.5, 2, 0.25)
+            self.assertEqual(len(plans), 2)
+            with patch('analysis_engine.library.ALIGNMENT_PLAN_CACHE_SIZE', 2):
+                align_args(slave, 1, 0.5, 4, 0.25)
+            self.assertEqual(len(plans), 1)
+
 class TestAlignStringArrays(unittest.TestCase):
     def test_offset(self):
         first = P(frequency=1.0, offset=0.6,
@@ -0,0 +1,107 @@
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from analysis_engine.node_registry import (
+    build_registry,
+    dependency_closure,
+    get_lazy_derived_nodes,
+    get_registry,
+    registry_is_current,
+)
+
+
+AIRSPEED_NODES = '''
+from analysis_engine.node import A, DerivedParameterNode, KeyPointValueNode, P
+
+
+class AirspeedTrue(DerivedParameterNode):
+    def derive(self, airspeed=P('Airspeed'), sat=P('SAT')):
+        pass
+
+
+class AirspeedTrueMax(KeyPointValueNode):
+    @classmethod
+    def can_operate(cls, available, family=A('Family')):
+        return 'Airspeed True' in available
+
+    def derive(self, tas=P('Airspeed True')):
+        pass
+'''
+
+ALTITUDE_NODES = '''
+from analysis_engine.node import DerivedParameterNode, P
+
+
+class AltitudeAAL(DerivedParameterNode):
+    name = 'Altitude AAL'
+
+    def derive(self, alt_std=P('Altitude STD')):
+        pass
+'''
+
+
+class TestNodeRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'registry.json')
+        self.modules = ['registry_test_airspeed', 'registry_test_altitude']
+        for module_name, source in zip(self.modules,
+                                       (AIRSPEED_NODES, ALTITUDE_NODES)):
+            self._write_module(module_name, source)
+        sys.path.insert(0, self.temp_dir)
+
+    def tearDown(self):
+        sys.path.remove(self.temp_dir)
+        self._unload()
+        shutil.rmtree(self.temp_dir)
+
+    def _write_module(self, module_name, source):
+        path = os.path.join(self.temp_dir, module_name + '.py')
+        with open(path, 'w') as module_file:
+            module_file.write(textwrap.dedent(source))
+
+    def _unload(self):
+        for module_name in self.modules:
+            sys.modules.pop(module_name, None)
+
+    def test_build_registry(self):
+        registry = build_registry(self.modules)
+        self.assertEqual(sorted(registry['nodes']),
+                         ['Airspeed True', 'Airspeed True Max',
+                          'Altitude AAL'])
+        self.assertEqual(registry['nodes']['Airspeed True Max'], {
+            'module': 'registry_test_airspeed',
+            'class': 'AirspeedTrueMax',
+            'dependencies': ['Airspeed True'],
+            'can_operate_attributes': ['Family'],
+            'source': 'registry_test_airspeed',
+        })
+        self.assertEqual(
+            dependency_closure(registry, ['Airspeed True Max', 'Airspeed']),
+            set(['Airspeed True Max', 'Airspeed True']))
+
+    def test_registry_is_current(self):
+        registry = build_registry(self.modules)
+        self.assertTrue(registry_is_current(registry, self.modules))
+        self.assertFalse(registry_is_current(registry, self.modules[:1]))
+        self._write_module('registry_test_altitude',
+                           ALTITUDE_NODES + '\n# Changed.\n')
+        self.assertFalse(registry_is_current(registry, self.modules))
+
+    def test_get_lazy_derived_nodes(self):
+        get_registry(self.modules, self.path)
+        self._unload()
+        nodes = get_lazy_derived_nodes(self.modules, ['Airspeed True Max'],
+                                       path=self.path)
+        self.assertEqual(sorted(nodes),
+                         ['Airspeed True', 'Airspeed True Max'])
+        self.assertEqual(nodes['Airspeed True'].__name__, 'AirspeedTrue')
+        self.assertIn('registry_test_airspeed', sys.modules)
+        self.assertNotIn('registry_test_altitude', sys.modules)
+        # All nodes when no names are provided.
+        nodes = get_lazy_derived_nodes(self.modules, [], path=self.path)
+        self.assertEqual(len(nodes), 3)
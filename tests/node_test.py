@@ -13,16 +13,20 @@ from analysis_engine.library import min_value, max_value
 from analysis_engine.node import (
     ApproachItem,
     ApproachNode,
+    A,
     Attribute,
+    CanOperateCache,
     DerivedParameterNode,
     KeyPointValueNode, KeyPointValue,
     KeyTimeInstanceNode, KeyTimeInstance, KTI,
     FlightAttributeNode,
     FormattedNameNode,
-    Node, NodeManager,
+    Node, NodeCache, NodeManager,
     Parameter, P,
     MultistateDerivedParameterNode, M,
+    get_param_kwarg_names,
     load,
+    loads,
     powerset,
     SectionNode,
     Section,
@@ -115,6 +119,54 @@ class TestNode(unittest.TestCase):
         self.assertEqual(KeyPointValue123.get_dependency_names(),
                          ['Parameter A', 'Parameter B'])
 
+    @mock.patch('analysis_engine.node.get_param_kwarg_names',
+                side_effect=get_param_kwarg_names)
+    def test_get_dependency_names_computed_once(self, kwarg_names):
+        class ParameterC(DerivedParameterNode):
+            def derive(self, aa=P('Parameter A')):
+                pass
+
+        class ParameterD(ParameterC):
+            pass
+
+        self.assertEqual(ParameterC.get_dependency_names(), ['Parameter A'])
+        self.assertEqual(ParameterC.get_dependency_names(), ['Parameter A'])
+        self.assertEqual(ParameterD.get_dependency_names(), ['Parameter A'])
+        self.assertEqual(kwarg_names.call_count, 1)
+        # Returned lists may be modified by the caller.
+        ParameterC.get_dependency_names().append('Parameter B')
+        self.assertEqual(ParameterC.get_dependency_names(), ['Parameter A'])
+        # Overriding derive within a subclass.
+        class ParameterE(ParameterC):
+            def derive(self, bb=P('Parameter B')):
+                pass
+
+        self.assertEqual(ParameterE.get_dependency_names(), ['Parameter B'])
+        self.assertEqual(ParameterC.get_dependency_names(), ['Parameter A'])
+        self.assertEqual(kwarg_names.call_count, 2)
+
+    def test_get_can_operate_attribute_names(self):
+        class ParameterC(DerivedParameterNode):
+            @classmethod
+            def can_operate(cls, available, family=Attribute('Family'),
+                            series=Attribute('Series')):
+                return True
+
+            def derive(self, aa=P('Parameter A')):
+                pass
+
+        class ParameterD(DerivedParameterNode):
+            @classmethod
+            def can_operate(cls, available, aa=P('Parameter A')):
+                return True
+
+        self.assertEqual(ParameterC.get_can_operate_attribute_names(),
+                         ('Family', 'Series'))
+        self.assertEqual(DerivedParameterNode.get_can_operate_attribute_names(),
+                         ())
+        self.assertRaises(TypeError,
+                          ParameterD.get_can_operate_attribute_names)
+
     def test_cache_key(self):
         name = 'Parameter A'
         frequency = 1
@@ -504,6 +556,61 @@ class TestNodeManager(unittest.TestCase):
         self.assertEqual(start_dt.value, segment_info['Start Datetime'])
         self.assertTrue(mgr.operational('Start Datetime', []))
 
+    def test_operational_cached(self):
+        calls = []
+
+        class FamilyCheck(DerivedParameterNode):
+            @classmethod
+            def can_operate(cls, available, family=A('Family')):
+                calls.append(cls)
+                return 'a' in available and family.value == 'A320'
+
+            def derive(self, a=P('a'), family=A('Family')):
+                pass
+
+        class Random(FamilyCheck):
+            can_operate_cacheable = False
+
+        cache = CanOperateCache(max_size=3)
+        derived_nodes = {'Family Check': FamilyCheck,
+                         'Random': Random}
+        with mock.patch('analysis_engine.node.CAN_OPERATE_CACHE', True), \
+                mock.patch('analysis_engine.node.can_operate_cache', cache):
+            for flight in range(2):
+                mgr = NodeManager({}, 10, ['a', 'b'], [], [], derived_nodes,
+                                  {'Family': 'A320'}, {})
+                self.assertTrue(mgr.operational('Family Check', ['a', 'b']))
+                self.assertTrue(mgr.operational('Family Check', ['b', 'a']))
+                self.assertFalse(mgr.operational('Family Check', ['b']))
+                self.assertTrue(mgr.operational('Random', ['a']))
+            self.assertEqual(calls, [FamilyCheck, FamilyCheck, Random,
+                                     Random])
+            self.assertEqual(cache.stats(), {'hits': 4, 'misses': 2,
+                                             'size': 2, 'hit_rate': 4 / 6.0})
+            # A different attribute value is not a hit.
+            mgr = NodeManager({}, 10, ['a'], [], [], derived_nodes,
+                              {'Family': 'B737'}, {})
+            self.assertFalse(mgr.operational('Family Check', ['a']))
+            self.assertFalse(mgr.operational('Family Check', ['a', 'b']))
+            self.assertEqual(cache.misses, 4)
+        # The cache is cleared when full.
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 0, 'size': 0,
+                                         'hit_rate': 0.0})
+
+
+class TestNodeCache(unittest.TestCase):
+    def test_evict(self):
+        cache = NodeCache()
+        cache[('a', 1, 0)] = 'a1'
+        cache[('a', 2, 0)] = 'a2'
+        cache[('b', 1, 0)] = 'b1'
+        self.assertEqual(cache.evict('a'), 2)
+        self.assertEqual(cache, {('b', 1, 0): 'b1'})
+        self.assertEqual(cache.evict('a'), 0)
+        self.assertEqual(cache.nodes(), ['b1'])
+
 
 class TestPowerset(unittest.TestCase):
     def test_powerset(self):
@@ -912,6 +1019,54 @@ class TestSectionNode(unittest.TestCase):
         self.assertEqual(node.get_longest(within_slice=slice(0, 8)), node[0])
 
 
+    @mock.patch('analysis_engine.node.NODE_COLUMNS_MIN_ITEMS', 0)
+    def test_get_aligned_columns(self):
+        section_node = self.section_node_class(frequency=1, offset=0)
+        section_node.create_section(slice(1, 434))
+        section_node.create_section(slice(500, 600), name='Named')
+        param = Parameter('p', frequency=0.125, offset=5.4609375)
+        aligned_node = section_node.get_aligned(param)
+        self.assertEqual(list(aligned_node),
+                         [Section(name='Example Section Node',
+                                  slice=slice(0, 54, None), start_edge=0,
+                                  stop_edge=53.5673828125),
+                          Section(name='Named', slice=slice(62, 75, None),
+                                  start_edge=61.8173828125,
+                                  stop_edge=74.3173828125)])
+        self.assertIsInstance(aligned_node[0].slice.stop, int)
+
+    @mock.patch('analysis_engine.node.NODE_COLUMNS_MIN_ITEMS', 0)
+    def test_columns(self):
+        section_node = self.section_node_class(items=[
+            Section('a', slice(10, 20), 10, 20),
+            Section('b', slice(0, 5), 0, 5),
+            Section('a', slice(30, 50), 30, 50),
+        ])
+        columns = section_node.get_columns()
+        self.assertIsNotNone(columns)
+        np.testing.assert_array_equal(
+            columns.positions(within_slice=slice(0, 25)), [0, 1])
+        np.testing.assert_array_equal(
+            columns.positions(within_slice=slice(15, 35), within_use='any'),
+            [0, 2])
+        np.testing.assert_array_equal(
+            columns.positions(name='a', containing_index=12), [0])
+        self.assertEqual(section_node.get_first().name, 'b')
+        self.assertEqual(section_node.get_last(name='a').slice,
+                         slice(30, 50))
+        self.assertEqual(section_node.get_next(6).slice, slice(10, 20))
+        self.assertEqual(section_node.get_previous(25).slice, slice(10, 20))
+        self.assertEqual(section_node.get_longest().slice, slice(30, 50))
+        self.assertEqual(section_node.get_surrounding(20),
+                         [Section('a', slice(10, 20), 10, 20)])
+        # Modifying the list discards the columns.
+        section_node.append(Section('c', slice(21, 23), 21, 23))
+        self.assertEqual(section_node.get_shortest().name, 'c')
+        # Sections with None starts or stops are iterated over.
+        section_node.append(Section('d', slice(60, None), 60, None))
+        self.assertIsNone(section_node.get_columns())
+        self.assertEqual(section_node.get_next(55).name, 'd')
+
 class TestFormattedNameNode(unittest.TestCase):
     def setUp(self):
         class ExampleNameFormatNode(FormattedNameNode):
@@ -978,6 +1133,69 @@ class TestFormattedNameNode(unittest.TestCase):
         self.assertFalse(
             formatted_name_node._validate_name('Speed in ascent at -10 ft'))
 
+    def test_get_name_registry(self):
+        class SpeedInPhaseAtAltitude(FormattedNameNode):
+            NAME_FORMAT = 'Speed in %(phase)s at %(altitude)d ft'
+            NAME_VALUES = {'altitude': [100, 400],
+                           'phase': ['ascent', 'descent']}
+            def derive(self, *args, **kwargs):
+                pass
+        registry = SpeedInPhaseAtAltitude.get_name_registry()
+        self.assertIs(SpeedInPhaseAtAltitude.get_name_registry(), registry)
+        self.assertIn('Speed in ascent at 400 ft', registry)
+        self.assertNotIn('Speed in ascent at 500 ft', registry)
+        self.assertEqual(registry.get_name_values('Speed in descent at 100 ft'),
+                         {'altitude': 100, 'phase': 'descent'})
+        self.assertIsNone(registry.get_name_values('Speed'))
+        self.assertEqual(registry.match({'altitude': 400}),
+                         set(['Speed in ascent at 400 ft',
+                              'Speed in descent at 400 ft']))
+        self.assertEqual(registry.match({'altitude': 400, 'phase': 'ascent'}),
+                         set(['Speed in ascent at 400 ft']))
+        self.assertEqual(registry.match({'altitude': 500}), set())
+        self.assertFalse(registry.is_valid_name_values({'flaps': 5}))
+        # Replacing NAME_VALUES recompiles the registry.
+        SpeedInPhaseAtAltitude.NAME_VALUES = {'altitude': [500],
+                                              'phase': ['ascent']}
+        self.assertEqual(SpeedInPhaseAtAltitude.names(),
+                         ['Speed in ascent at 500 ft'])
+        # Subclasses compile their own registry.
+        class Unformatted(FormattedNameNode):
+            def derive(self, *args, **kwargs):
+                pass
+        self.assertEqual(Unformatted.names(), ['Unformatted'])
+
+    def test_get_name_values(self):
+        class AltitudeWhenDescending(FormattedNameNode):
+            NAME_FORMAT = '%(altitude)d Ft %(phase)s'
+            NAME_VALUES = {'altitude': [50, 100],
+                           'phase': ['Descending', 'Climbing']}
+            def derive(self, *args, **kwargs):
+                pass
+        alt_desc = AltitudeWhenDescending(items=[
+            KeyTimeInstance(10, '50 Ft Climbing'),
+            KeyTimeInstance(20, '100 Ft Climbing'),
+            KeyTimeInstance(80, '100 Ft Descending'),
+            KeyTimeInstance(90, '50 Ft Descending')])
+        for min_items in (0, 1000):
+            with mock.patch('analysis_engine.node.NODE_COLUMNS_MIN_ITEMS',
+                            min_items):
+                alt_desc.invalidate_columns()
+                self.assertEqual(alt_desc.get(name_values={'altitude': 50}),
+                                 [alt_desc[0], alt_desc[3]])
+                self.assertEqual(
+                    alt_desc.get(name_values={'altitude': 100},
+                                 within_slice=slice(50, None)),
+                    [alt_desc[2]])
+                self.assertEqual(alt_desc.get_last(
+                    name_values={'phase': 'Climbing'}), alt_desc[1])
+                self.assertRaises(ValueError, alt_desc.get,
+                                  name_values={'altitude': 200})
+                self.assertRaises(ValueError, alt_desc.get,
+                                  name_values={'flaps': 5})
+        alt_desc.restrict_names = False
+        self.assertEqual(alt_desc.get(name_values={'altitude': 200}), [])
+
     def test_get(self):
         class AltitudeWhenDescending(FormattedNameNode):
             NAME_FORMAT = '%(altitude)d Ft Descending'
@@ -1159,6 +1377,54 @@ class TestFormattedNameNode(unittest.TestCase):
         node = FormattedNameNode(items=['a', 'b', 'c'])
         self.assertEqual(list(node), ['a', 'b', 'c'])
 
+    @mock.patch('analysis_engine.node.NODE_COLUMNS_MIN_ITEMS', 0)
+    def test_columns(self):
+        kti_node = self.speed_class(items=[KeyTimeInstance(12, 'Slowest'),
+                                           KeyTimeInstance(342, 'Slowest'),
+                                           KeyTimeInstance(2, 'Slowest'),
+                                           KeyTimeInstance(50, 'Fast')])
+        columns = kti_node.get_columns()
+        self.assertIs(kti_node.get_columns(), columns)
+        np.testing.assert_array_equal(columns.index.sorted, [2, 12, 50, 342])
+        np.testing.assert_array_equal(
+            columns.positions([slice(10, 60)], 'Slowest'), [0])
+        np.testing.assert_array_equal(
+            columns.positions([slice(50, 10, -1)]), [0, 3])
+        self.assertEqual(kti_node.get(within_slice=slice(None, 50)),
+                         [KeyTimeInstance(12, 'Slowest'),
+                          KeyTimeInstance(2, 'Slowest')])
+        self.assertRaises(ValueError, kti_node.get, name='Ludicrous')
+        self.assertEqual(kti_node.get(name='Warp 10'), [])
+        # Modifying the list discards the columns.
+        kti_node.append(KeyTimeInstance(20, 'Fast'))
+        self.assertEqual(kti_node.get_first(name='Fast'),
+                         KeyTimeInstance(20, 'Fast'))
+        del kti_node[0]
+        self.assertEqual(kti_node.get_next(5), KeyTimeInstance(20, 'Fast'))
+        kti_node[0] = KeyTimeInstance(15, 'Slowest')
+        self.assertEqual(kti_node.get_previous(18),
+                         KeyTimeInstance(15, 'Slowest'))
+        # Items modified in place are reflected by the columns.
+        kti_node[0].index = 19
+        self.assertEqual(kti_node.get_last(within_slice=slice(0, 20)),
+                         KeyTimeInstance(19, 'Slowest'))
+        # Columns are not pickled.
+        self.assertNotIn('_columns', kti_node.__getstate__())
+        kti_node = KTI(items=list(kti_node))
+        kti_node.get_columns()
+        loaded = loads(kti_node.dumps())
+        self.assertEqual(loaded, kti_node)
+        self.assertIsNone(loaded._columns)
+
+    @mock.patch('analysis_engine.node.NODE_COLUMNS_MIN_ITEMS', 0)
+    def test_columns_unsupported_items(self):
+        node = FormattedNameNode(items=['a', 'b', 'c'])
+        self.assertIsNone(node.get_columns())
+        kti_node = self.speed_class(items=[KeyTimeInstance(None, 'Slowest')])
+        self.assertIsNone(kti_node.get_columns())
+        self.assertEqual(kti_node.get(name='Slowest'),
+                         [KeyTimeInstance(None, 'Slowest')])
+
 
 class TestKeyPointValueNode(unittest.TestCase):
 
@@ -1176,6 +1442,21 @@ class TestKeyPointValueNode(unittest.TestCase):
 
         self.speed_class = Speed
 
+    @mock.patch('analysis_engine.node.NODE_COLUMNS_MIN_ITEMS', 0)
+    def test_columns_modified_in_place(self):
+        knode = self.speed_class(items=[
+            KeyPointValue(index, index, 'Fast') for index in range(1, 51)])
+        self.assertEqual(knode.get_max().value, 50)
+        knode[49].value = -1
+        knode[0].index = 200
+        self.assertEqual(knode.get_max(), KeyPointValue(49, 49, 'Fast'))
+        self.assertEqual(knode.get_min(), KeyPointValue(50, -1, 'Fast'))
+        self.assertEqual(knode.get_first().index, 2)
+        self.assertEqual(knode.get_last().index, 200)
+        knode[1].name = 'Slowest'
+        self.assertEqual(knode.get_first(name='Slowest'),
+                         KeyPointValue(2, 2, 'Slowest'))
+
     def test_create_kpv(self):
         """ Tests name format substitution and return type
         """
@@ -1538,6 +1819,12 @@ class TestKeyPointValueNode(unittest.TestCase):
         self.assertEqual(aligned_node,
                          [KeyPointValue(index=1.95, value=12.5, name='Speed at 1000ft'),
                           KeyPointValue(index=5.45, value=12.5, name='Speed at 1000ft')])
+        # Items are copied.
+        self.assertEqual([kpv.index for kpv in knode], [10, 24])
+        self.assertIsNot(aligned_node[0], knode[0])
+        np.testing.assert_allclose(knode.get_aligned_indices(param),
+                                   [1.95, 5.45])
+        self.assertEqual(Speed(frequency=2).get_aligned(param), [])
 
     def test_get_min(self):
         # Test empty Node first.
@@ -0,0 +1,84 @@
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+from analysis_engine.node import A, NodeManager
+from analysis_engine.plan_cache import cached_dependency_order, plan_key
+
+from process_flight_test import Doubled, Summed
+
+
+class FamilySummed(Summed):
+    '''
+    Summed which is only derived for A320s.
+    '''
+    name = 'Summed'
+
+    @classmethod
+    def can_operate(cls, available, family=A('Family')):
+        return family and family.value == 'A320' and all_of(
+            ('Doubled', 'Raw2'), available)
+
+
+def all_of(names, available):
+    return all(name in available for name in names)
+
+
+class TestPlanCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _node_mgr(self, hdf_keys=['Raw1', 'Raw2'], family='A320',
+                  achieved_flight_record={}):
+        return NodeManager({'Start Datetime': 1}, 10, list(hdf_keys),
+                           ['Summed'], [],
+                           {'Doubled': Doubled, 'Summed': FamilySummed},
+                           {'Family': family, 'Model': 'A320-200'},
+                           achieved_flight_record)
+
+    def test_plan_key(self):
+        key = plan_key(self._node_mgr())
+        self.assertEqual(key, plan_key(self._node_mgr()))
+        # Order of parameters does not matter.
+        self.assertEqual(key, plan_key(self._node_mgr(['Raw2', 'Raw1'])))
+        self.assertNotEqual(key, plan_key(self._node_mgr(['Raw1'])))
+        # Attribute values consulted by can_operate.
+        self.assertNotEqual(key, plan_key(self._node_mgr(family='B737')))
+        # Attributes which become available.
+        self.assertNotEqual(key, plan_key(self._node_mgr(
+            achieved_flight_record={'AFR Flight ID': 1})))
+
+    def test_plan_key_ignores_unused_attribute_values(self):
+        node_mgr = self._node_mgr()
+        key = plan_key(node_mgr)
+        node_mgr.aircraft_info['Model'] = 'A320-100'
+        node_mgr.segment_info['Start Datetime'] = 2
+        self.assertEqual(key, plan_key(node_mgr))
+
+    def test_cached_dependency_order(self):
+        process_order, gr_st = cached_dependency_order(
+            self._node_mgr(), cache_dir=self.cache_dir)
+        self.assertEqual(process_order, ['Raw1', 'Doubled', 'Raw2', 'Summed'])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        with mock.patch('analysis_engine.plan_cache._dependency_order') as \
+                dependency_order:
+            cached_order, cached_gr_st = cached_dependency_order(
+                self._node_mgr(), cache_dir=self.cache_dir)
+            self.assertFalse(dependency_order.called)
+        self.assertEqual(cached_order, process_order)
+        self.assertEqual(sorted(cached_gr_st.nodes()), sorted(gr_st.nodes()))
+        self.assertEqual(sorted(cached_gr_st.edges()), sorted(gr_st.edges()))
+        self.assertEqual(cached_gr_st.node['Summed'], gr_st.node['Summed'])
+
+    def test_cached_dependency_order_disabled(self):
+        with mock.patch('analysis_engine.plan_cache._dependency_order') as \
+                dependency_order:
+            dependency_order.return_value = ([], None)
+            cached_dependency_order(self._node_mgr())
+            cached_dependency_order(self._node_mgr())
+        self.assertEqual(dependency_order.call_count, 2)
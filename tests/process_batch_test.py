@@ -0,0 +1,139 @@
+import mock
+import os
+import shutil
+import simplejson as json
+import tempfile
+import unittest
+
+from datetime import datetime
+
+from analysis_engine import process_batch
+from analysis_engine.process_batch import load_manifest, output_names
+
+from process_flight_test import empty_results
+
+
+class TestLoadManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_manifest_directory(self):
+        for name in ('b.hdf5', 'a.hdf5', 'c.txt'):
+            open(os.path.join(self.temp_dir, name), 'w').close()
+        jobs = load_manifest(self.temp_dir, tail_number='G-ABCD')
+        self.assertEqual([os.path.basename(j['file']) for j in jobs],
+                         ['a.hdf5', 'b.hdf5'])
+        self.assertEqual(jobs[0]['tail_number'], 'G-ABCD')
+        self.assertEqual(jobs[0]['segment_info'], {})
+        self.assertEqual(jobs[0]['aircraft_info'], {})
+
+    def test_load_manifest_file(self):
+        manifest_path = os.path.join(self.temp_dir, 'manifest.json')
+        with open(manifest_path, 'w') as manifest:
+            json.dump([
+                {'file': 'a.hdf5', 'tail_number': 'G-WXYZ',
+                 'segment_info': {'Start Datetime': '2015-01-01T13:00:00'},
+                 'aircraft_info': {'Family': 'A320'}},
+                {'file': '/data/b.hdf5'},
+            ], manifest)
+        jobs = load_manifest(manifest_path, tail_number='G-ABCD')
+        self.assertEqual(jobs[0]['file'],
+                         os.path.join(self.temp_dir, 'a.hdf5'))
+        self.assertEqual(jobs[0]['tail_number'], 'G-WXYZ')
+        self.assertEqual(jobs[0]['segment_info']['Start Datetime'],
+                         datetime(2015, 1, 1, 13))
+        self.assertEqual(jobs[0]['aircraft_info'], {'Family': 'A320'})
+        self.assertEqual(jobs[1]['file'], '/data/b.hdf5')
+        self.assertEqual(jobs[1]['tail_number'], 'G-ABCD')
+
+    def test_load_manifest_missing_file(self):
+        manifest_path = os.path.join(self.temp_dir, 'manifest.json')
+        with open(manifest_path, 'w') as manifest:
+            json.dump([{'tail_number': 'G-ABCD'}], manifest)
+        self.assertRaises(ValueError, load_manifest, manifest_path)
+
+
+class TestProcessBatch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @mock.patch('analysis_engine.process_batch.get_derived_nodes')
+    @mock.patch('analysis_engine.process_batch.process_flight')
+    def test_process_batch(self, process_flight, get_derived_nodes):
+        derived_nodes = {'Node': object}
+        get_derived_nodes.return_value = derived_nodes
+
+        def side_effect(segment_info, tail_number, **kwargs):
+            if segment_info['File'] == 'b.hdf5':
+                raise ValueError('Corrupt')
+            return empty_results()
+        process_flight.side_effect = side_effect
+
+        jobs = [{'file': name, 'tail_number': 'G-ABCD', 'segment_info': {},
+                 'aircraft_info': {}, 'achieved_flight_record': {}}
+                for name in ('a.hdf5', 'b.hdf5')]
+        summary = process_batch.process_batch(
+            jobs, self.temp_dir, processes=1, copy=False, csv=False,
+            requested=['Node'])
+
+        # Nodes are collected once for the whole batch.
+        self.assertEqual(get_derived_nodes.call_count, 1)
+        self.assertEqual(process_flight.call_count, 2)
+        for call in process_flight.call_args_list:
+            self.assertIs(call[1]['derived_nodes'], derived_nodes)
+            self.assertEqual(call[1]['requested'], ['Node'])
+
+        self.assertEqual(summary['success'], 1)
+        self.assertEqual(summary['failed'], 1)
+        a, b = summary['segments']
+        self.assertEqual(a['status'], 'success')
+        self.assertEqual(a['json'], os.path.join(self.temp_dir, 'a.json'))
+        self.assertTrue(os.path.exists(a['json']))
+        self.assertEqual(b['status'], 'failed')
+        self.assertEqual(b['error'], 'ValueError: Corrupt')
+        with open(os.path.join(self.temp_dir, 'summary.json')) as summary_file:
+            self.assertEqual(json.load(summary_file)['failed'], 1)
+
+    @mock.patch('analysis_engine.process_batch.get_derived_nodes')
+    @mock.patch('analysis_engine.process_batch.process_flight')
+    def test_process_batch_same_name(self, process_flight, get_derived_nodes):
+        process_flight.return_value = empty_results()
+        jobs = []
+        for dir_name in ('a', 'b'):
+            os.mkdir(os.path.join(self.temp_dir, dir_name))
+            path = os.path.join(self.temp_dir, dir_name, 'G-ABCD_1.hdf5')
+            with open(path, 'w') as hdf_file:
+                hdf_file.write(dir_name)
+            jobs.append({'file': path, 'tail_number': 'G-ABCD',
+                         'segment_info': {}, 'aircraft_info': {},
+                         'achieved_flight_record': {}})
+        output_dir = os.path.join(self.temp_dir, 'output')
+        summary = process_batch.process_batch(jobs, output_dir, processes=1,
+                                              csv=False)
+
+        a, b = summary['segments']
+        self.assertEqual(a['json'], os.path.join(output_dir, '0_G-ABCD_1.json'))
+        self.assertEqual(b['json'], os.path.join(output_dir, '1_G-ABCD_1.json'))
+        # Each segment is processed from its own copy.
+        copies = [call[0][0]['File'] for call in process_flight.call_args_list]
+        self.assertEqual(copies, [
+            os.path.join(output_dir, '0_G-ABCD_1_process.hdf5'),
+            os.path.join(output_dir, '1_G-ABCD_1_process.hdf5')])
+        for copy, dir_name in zip(copies, ('a', 'b')):
+            with open(copy) as hdf_file:
+                self.assertEqual(hdf_file.read(), dir_name)
+
+
+class TestOutputNames(unittest.TestCase):
+    def test_output_names(self):
+        jobs = [{'file': path} for path in (
+            '/data/a/G-ABCD_1.hdf5', '/data/G-ABCD_2.hdf5',
+            '/data/b/G-ABCD_1.hdf5', '/data/a/G-ABCD_1.hdf')]
+        self.assertEqual(output_names(jobs), [
+            '0_G-ABCD_1', 'G-ABCD_2', '2_G-ABCD_1', '3_G-ABCD_1'])
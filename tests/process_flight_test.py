@@ -1,5 +1,106 @@
+import inspect
+import mock
+import numpy as np
+import os
+import pytz
+import re
+import shutil
+import tempfile
+import time
 import unittest
 
+from datetime import datetime, timedelta
+
+from analysis_engine import settings
+from analysis_engine.exceptions import NodeBudgetExceeded
+from analysis_engine.node import (
+    DerivedParameterNode,
+    FlightPhaseNode,
+    KeyPointValueNode,
+    KeyTimeInstance,
+    KeyTimeInstanceNode,
+    KTI,
+    NodeManager,
+    P,
+    S,
+)
+from analysis_engine.process_flight import (
+    _Checkpoint,
+    _current_rss,
+    _ResultStream,
+    _priority_tiers,
+    _resume_checkpoint,
+    _run_within_budget,
+    _set_item_datetimes,
+    _set_item_positions,
+    _unchanged_nodes,
+    derive_parameters,
+    iter_process_flight,
+)
+from analysis_engine.utils import get_derived_nodes
+
+
+def empty_results():
+    '''
+    process_flight results without any derived nodes.
+    '''
+    return {'flight': {}, 'kti': {}, 'kpv': {}, 'approach': {}, 'phases': {}}
+
+
+class MockHDF(object):
+    '''
+    Minimal in-memory stand-in for hdf_file used by derive_parameters.
+    '''
+    def __init__(self, params, duration):
+        self.params = dict((p.name, p) for p in params)
+        self.duration = duration
+
+    def get_param(self, name, valid_only=False):
+        param = self.params[name]
+        return P(name=param.name, array=param.array.copy(),
+                 frequency=param.frequency, offset=param.offset)
+
+    def set_param(self, param):
+        self.params[param.name] = param
+
+    def valid_param_names(self):
+        return list(self.params)
+
+    def __getitem__(self, name):
+        return self.get_param(name)
+
+    def __contains__(self, name):
+        return name in self.params
+
+
+class Doubled(DerivedParameterNode):
+    def derive(self, raw=P('Raw1')):
+        self.array = raw.array * 2
+
+
+class Summed(DerivedParameterNode):
+    def derive(self, doubled=P('Doubled'), raw=P('Raw2')):
+        self.array = doubled.array + raw.array
+
+
+class Fast(FlightPhaseNode):
+    def derive(self, doubled=P('Doubled')):
+        self.create_phases(doubled.slices_above(20))
+
+
+class FastStart(KeyTimeInstanceNode):
+    def derive(self, fast=S('Fast')):
+        for phase in fast:
+            self.create_kti(phase.start_edge)
+
+
+class SummedMax(KeyPointValueNode):
+    def derive(self, summed=P('Summed'), fast=S('Fast')):
+        self.create_kpvs_within_slices(summed.array, fast,
+                                       lambda a, s, **kw: (
+                                           np.ma.argmax(a[s]) + s.start,
+                                           np.ma.max(a[s])))
+
 
 class TestProcessFlight(unittest.TestCase):
 
@@ -15,3 +116,557 @@ class TestProcessFlight(unittest.TestCase):
         '''
         self.assertTrue(False, msg='Test not implemented.')
 
+
+class TestDeriveParameters(unittest.TestCase):
+    def setUp(self):
+        self.derived_nodes = dict((n.get_name(), n) for n in (
+            Doubled, Summed, Fast, FastStart, SummedMax))
+        self.process_order = ['Raw1', 'Raw2', 'Doubled', 'Fast', 'Summed',
+                              'Fast Start', 'Summed Max']
+
+    def _derive(self, **kwargs):
+        array = np.ma.concatenate([np.ma.arange(30), np.ma.arange(30, 0, -1)])
+        hdf = MockHDF([P('Raw1', array), P('Raw2', array[::-1] * 3)],
+                      len(array))
+        node_mgr = NodeManager({}, hdf.duration, ['Raw1', 'Raw2'],
+                               ['Summed Max', 'Fast Start'], [],
+                               self.derived_nodes, {}, {})
+        results = derive_parameters(hdf, node_mgr, self.process_order,
+                                    **kwargs)
+        return hdf, results
+
+    def test_derive_parameters(self):
+        hdf, (ktis, kpvs, sections, approaches, flight_attrs) = self._derive()
+        self.assertEqual(list(ktis), ['Fast Start'])
+        self.assertEqual([k.index for k in ktis['Fast Start']], [10])
+        self.assertEqual(list(kpvs), ['Summed Max'])
+        self.assertEqual(len(kpvs['Summed Max']), 1)
+        self.assertEqual(list(sections), ['Fast'])
+        self.assertEqual(approaches, {})
+        self.assertEqual(flight_attrs, {})
+        self.assertEqual(sorted(hdf.params), ['Doubled', 'Raw1', 'Raw2', 'Summed'])
+
+    def test_derive_parameters_workers(self):
+        serial_hdf, serial = self._derive()
+        parallel_hdf, parallel = self._derive(workers=4)
+        self.assertEqual(serial, parallel)
+        for serial_result, parallel_result in zip(serial, parallel):
+            self.assertEqual(list(serial_result), list(parallel_result))
+        for name in ('Doubled', 'Summed'):
+            np.testing.assert_array_equal(serial_hdf.params[name].array,
+                                          parallel_hdf.params[name].array)
+
+    def test_derive_parameters_profile(self):
+        for workers in (1, 4):
+            profile = {}
+            self._derive(workers=workers, profile=profile)
+            self.assertEqual(sorted(profile), ['Doubled', 'Fast', 'Fast Start',
+                                               'Summed', 'Summed Max'])
+            for stats in profile.values():
+                for key in ('load', 'wall', 'cpu', 'align', 'derive', 'store'):
+                    self.assertGreaterEqual(stats[key], 0)
+            self.assertEqual(profile['Doubled']['type'], 'DerivedParameterNode')
+            self.assertEqual(profile['Doubled']['bytes'], 60 * 8)
+            self.assertEqual(profile['Fast Start']['type'], 'KeyTimeInstanceNode')
+            self.assertEqual(profile['Fast Start']['items'], 1)
+
+    def test_derive_parameters_eviction(self):
+        for workers in (1, 4):
+            params = {'Unused': KTI('Unused')}
+            memory = {}
+            hdf, results = self._derive(workers=workers, params=params,
+                                        memory=memory)
+            # Nodes are released once nothing depends upon them.
+            self.assertEqual(list(params), ['Unused'])
+            self.assertEqual(memory['evicted'], 7)
+            self.assertGreater(memory['peak_cache_entries'], 0)
+            self.assertGreater(memory['peak_cache_bytes'], 0)
+            self.assertGreaterEqual(memory['peak_params'], 1)
+            self.assertEqual(results, self._derive(workers=workers)[1])
+            with mock.patch('analysis_engine.process_flight.NODE_CACHE_EVICTION',
+                            False):
+                self._derive(workers=workers, params=params)
+            self.assertEqual(sorted(params), ['Fast', 'Fast Start',
+                                              'Summed Max', 'Unused'])
+
+    def test_derive_parameters_eviction_parallel(self):
+        # Many nodes align the same parameters concurrently, adding to the node
+        # cache while the aligned copies of completed nodes are evicted.
+        derived_nodes = {}
+        names = []
+        for n in range(40):
+            def derive(self, raw=P('Raw1'), fast=P('Raw4')):
+                self.array = raw.array + fast.array
+            name = 'Aligned %d' % n
+            derived_nodes[name] = type(str('Aligned%d' % n),
+                                       (DerivedParameterNode,),
+                                       {'derive': derive, 'name': name})
+            names.append(name)
+        array = np.ma.arange(64, dtype=float)
+        for _ in range(5):
+            hdf = MockHDF([P('Raw1', array),
+                           P('Raw4', np.ma.arange(256, dtype=float),
+                             frequency=4)], 64)
+            node_mgr = NodeManager({}, hdf.duration, ['Raw1', 'Raw4'], names,
+                                   [], derived_nodes, {}, {})
+            memory = {}
+            with mock.patch('analysis_engine.process_flight.NODE_CACHE_EVICTION',
+                            True):
+                derive_parameters(hdf, node_mgr, ['Raw1', 'Raw4'] + names,
+                                  workers=8, memory=memory)
+            self.assertEqual(sorted(hdf.params), sorted(['Raw1', 'Raw4'] + names))
+            self.assertEqual(memory['evicted'], 42)
+
+    def test_derive_parameters_write_behind(self):
+        for workers in (1, 4):
+            hdf, results = self._derive(workers=workers, write_behind=True)
+            expected_hdf, expected = self._derive(workers=workers)
+            self.assertEqual(results, expected)
+            for name in ('Doubled', 'Summed'):
+                np.testing.assert_array_equal(hdf.params[name].array,
+                                              expected_hdf.params[name].array)
+
+    def test_derive_parameters_write_behind_raises(self):
+        class Broken(KeyPointValueNode):
+            def derive(self, summed=P('Summed')):
+                raise ZeroDivisionError()
+        self.derived_nodes['Broken'] = Broken
+        self.process_order.append('Broken')
+        hdf = MockHDF([P('Raw1', np.ma.arange(10)),
+                       P('Raw2', np.ma.arange(10))], 10)
+        node_mgr = NodeManager({}, hdf.duration, ['Raw1', 'Raw2'], ['Broken'],
+                               [], self.derived_nodes, {}, {})
+        self.assertRaises(ZeroDivisionError, derive_parameters, hdf, node_mgr,
+                          self.process_order, write_behind=True)
+        # Parameters derived before the error are written.
+        self.assertEqual(sorted(hdf.params), ['Doubled', 'Raw1', 'Raw2',
+                                              'Summed'])
+
+    def test_derive_parameters_callback(self):
+        for workers in (1, 4):
+            calls = []
+            callback = lambda name, node, key, items: calls.append(
+                (name, node.name, key, items))
+            hdf, results = self._derive(workers=workers, callback=callback)
+            self.assertEqual(sorted(c[0] for c in calls),
+                             ['Doubled', 'Fast', 'Fast Start', 'Summed',
+                              'Summed Max'])
+            for name, node_name, key, items in calls:
+                self.assertEqual(name, node_name)
+                if name in ('Doubled', 'Summed'):
+                    self.assertEqual((key, items), (None, None))
+            self.assertIn(('Fast Start', 'Fast Start', 'kti',
+                           results[0]['Fast Start']), calls)
+            self.assertIn(('Fast', 'Fast', 'phases', results[2]['Fast']),
+                          calls)
+
+    def test_derive_parameters_workers_raises(self):
+        class Broken(KeyPointValueNode):
+            def derive(self, doubled=P('Doubled')):
+                raise ZeroDivisionError()
+        self.derived_nodes['Broken'] = Broken
+        self.process_order.append('Broken')
+        self.assertRaises(ZeroDivisionError, self._derive, workers=4)
+        # Errors are ignored when forced.
+        hdf, results = self._derive(workers=4, force=True)
+        self.assertEqual(results[1]['Broken'], [])
+
+    def test_derive_parameters_index_out_of_bounds(self):
+        class Late(KeyTimeInstanceNode):
+            def derive(self, doubled=P('Doubled')):
+                self.create_kti(10)
+                self.create_kti(len(doubled.array) + 5)
+        self.derived_nodes['Late'] = Late
+        self.process_order.append('Late')
+        with self.assertRaises(IndexError) as context:
+            self._derive()
+        self.assertEqual(str(context.exception),
+                         "KTI 'Late' index 65.00 is not between 0 and 60")
+
+    @mock.patch('analysis_engine.process_flight.NODE_BUDGETS',
+                {'Slow': {'time': 0.1}})
+    def test_derive_parameters_budget(self):
+        class Slow(KeyPointValueNode):
+            def derive(self, doubled=P('Doubled')):
+                end = time.time() + 10
+                while time.time() < end:
+                    pass
+        self.derived_nodes['Slow'] = Slow
+        self.process_order.append('Slow')
+        profile = {}
+        start = time.time()
+        hdf, results = self._derive(force=True, profile=profile)
+        # The slow node is killed and stored as failed.
+        self.assertTrue(time.time() - start < 5)
+        self.assertEqual(results[1]['Slow'], [])
+        self.assertEqual([k.index for k in results[0]['Fast Start']], [10])
+        breach = profile['Slow']['budget_breach']
+        self.assertEqual((breach['budget'], breach['limit']), ('time', 0.1))
+        self.assertTrue(breach['value'] > 0.1)
+        self.assertNotIn('budget_breach', profile['Summed Max'])
+        # Nodes within their budget are returned from the child process.
+        with mock.patch('analysis_engine.process_flight.NODE_BUDGETS',
+                        {'Summed Max': {'time': 10}}):
+            profile = {}
+            hdf, results = self._derive(force=True, profile=profile)
+            self.assertEqual(results[1]['Summed Max'],
+                             self._derive()[1][1]['Summed Max'])
+            self.assertIn('cpu', profile['Summed Max'])
+        # Budgets are not enforced while other threads are running.
+        self.assertRaises(ValueError, self._derive, workers=4, force=True)
+        self.assertRaises(ValueError, self._derive, write_behind=True,
+                          force=True)
+
+    def test_run_within_budget(self):
+        self.assertEqual(_run_within_budget('Node', lambda: 1, 10,
+                                            10 * 1024 ** 2), 1)
+        self.assertRaises(ZeroDivisionError, _run_within_budget, 'Node',
+                          lambda: 1 / 0, 10)
+        if _current_rss() is None:
+            return
+
+        def allocate():
+            arrays = []
+            end = time.time() + 10
+            while time.time() < end:
+                arrays.append(np.ones(1024 ** 2))
+                time.sleep(0.01)
+        with self.assertRaises(NodeBudgetExceeded) as context:
+            _run_within_budget('Node', allocate, memory_budget=50 * 1024 ** 2)
+        self.assertEqual(context.exception.budget, 'memory')
+        self.assertTrue(context.exception.value > 50 * 1024 ** 2)
+
+    @mock.patch('analysis_engine.process_flight.NODE_PRIORITIES',
+                {'Fast': 1, 'Summed': 2, 'Summed Max': 2})
+    def test_priority_tiers(self):
+        names = self.process_order[2:]
+        node_mgr = NodeManager({}, 60, ['Raw1', 'Raw2'], [], [],
+                               self.derived_nodes, {}, {})
+        # Fast is promoted to the tier of Fast Start which depends upon it.
+        self.assertEqual(_priority_tiers(node_mgr, names),
+                         {'Doubled': 0, 'Fast': 0, 'Summed': 2,
+                          'Fast Start': 0, 'Summed Max': 2})
+        node_mgr = NodeManager({}, 60, ['Raw1', 'Raw2'], [], ['Summed Max'],
+                               self.derived_nodes, {}, {})
+        self.assertEqual(_priority_tiers(node_mgr, names)['Summed'], 0)
+        with mock.patch.object(Doubled, 'priority', 3, create=True):
+            node_mgr = NodeManager({}, 60, ['Raw1', 'Raw2'], [], [],
+                                   {'Doubled': Doubled}, {}, {})
+            self.assertEqual(_priority_tiers(node_mgr, ['Doubled']),
+                             {'Doubled': 3})
+
+    @mock.patch('analysis_engine.process_flight.NODE_PRIORITIES',
+                {'Summed': 1, 'Summed Max': 1})
+    def test_derive_parameters_deadline(self):
+        for workers in (1, 4):
+            skipped = []
+            hdf, results = self._derive(workers=workers, deadline=0,
+                                        skipped=skipped)
+            # The required tier is derived regardless of the deadline.
+            self.assertEqual(skipped, ['Summed', 'Summed Max'])
+            self.assertEqual(list(results[0]), ['Fast Start'])
+            self.assertEqual(results[1], {})
+            self.assertEqual(sorted(hdf.params), ['Doubled', 'Raw1', 'Raw2'])
+            skipped = []
+            hdf, results = self._derive(workers=workers,
+                                        deadline=time.time() + 60,
+                                        skipped=skipped)
+            self.assertEqual(skipped, [])
+            self.assertEqual(results, self._derive(workers=workers)[1])
+
+
+    def test_derive_parameters_deadline_priority(self):
+        class Optional(KeyPointValueNode):
+            priority = 1
+
+            def derive(self, summed=P('Summed')):
+                self.create_kpv(0, 1)
+        self.derived_nodes['Optional'] = Optional
+        self.process_order.append('Optional')
+        skipped = []
+        hdf, results = self._derive(deadline=0, skipped=skipped)
+        # The node's priority attribute places it within an optional tier.
+        self.assertEqual(skipped, ['Optional'])
+        self.assertNotIn('Optional', results[1])
+        hdf, results = self._derive(deadline=time.time() + 60)
+        self.assertEqual(len(results[1]['Optional']), 1)
+
+    def test_node_priorities(self):
+        '''
+        Nodes within settings.NODE_MODULES with a priority attribute are not
+        promoted to a lower tier by nodes which depend upon them, which would
+        make the attribute ineffective.
+        '''
+        derived = get_derived_nodes(settings.NODE_MODULES)
+        tiers = {}
+        for name, node in derived.items():
+            tiers[name] = settings.NODE_PRIORITY_DEFAULT \
+                if node.priority is None else node.priority
+        promoted = True
+        while promoted:
+            promoted = False
+            for name, node in derived.items():
+                for dep_name in node.get_dependency_names():
+                    if tiers.get(dep_name, 0) > tiers[name]:
+                        tiers[dep_name] = tiers[name]
+                        promoted = True
+        for name, node in derived.items():
+            if node.priority is not None:
+                self.assertEqual(tiers[name], node.priority, msg=name)
+
+    def test_can_operate_cacheable(self):
+        '''
+        Nodes within settings.NODE_MODULES whose can_operate logs are not
+        cached, otherwise the messages are only logged for the first flight.
+        '''
+        logs = re.compile(r'^[^#]*(cls\.(debug|info|warning|error|exception)'
+                          r'\(|lookup_table\(cls)', re.MULTILINE)
+        for name, node in get_derived_nodes(settings.NODE_MODULES).items():
+            if logs.search(inspect.getsource(node.can_operate)):
+                self.assertFalse(node.can_operate_cacheable, msg=name)
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'flight.hdf5.checkpoint')
+        self.derived_nodes = dict((n.get_name(), n) for n in (
+            Doubled, Summed, Fast, FastStart, SummedMax))
+        self.process_order = ['Raw1', 'Raw2', 'Doubled', 'Fast', 'Summed',
+                              'Fast Start', 'Summed Max']
+        array = np.ma.concatenate([np.ma.arange(30), np.ma.arange(30, 0, -1)])
+        self.hdf = MockHDF([P('Raw1', array), P('Raw2', array[::-1] * 3)],
+                           len(array))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _node_mgr(self, crash=False):
+        derived_nodes = self.derived_nodes
+        if crash:
+            class Crash(SummedMax):
+                name = 'Summed Max'
+
+                def derive(self, summed=P('Summed'), fast=S('Fast')):
+                    raise ZeroDivisionError()
+            derived_nodes = dict(derived_nodes, **{'Summed Max': Crash})
+        return NodeManager({}, self.hdf.duration, ['Raw1', 'Raw2'],
+                           ['Summed Max', 'Fast Start'], [], derived_nodes,
+                           {}, {})
+
+    def test_resume_checkpoint(self):
+        expected = derive_parameters(MockHDF(self.hdf.params.values(), 60),
+                                     self._node_mgr(), self.process_order)
+        checkpoint = _Checkpoint(self.path, self.process_order, interval=0)
+        self.assertRaises(ZeroDivisionError, derive_parameters, self.hdf,
+                          self._node_mgr(crash=True), self.process_order,
+                          callback=checkpoint)
+        self.assertEqual(
+            _Checkpoint.load(self.path, self.process_order)[0],
+            ['Doubled', 'Fast', 'Summed', 'Fast Start'])
+        self.assertEqual(_Checkpoint.load(self.path, ['Raw1']), ([], {}))
+        doubled = self.hdf.params['Doubled']
+
+        # Completed nodes are not derived again and remain within the
+        # checkpoint when the resumed process also crashes.
+        for crash in (True, False):
+            node_mgr = self._node_mgr(crash=crash)
+            initial = {}
+            calls = []
+            checkpoint = _resume_checkpoint(
+                self.path, self.hdf, node_mgr, self.process_order, initial,
+                lambda name, node, key, items: calls.append((name, node)))
+            self.assertEqual(node_mgr.hdf_keys,
+                             ['Raw1', 'Raw2', 'Doubled', 'Summed'])
+            self.assertEqual(sorted(initial), ['Fast', 'Fast Start'])
+            fast = initial['Fast']
+            checkpoint.interval = 0
+            if crash:
+                self.assertRaises(ZeroDivisionError, derive_parameters,
+                                  self.hdf, node_mgr, self.process_order,
+                                  params=initial, callback=checkpoint)
+            else:
+                results = derive_parameters(
+                    self.hdf, node_mgr, self.process_order, params=initial,
+                    callback=checkpoint)
+            self.assertEqual([c[0] for c in calls][:2],
+                             ['Fast', 'Fast Start'])
+            self.assertIs(calls[0][1], fast)
+        self.assertIs(self.hdf.params['Doubled'], doubled)
+        self.assertEqual(results, expected)
+        checkpoint.remove()
+        self.assertFalse(os.path.exists(self.path))
+
+
+class TestUnchangedNodes(unittest.TestCase):
+    def test_unchanged_nodes(self):
+        hdf = MockHDF([P('Raw1'), P('Raw2'), P('Doubled'), P('Summed')], 10)
+        node_mgr = NodeManager({}, hdf.duration, ['Raw1', 'Raw2'],
+                               ['Summed Max', 'Fast Start'], [], {}, {}, {})
+        initial = {'Fast': S('Fast'), 'Fast Start': KTI('Fast Start'),
+                   'Manual': KTI('Manual'), 'Summed Max': KTI('Summed Max')}
+        fingerprints = {'Doubled': 'a', 'Summed': 'b', 'Fast': 'c',
+                        'Fast Start': 'd', 'Summed Max': 'e'}
+        previous = {'Doubled': 'a', 'Summed': 'x', 'Fast': 'x',
+                    'Fast Start': 'd'}
+        params, nodes = _unchanged_nodes(hdf, node_mgr, initial, fingerprints,
+                                         previous)
+        self.assertEqual(params, ['Doubled'])
+        # Manual is kept as it has no previous fingerprint and is not
+        # requested, Summed Max is requested without a previous fingerprint.
+        self.assertEqual(sorted(nodes), ['Fast Start', 'Manual'])
+
+
+class TestResultStream(unittest.TestCase):
+    def setUp(self):
+        self.start_datetime = datetime(2015, 1, 1)
+        self.sent = []
+        self.callback = lambda *args: self.sent.append(args)
+        self.lat = P('Latitude Smoothed', np.ma.arange(10, dtype=float))
+        self.lon = P('Longitude Smoothed', np.ma.arange(10, 20, dtype=float))
+
+    def _stream(self, hdf, process_order):
+        node_mgr = NodeManager({}, hdf.duration, list(hdf.params), [], [], {},
+                               {}, {})
+        return _ResultStream(hdf, node_mgr, process_order,
+                             self.start_datetime, self.callback)
+
+    def test_held_until_positions_derived(self):
+        hdf = MockHDF([], 10)
+        stream = self._stream(hdf, ['Fast', 'Latitude Smoothed',
+                                    'Longitude Smoothed', 'Fast Start'])
+        kti = KeyTimeInstance(3, 'Fast Start')
+        stream('Fast Start', None, 'kti', [kti])
+        stream('Fast', None, 'phases', [])
+        self.assertEqual(self.sent, [('phases', 'Fast', [])])
+        stream('Latitude Smoothed', self.lat, None, None)
+        self.assertEqual(len(self.sent), 1)
+        stream('Longitude Smoothed', self.lon, None, None)
+        self.assertEqual(self.sent[1], ('kti', 'Fast Start', [kti]))
+        self.assertEqual(kti.datetime,
+                         self.start_datetime + timedelta(seconds=3))
+        self.assertEqual(kti.latitude, 3)
+        self.assertEqual(kti.longitude, 13)
+
+    def test_positions_within_hdf(self):
+        hdf = MockHDF([self.lat, self.lon], 10)
+        stream = self._stream(hdf, ['Latitude Smoothed', 'Longitude Smoothed',
+                                    'Fast Start'])
+        kti = KeyTimeInstance(3, 'Fast Start')
+        stream('Fast Start', None, 'kti', [kti])
+        self.assertEqual(self.sent, [('kti', 'Fast Start', [kti])])
+        self.assertEqual(kti.latitude, 3)
+
+    def test_positions_unavailable(self):
+        hdf = MockHDF([], 10)
+        stream = self._stream(hdf, ['Fast Start'])
+        kti = KeyTimeInstance(3, 'Fast Start')
+        stream('Fast Start', None, 'kti', [kti])
+        self.assertEqual(self.sent, [('kti', 'Fast Start', [kti])])
+        self.assertEqual(kti.latitude, None)
+        self.assertEqual(kti.datetime,
+                         self.start_datetime + timedelta(seconds=3))
+
+
+class TestGeoLocate(unittest.TestCase):
+    def setUp(self):
+        self.lat = P('Latitude Smoothed', np.ma.arange(-2, 8, dtype=float),
+                     frequency=2, offset=0.25)
+        self.lon = P('Longitude Smoothed', np.ma.arange(10, 20, dtype=float),
+                     frequency=2, offset=0.25)
+        self.indices = [-1, 0, 0.25, 1.25, 1.3, 2.1, 4.75, 5, 12]
+
+    def test_set_item_positions(self):
+        ktis = [KeyTimeInstance(index, 'Fast Start') for index in self.indices]
+        _set_item_positions((self.lat, self.lon), ktis)
+        for kti in ktis:
+            expected = self.lat.at(kti.index)
+            self.assertAlmostEqual(kti.latitude, expected or None)
+            self.assertAlmostEqual(kti.longitude, self.lon.at(kti.index))
+        # Zero values are not stored.
+        self.assertEqual(ktis[3].latitude, None)
+
+    def test_set_item_positions_masked(self):
+        self.lat.array[3:5] = np.ma.masked
+        ktis = [KeyTimeInstance(index, 'Fast Start') for index in self.indices]
+        _set_item_positions((self.lat, self.lon), ktis)
+        self.assertEqual([kti.latitude for kti in ktis],
+                         [self.lat.at(i) or None for i in self.indices])
+
+    def test_set_item_datetimes(self):
+        indices = [0, 0.5, 1.0000004, 1.0000006, 3600.25, 86400 * 3 + 7]
+        for start_datetime in (datetime(2015, 1, 1, 12),
+                               datetime(2015, 1, 1, 12, tzinfo=pytz.utc)):
+            ktis = [KeyTimeInstance(index, 'Fast Start') for index in indices]
+            _set_item_datetimes(start_datetime, ktis)
+            self.assertEqual(
+                [kti.datetime for kti in ktis],
+                [start_datetime + timedelta(seconds=i) for i in indices])
+            self.assertEqual(ktis[0].datetime.tzinfo, start_datetime.tzinfo)
+
+
+class TestIterProcessFlight(unittest.TestCase):
+    @mock.patch('analysis_engine.process_flight.process_flight')
+    def test_iter_process_flight(self, process_flight):
+        def side_effect(segment_info, tail_number, callback=None, **kwargs):
+            callback('kti', 'Fast Start', [1])
+            callback('kpv', 'Summed Max', [2])
+        process_flight.side_effect = side_effect
+        results = list(iter_process_flight({'File': 'x.hdf5'}, 'G-ABCD',
+                                           workers=2))
+        self.assertEqual(results, [('kti', 'Fast Start', [1]),
+                                   ('kpv', 'Summed Max', [2])])
+        self.assertEqual(process_flight.call_args[1]['workers'], 2)
+
+    @mock.patch('analysis_engine.process_flight.process_flight')
+    def test_iter_process_flight_raises(self, process_flight):
+        def side_effect(segment_info, tail_number, callback=None, **kwargs):
+            callback('kti', 'Fast Start', [1])
+            raise ZeroDivisionError()
+        process_flight.side_effect = side_effect
+        results = iter_process_flight({'File': 'x.hdf5'}, 'G-ABCD')
+        self.assertEqual(next(results), ('kti', 'Fast Start', [1]))
+        self.assertRaises(ZeroDivisionError, next, results)
+
+    @mock.patch('analysis_engine.process_flight.process_flight')
+    def test_iter_process_flight_close(self, process_flight):
+        sent = []
+
+        def side_effect(segment_info, tail_number, callback=None, **kwargs):
+            for index in range(100):
+                callback('kti', 'KTI %d' % index, [index])
+                sent.append(index)
+                time.sleep(0.01)
+        process_flight.side_effect = side_effect
+        results = iter_process_flight({'File': 'x.hdf5'}, 'G-ABCD')
+        next(results)
+        results.close()
+        self.assertLess(len(sent), 100)
+
+    @mock.patch('analysis_engine.process_flight.NODE_TIME_BUDGET', 1.0)
+    @mock.patch('analysis_engine.process_flight.process_flight')
+    def test_iter_process_flight_budget(self, process_flight):
+        results = iter_process_flight({'File': 'x.hdf5'}, 'G-ABCD',
+                                      force=True)
+        self.assertRaises(ValueError, next, results)
+        self.assertFalse(process_flight.called)
+        # Budgets are only enforced when forcing.
+        results = list(iter_process_flight({'File': 'x.hdf5'}, 'G-ABCD'))
+        self.assertEqual(results, [])
+        self.assertTrue(process_flight.called)
+
+    @mock.patch('analysis_engine.process_flight.STOP_TIMEOUT', 0.1)
+    @mock.patch('analysis_engine.process_flight.process_flight')
+    def test_iter_process_flight_close_timeout(self, process_flight):
+        def side_effect(segment_info, tail_number, callback=None, **kwargs):
+            callback('kti', 'Fast Start', [1])
+            # A long running node without results.
+            time.sleep(2)
+            callback('kpv', 'Summed Max', [2])
+        process_flight.side_effect = side_effect
+        results = iter_process_flight({'File': 'x.hdf5'}, 'G-ABCD')
+        next(results)
+        start = time.time()
+        results.close()
+        # Closing does not wait for the current node.
+        self.assertLess(time.time() - start, 1)
@@ -0,0 +1,121 @@
+import numpy as np
+import unittest
+
+from flightdatautilities import units as ut
+
+from hdfaccess.parameter import MappedArray
+
+from analysis_engine.node import M, NodeManager, P
+from analysis_engine.process_flight import derive_parameters
+from analysis_engine.quick_look import decimate_param, QuickLookHDF
+
+from process_flight_test import Doubled, MockHDF, Summed
+
+
+class LFLMockHDF(MockHDF):
+    def __init__(self, params, duration):
+        super(LFLMockHDF, self).__init__(params, duration)
+        self.lfl_names = list(self.params)
+        self.attrs = {'aircraft_info': {'Family': 'A320'}}
+
+    def valid_lfl_param_names(self):
+        return list(self.lfl_names)
+
+    def get_attr(self, name, default=None):
+        return self.attrs.get(name, default)
+
+    def set_attr(self, name, value):
+        raise AssertionError('Attributes must not be written.')
+
+    def set_param(self, param):
+        raise AssertionError('Parameters must not be written.')
+
+
+class TestDecimateParam(unittest.TestCase):
+    def test_decimate_param(self):
+        param = P('Airspeed', np.ma.arange(10, dtype=float), frequency=4,
+                  offset=0.1)
+        param.array[4:8] = np.ma.masked
+        decimated = decimate_param(param)
+        self.assertEqual(decimated.frequency, 1)
+        self.assertAlmostEqual(decimated.offset, 0.475)
+        self.assertEqual(decimated.array.tolist(), [1.5, None, 8.5])
+        # The original parameter is unchanged.
+        self.assertEqual(param.frequency, 4)
+        self.assertEqual(len(param.array), 10)
+        slow = P('Altitude STD', np.ma.arange(5), frequency=0.5)
+        self.assertIs(decimate_param(slow), slow)
+        decimated = decimate_param(P('Odd', np.ma.arange(6), frequency=1.5))
+        self.assertEqual(decimated.frequency, 0.75)
+        self.assertEqual(decimated.array.tolist(), [0.5, 2.5, 4.5])
+
+    def test_decimate_param_angles(self):
+        heading = P('Heading', np.ma.array([359.0, 1, 2, 356, 90, 90, 180,
+                                            182]),
+                    frequency=2)
+        heading.units = ut.DEGREE
+        heading.array[5] = np.ma.masked
+        decimated = decimate_param(heading)
+        self.assertEqual(decimated.frequency, 1)
+        self.assertAlmostEqual(decimated.offset, 0.25)
+        np.testing.assert_allclose(decimated.array, [0, 359, 90, 181],
+                                   atol=1e-9)
+        # Signed angles keep their range.
+        longitude = P('Longitude', np.ma.array([178.0, -176, -10, -20]),
+                      frequency=2)
+        longitude.units = ut.DEGREE
+        np.testing.assert_allclose(decimate_param(longitude).array,
+                                   [-179, -15])
+
+    def test_decimate_param_discrete(self):
+        param = P('Gear Down Discrete', np.ma.array([0.0, 1, 1, 0, 1, 1]),
+                  frequency=2, offset=0.2, data_type='Discrete')
+        decimated = decimate_param(param)
+        self.assertEqual(decimated.offset, 0.2)
+        self.assertEqual(decimated.array.tolist(), [0, 1, 1])
+
+    def test_decimate_param_multistate(self):
+        mapping = {0: '-', 1: 'Down'}
+        param = M('Gear Down', MappedArray([0, 0, 1, 1, 1, 0],
+                                           values_mapping=mapping),
+                  frequency=2, offset=0.2)
+        decimated = decimate_param(param)
+        self.assertEqual(decimated.frequency, 1)
+        self.assertEqual(decimated.offset, 0.2)
+        self.assertEqual(decimated.array.raw.tolist(), [0, 1, 1])
+        self.assertEqual(decimated.array.values_mapping, mapping)
+
+
+class TestQuickLookHDF(unittest.TestCase):
+    def setUp(self):
+        array = np.ma.arange(120, dtype=float)
+        self.hdf = LFLMockHDF([P('Raw1', array, frequency=2),
+                               P('Raw2', array, frequency=2)], 60)
+
+    def test_get_param(self):
+        quick_look = QuickLookHDF(self.hdf)
+        raw = quick_look.get_param('Raw1')
+        self.assertEqual(raw.frequency, 1)
+        self.assertEqual(len(raw.array), 60)
+        # Copies are returned.
+        raw.array[:] = 0
+        self.assertEqual(quick_look['Raw1'].array[1], 2.5)
+        self.assertEqual(quick_look.get_attr('aircraft_info'),
+                         {'Family': 'A320'})
+        quick_look.set_attr('aircraft_info', {})
+        self.assertEqual(quick_look.get_attr('aircraft_info'), {})
+
+    def test_derive_parameters(self):
+        quick_look = QuickLookHDF(self.hdf)
+        derived_nodes = {'Doubled': Doubled, 'Summed': Summed}
+        node_mgr = NodeManager({}, quick_look.duration,
+                               quick_look.valid_param_names(), ['Summed'],
+                               [], derived_nodes, {}, {})
+        derive_parameters(quick_look, node_mgr,
+                          ['Raw1', 'Raw2', 'Doubled', 'Summed'])
+        self.assertEqual(quick_look.valid_param_names(),
+                         ['Raw1', 'Raw2', 'Doubled', 'Summed'])
+        summed = quick_look.get_param('Summed')
+        self.assertEqual(summed.frequency, 1)
+        self.assertEqual(summed.array[1], 7.5)
+        self.assertEqual(sorted(self.hdf.params), ['Raw1', 'Raw2'])
@@ -0,0 +1,161 @@
+import mock
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+
+from analysis_engine.node import NodeManager
+from analysis_engine.scheduling import (
+    check_order,
+    costs_path,
+    critical_path_policy,
+    load_costs,
+    memory_policy,
+    needs_costs,
+    NodeCosts,
+    order_dependencies,
+    ORDERING_POLICIES,
+    save_costs,
+    schedule,
+)
+
+from process_flight_test import Doubled, Fast, FastStart, Summed, SummedMax
+
+
+class TestScheduling(unittest.TestCase):
+    def setUp(self):
+        self.node_mgr = NodeManager(
+            {}, 10, ['Raw1', 'Raw2'], ['Summed Max'], [],
+            dict((n.get_name(), n) for n in (
+                Doubled, Summed, Fast, FastStart, SummedMax)),
+            {'Frame': '737-3C'}, {})
+        self.process_order = ['Raw1', 'Raw2', 'Doubled', 'Fast', 'Summed',
+                              'Fast Start', 'Summed Max']
+        self.costs = NodeCosts({
+            'Doubled': {'wall': 0.1, 'bytes': 100},
+            'Fast': {'wall': 0.1, 'bytes': 100},
+            'Summed': {'wall': 3.0, 'bytes': 100},
+            'Fast Start': {'wall': 0.1, 'bytes': 100},
+            'Summed Max': {'wall': 0.1, 'bytes': 100},
+        })
+        self.critical_path = ['Doubled', 'Summed', 'Raw1', 'Raw2', 'Fast',
+                              'Fast Start', 'Summed Max']
+        self.cost_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cost_dir)
+
+    def test_order_dependencies(self):
+        self.assertEqual(
+            order_dependencies(self.node_mgr, self.process_order),
+            {'Raw1': [], 'Raw2': [], 'Doubled': [], 'Fast': ['Doubled'],
+             'Summed': ['Doubled'], 'Fast Start': ['Fast'],
+             'Summed Max': ['Summed', 'Fast']})
+
+    def test_critical_path_policy(self):
+        dependencies = order_dependencies(self.node_mgr, self.process_order)
+        self.assertEqual(
+            critical_path_policy(self.process_order, dependencies,
+                                 self.costs),
+            self.critical_path)
+
+    def test_memory_policy(self):
+        # Deriving each user straight after the large node it releases holds
+        # one large node in memory rather than both.
+        dependencies = {'Big 1': [], 'Big 2': [], 'Use 1': ['Big 1'],
+                        'Use 2': ['Big 2']}
+        costs = NodeCosts({'Big 1': {'bytes': 1000}, 'Big 2': {'bytes': 1000},
+                           'Use 1': {'bytes': 10}, 'Use 2': {'bytes': 10}})
+        self.assertEqual(
+            memory_policy(['Big 1', 'Big 2', 'Use 1', 'Use 2'], dependencies,
+                          costs),
+            ['Big 1', 'Use 1', 'Big 2', 'Use 2'])
+
+    def test_policies_respect_dependencies(self):
+        rng = random.Random(3)
+        for _ in range(50):
+            names = ['Node %d' % n for n in range(rng.randint(1, 60))]
+            dependencies = {
+                name: rng.sample(names[:n], min(n, rng.randint(0, 3)))
+                for n, name in enumerate(names)}
+            costs = NodeCosts({
+                name: {'wall': rng.random(), 'bytes': rng.randint(0, 100)}
+                for name in names if rng.random() > 0.2})
+            for policy in ORDERING_POLICIES.values():
+                order = policy(list(names), dependencies, costs)
+                self.assertEqual(sorted(order), sorted(names))
+                self.assertEqual(check_order(order, dependencies), [])
+
+    def test_schedule(self):
+        self.assertIs(schedule(self.node_mgr, self.process_order),
+                      self.process_order)
+        self.assertEqual(
+            schedule(self.node_mgr, self.process_order,
+                     policy='critical_path', costs=self.costs),
+            self.critical_path)
+        with mock.patch('analysis_engine.scheduling.settings') as settings:
+            settings.PROCESS_ORDER_POLICY = 'critical_path'
+            settings.NODE_COSTS_DIR = self.cost_dir
+            # Without recorded costs the order is unchanged.
+            self.assertEqual(schedule(self.node_mgr, self.process_order),
+                             self.process_order)
+            save_costs(costs_path(self.node_mgr.aircraft_info),
+                       self.costs.costs)
+            self.assertEqual(schedule(self.node_mgr, self.process_order),
+                             self.critical_path)
+        # Invalid orders are ignored.
+        reverse = lambda order, dependencies, costs: order[::-1]
+        self.assertEqual(schedule(self.node_mgr, self.process_order,
+                                  policy=reverse), self.process_order)
+        self.assertEqual(schedule(self.node_mgr, self.process_order,
+                                  policy=lambda *args: ['Raw1']),
+                         self.process_order)
+        self.assertRaises(KeyError, schedule, self.node_mgr,
+                          self.process_order, policy='unknown')
+
+    def test_node_costs(self):
+        self.assertIsNone(costs_path({'Frame': '737-3C'}))
+        self.assertIsNone(costs_path({}, cost_dir=self.cost_dir))
+        path = costs_path({'Frame': '737-3C', 'Frame Qualifier': 'A/B'},
+                          cost_dir=self.cost_dir)
+        self.assertEqual(path, os.path.join(self.cost_dir, '737-3C-A_B.json'))
+        self.assertEqual(load_costs(path).costs, {})
+        save_costs(path, {'Slow': {'wall': 2.0, 'cpu': 1.9, 'bytes': 80},
+                          'Fast': {'wall': 0.1, 'items': 2}})
+        save_costs(path, {'Slow': {'wall': 3.0, 'bytes': 80},
+                          'Aborted': {'wall': 60.0, 'budget_breach': {}}})
+        costs = load_costs(path)
+        self.assertEqual(costs.costs, {'Slow': {'wall': 2.3, 'bytes': 80},
+                                       'Fast': {'wall': 0.1}})
+        self.assertEqual(costs.wall('Slow'), 2.3)
+        self.assertAlmostEqual(costs.wall('Unknown'), 1.2)
+        self.assertEqual(costs.nbytes('Fast'), 80)
+        with open(path, 'w') as costs_file:
+            costs_file.write('{')
+        self.assertEqual(load_costs(path).costs, {})
+
+    def test_save_costs_concurrent(self):
+        path = costs_path({'Frame': '737-3C'}, cost_dir=self.cost_dir)
+
+        def save(name):
+            for _ in range(20):
+                save_costs(path, {name: {'wall': 1.0}})
+        threads = [threading.Thread(target=save, args=('Node %d' % n,))
+                   for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # No run's update is lost.
+        self.assertEqual(sorted(load_costs(path).costs),
+                         ['Node %d' % n for n in range(8)])
+
+    def test_needs_costs(self):
+        self.assertFalse(needs_costs('dependency'))
+        self.assertTrue(needs_costs('critical_path'))
+        self.assertTrue(needs_costs(lambda *args: args[0]))
+        with mock.patch('analysis_engine.scheduling.settings') as settings:
+            settings.PROCESS_ORDER_POLICY = 'dependency'
+            self.assertFalse(needs_costs())
@@ -0,0 +1,159 @@
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+from datetime import datetime
+
+from analysis_engine.datastructures import Segment
+from analysis_engine.node import KeyTimeInstance
+from analysis_engine.worker import (
+    AnalysisWorker,
+    JobQueue,
+    LocalClient,
+    WorkerClient,
+)
+
+from process_flight_test import empty_results
+
+
+@mock.patch('analysis_engine.worker.api')
+@mock.patch('analysis_engine.worker.get_derived_nodes')
+class TestAnalysisWorker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @mock.patch('analysis_engine.worker.process_flight')
+    def test_process_flight(self, process_flight, get_derived_nodes, api):
+        derived_nodes = {'Node': object}
+        get_derived_nodes.return_value = derived_nodes
+        results = empty_results()
+        results['kti']['Node'] = [KeyTimeInstance(10, 'Node')]
+        process_flight.return_value = results
+
+        client = LocalClient()
+        self.assertEqual(get_derived_nodes.call_count, 1)
+        for _ in range(2):
+            result = client.run(
+                'process_flight', file='a.hdf5', tail_number='G-ABCD',
+                segment_info={'Start Datetime': '2015-01-01T13:00:00'},
+                requested=['Node'])
+            self.assertEqual(result['status'], 'success')
+            self.assertEqual(result['result']['kti']['Node'][0]['index'], 10)
+
+        # Nodes are collected once for every job.
+        self.assertEqual(get_derived_nodes.call_count, 1)
+        self.assertEqual(process_flight.call_count, 2)
+        args, kwargs = process_flight.call_args
+        self.assertEqual(args, ({'File': 'a.hdf5',
+                                 'Start Datetime': datetime(2015, 1, 1, 13)},
+                                'G-ABCD'))
+        self.assertIs(kwargs['derived_nodes'], derived_nodes)
+        self.assertEqual(kwargs['requested'], ['Node'])
+
+    @mock.patch('analysis_engine.worker.split_hdf_to_segments')
+    def test_split_hdf_to_segments(self, split_hdf_to_segments,
+                                   get_derived_nodes, api):
+        split_hdf_to_segments.return_value = [
+            Segment(slice(0, 100), 'START_AND_STOP', 1, 'a_1.hdf5')]
+        result = LocalClient().run(
+            'split_hdf_to_segments', file='a.hdf5',
+            aircraft_info={'Tail Number': 'G-ABCD'},
+            fallback_dt='2015-01-01T13:00:00')
+        self.assertEqual(result['status'], 'success')
+        segment = result['result'][0]
+        self.assertEqual(segment['type'], 'START_AND_STOP')
+        self.assertEqual(segment['slice']['value'], [0, 100, None])
+        args, kwargs = split_hdf_to_segments.call_args
+        self.assertEqual(args, ('a.hdf5', {'Tail Number': 'G-ABCD'}))
+        self.assertEqual(kwargs['fallback_dt'], datetime(2015, 1, 1, 13))
+
+    def test_failed_job(self, get_derived_nodes, api):
+        result = LocalClient().run('process_flight', tail_number='G-ABCD')
+        self.assertEqual(result['status'], 'failed')
+        self.assertTrue(result['error'].startswith('ValueError'))
+        result = LocalClient().run('unknown')
+        self.assertEqual(result['error'], "ValueError: Unknown job type "
+                                          "'unknown'.")
+
+    @mock.patch('analysis_engine.worker.process_flight')
+    def test_serve(self, process_flight, get_derived_nodes, api):
+        process_flight.return_value = empty_results()
+        client = WorkerClient(self.temp_dir)
+        job_ids = [client.submit('process_flight', file=name)
+                   for name in ('a.hdf5', 'b.hdf5')]
+        self.assertRaises(ValueError, client.submit, 'unknown')
+        queue = JobQueue(self.temp_dir)
+        worker = AnalysisWorker()
+        self.assertEqual(worker.serve(queue, poll_interval=0, max_jobs=2), 2)
+        self.assertEqual(
+            [c[0][0]['File'] for c in process_flight.call_args_list],
+            ['a.hdf5', 'b.hdf5'])
+        for job_id in job_ids:
+            result = client.wait(job_id, timeout=0)
+            self.assertEqual(result['id'], job_id)
+            self.assertEqual(result['status'], 'success')
+        self.assertEqual(os.listdir(queue.jobs_dir), [])
+        self.assertEqual(os.listdir(queue.claimed_dir), [])
+        # Workers exit once a stop is requested.
+        queue.request_stop()
+        self.assertEqual(worker.serve(queue, poll_interval=0), 0)
+        self.assertRaises(RuntimeError, client.wait, 'missing', timeout=0)
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_claim(self):
+        queue = JobQueue(self.temp_dir)
+        self.assertIsNone(queue.claim())
+        queue.submit({'id': 'a', 'type': 'process_flight'})
+        claimed_path, job = queue.claim()
+        self.assertEqual(job, {'id': 'a', 'type': 'process_flight'})
+        # Claimed jobs are not claimed again.
+        self.assertIsNone(queue.claim())
+        self.assertIsNone(queue.get_result('a'))
+        queue.complete(claimed_path, {'id': 'a', 'status': 'success'})
+        self.assertEqual(queue.get_result('a'),
+                         {'id': 'a', 'status': 'success'})
+        self.assertFalse(os.path.exists(claimed_path))
+
+    def test_claim_malformed(self):
+        queue = JobQueue(self.temp_dir)
+        with open(os.path.join(queue.jobs_dir, '0-bad.json'), 'w') as f:
+            f.write('{')
+        queue.submit({'id': 'a', 'type': 'process_flight'})
+        claimed_path, job = queue.claim()
+        self.assertEqual(job['id'], 'a')
+        # The malformed job is stored as failed rather than raising.
+        result = queue.get_result('bad')
+        self.assertEqual(result['status'], 'failed')
+        self.assertIn('line 1 column 2', result['error'])
+        self.assertEqual(os.listdir(queue.claimed_dir),
+                         [os.path.basename(claimed_path)])
+
+    def test_recover(self):
+        queue = JobQueue(self.temp_dir)
+        queue.submit({'id': 'a', 'type': 'process_flight'})
+        claimed_path, job = queue.claim()
+        # Jobs of running workers are not recovered.
+        self.assertEqual(queue.recover(), 0)
+        with mock.patch('analysis_engine.worker._process_running',
+                        return_value=False):
+            self.assertEqual(queue.recover(), 1)
+            claimed_path, job = queue.claim()
+            self.assertEqual(job, {'id': 'a', 'type': 'process_flight',
+                                   'recoveries': 1})
+            # Jobs which repeatedly stop their worker are failed.
+            self.assertEqual(queue.recover(), 0)
+        self.assertEqual(os.listdir(queue.jobs_dir), [])
+        self.assertEqual(os.listdir(queue.claimed_dir), [])
+        self.assertEqual(queue.get_result('a')['status'], 'failed')
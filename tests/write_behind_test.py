@@ -0,0 +1,59 @@
+import numpy as np
+import threading
+import unittest
+
+from analysis_engine.node import P
+from analysis_engine.write_behind import WriteBehindHDF
+
+
+class BlockingHDF(object):
+    '''
+    Stand-in for hdf_file whose set_param waits until released.
+    '''
+    def __init__(self):
+        self.params = {}
+        self.duration = 10
+        self.release = threading.Event()
+
+    def get_param(self, name, valid_only=False):
+        return self.params[name]
+
+    def set_param(self, param):
+        self.release.wait()
+        if param.name == 'Bad':
+            raise IOError('Disk full')
+        self.params[param.name] = param
+
+
+class TestWriteBehindHDF(unittest.TestCase):
+    def setUp(self):
+        self.hdf = BlockingHDF()
+        self.writer = WriteBehindHDF(self.hdf, max_pending=5)
+
+    def tearDown(self):
+        self.hdf.release.set()
+        self.writer.close(raise_error=False)
+
+    def test_attributes(self):
+        self.assertEqual(self.writer.duration, 10)
+
+    def test_pending(self):
+        param = P('Airspeed', np.ma.arange(10))
+        self.writer.set_param(param)
+        self.assertEqual(self.hdf.params, {})
+        pending = self.writer.get_param('Airspeed', valid_only=True)
+        self.assertIsNot(pending, param)
+        self.assertIsNot(pending.array, param.array)
+        np.testing.assert_array_equal(pending.array, param.array)
+        self.hdf.release.set()
+        self.writer.close()
+        self.assertIs(self.hdf.params['Airspeed'], param)
+        self.assertIs(self.writer.get_param('Airspeed'), param)
+
+    def test_error(self):
+        self.writer.set_param(P('Bad', np.ma.arange(10)))
+        self.writer.set_param(P('Good', np.ma.arange(10)))
+        self.hdf.release.set()
+        self.assertRaises(IOError, self.writer.close)
+        # Parameters after the error are discarded.
+        self.assertEqual(self.hdf.params, {})